@@ -0,0 +1,173 @@
+"""
+Micro-benchmark for extractor.extract_fields.
+
+Generates a reproducible corpus of synthetic raw OCR texts (10k by default),
+checks that the single-pass extractor returns exactly what the original
+multi-pass implementation returned, and reports throughput for both.
+
+    python bench_extractor.py [--count 10000] [--seed 7]
+"""
+import argparse
+import random
+import re
+import time
+from datetime import datetime, timedelta
+
+from extractor import extract_fields
+
+# ---- original implementation, kept verbatim as the reference ----
+
+LEGACY_DATE_PATTERNS = [
+    r"\b(\d{4}[-/]\d{2}[-/]\d{2})\b",
+    r"\b(\d{2}[-/]\d{2}[-/]\d{4})\b",
+    r"\b(\d{2}\s+[A-Za-z]{3,9}\s+\d{4})\b",
+    r"\b([A-Za-z]{3,9}\s+\d{2},\s*\d{4})\b",
+]
+
+
+def legacy_parse_date(s):
+    if not s:
+        return None
+    s = s.strip()
+    fmts = ["%Y-%m-%d", "%Y/%m/%d", "%d-%m-%Y", "%d/%m/%Y", "%d %b %Y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y"]
+    for f in fmts:
+        try:
+            dt = datetime.strptime(s, f)
+            return dt.strftime("%Y-%m-%d")
+        except Exception:
+            continue
+    return None
+
+
+def legacy_guess_vendor(lines):
+    for line in lines:
+        clean = re.sub(r"[^A-Za-z0-9 &\-\.\,]", "", line).strip()
+        if len(clean) >= 3 and not re.search(r"(invoice|receipt|tax|gst|date|total)", clean, re.I):
+            return clean[:80]
+    return None
+
+
+def legacy_extract_fields(raw_text):
+    text = raw_text or ""
+    lines = [l.strip() for l in text.splitlines() if l.strip()]
+
+    vendor = legacy_guess_vendor(lines)
+
+    found_date = None
+    for pat in LEGACY_DATE_PATTERNS:
+        m = re.search(pat, text, re.I)
+        if m:
+            found_date = legacy_parse_date(m.group(1))
+            if found_date:
+                break
+
+    total_keywords = re.compile(r"\b(total|grand\s*total|amount\s*due|balance\s*due)\b", re.I)
+    amt_re = re.compile(r"(?:₹|\$|rs\.?)?\s*([0-9]{1,3}(?:,[0-9]{3})*(?:\.[0-9]{2})|[0-9]+(?:\.[0-9]{2}))")
+
+    def to_float(s):
+        try:
+            return float(s.replace(",", "").strip())
+        except Exception:
+            return None
+
+    def is_year_like(v):
+        return 1900 <= v <= 2100 and abs(v - int(v)) < 1e-9
+
+    found_amount = None
+    for line in lines:
+        if total_keywords.search(line):
+            candidates = [to_float(m.group(1)) for m in amt_re.finditer(line)]
+            candidates = [c for c in candidates if c is not None and not is_year_like(c)]
+            if candidates:
+                found_amount = max(candidates)
+                break
+
+    if found_amount is None:
+        candidates = [to_float(m.group(1)) for m in amt_re.finditer(text)]
+        candidates = [c for c in candidates if c is not None and not is_year_like(c)]
+        if candidates:
+            found_amount = max(candidates)
+
+    return vendor, found_date, found_amount
+
+
+# ---- synthetic corpus ----
+
+VENDORS = ["Blue Bottle Cafe", "ACME Office Supplies", "Uber Trip", "Hotel Grand & Spa", "AWS", "IndiGo Airlines"]
+HEADERS = ["TAX INVOICE", "Receipt", "GSTIN 29ABCDE1234F1Z5", "***", "#"]
+ITEMS = ["Coffee", "Paper A4", "Ride fare", "Room night", "EC2 usage", "Baggage", "Service charge"]
+DATE_STYLES = ["%Y-%m-%d", "%d/%m/%Y", "%d %b %Y", "%b %d, %Y", "%d-%m-%Y", "%Y/%m/%d"]
+TOTAL_LABELS = ["Total", "Grand Total", "Amount Due", "Balance due", "TOTAL"]
+CURRENCIES = ["", "$", "₹ ", "Rs. ", "rs"]
+# OCR noise and shapes that must fail/parse exactly as before
+ODD_DATES = [
+    "31/02/2025", "00/00/0000", "2025-12/31", "Sept 12, 2025", "Dec 31,2025", "dec 05, 2024",
+    "05 SEPTEMBER 2024", "31 Foo 2025", "1999/12/31", "12-31-2025",
+]
+
+
+def money(v, rng):
+    s = f"{v:,.2f}" if rng.random() < 0.5 else f"{v:.2f}"
+    return rng.choice(CURRENCIES) + s
+
+
+def make_text(rng):
+    lines = []
+    if rng.random() < 0.5:
+        lines.append(rng.choice(HEADERS))
+    lines.append(rng.choice(VENDORS))
+    lines.append(f"{rng.randint(1, 999)} Main Street")
+
+    if rng.random() < 0.9:
+        day = datetime(2024, 1, 1) + timedelta(days=rng.randint(0, 900))
+        lines.append(f"Date: {day.strftime(rng.choice(DATE_STYLES))}")
+    if rng.random() < 0.2:
+        lines.insert(rng.randint(0, len(lines)), f"Printed {rng.choice(ODD_DATES)}")
+
+    subtotal = 0.0
+    for _ in range(rng.randint(1, 12)):
+        price = round(rng.uniform(1, 5000), 2)
+        subtotal += price
+        lines.append(f"{rng.choice(ITEMS)}  x{rng.randint(1, 3)}  {money(price, rng)}")
+        if rng.random() < 0.1:
+            lines.append("")
+
+    tax = round(subtotal * 0.18, 2)
+    lines.append(f"Subtotal {money(subtotal, rng)}")
+    lines.append(f"Tax {money(tax, rng)}")
+    if rng.random() < 0.85:
+        lines.append(f"{rng.choice(TOTAL_LABELS)}: {money(subtotal + tax, rng)}")
+    lines.append(f"Thank you! Visit again in {rng.randint(2024, 2027)}")
+    return ("\r\n" if rng.random() < 0.1 else "\n").join(lines)
+
+
+def bench(fn, corpus):
+    t0 = time.perf_counter()
+    out = [fn(t) for t in corpus]
+    return out, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [make_text(rng) for _ in range(args.count)]
+
+    legacy, t_legacy = bench(legacy_extract_fields, corpus)
+    current, t_current = bench(extract_fields, corpus)
+
+    mismatches = [i for i, (a, b) in enumerate(zip(legacy, current)) if a != b]
+    for i in mismatches[:5]:
+        print(f"MISMATCH #{i}: legacy={legacy[i]} single-pass={current[i]}")
+
+    print(f"{args.count} texts, {len(mismatches)} mismatches")
+    print(f"legacy:      {t_legacy:.3f}s ({args.count / t_legacy:,.0f} texts/s)")
+    print(f"single-pass: {t_current:.3f}s ({args.count / t_current:,.0f} texts/s) -> {t_legacy / t_current:.2f}x")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
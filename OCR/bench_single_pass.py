@@ -0,0 +1,78 @@
+"""
+Regression benchmark for single-pass OCR.
+
+Runs every receipt in a fixture directory through ocr_image in two-pass
+(image_to_data + image_to_string) and single-pass mode, checks that
+extract_fields returns the same vendor/date/amount, and reports timings.
+
+    python bench_single_pass.py path/to/fixtures
+"""
+import sys
+import time
+from pathlib import Path
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from main import OCR_MAX_PAGES, extract_fields, ocr_image
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".tif", ".tiff", ".bmp"}
+
+
+def load_pages(path: Path):
+    if path.suffix.lower() == ".pdf":
+        doc = fitz.open(path)
+        pages = []
+        for i in range(min(OCR_MAX_PAGES, doc.page_count)):
+            pix = doc.load_page(i).get_pixmap(dpi=250)
+            pages.append(Image.frombytes("RGB", [pix.width, pix.height], pix.samples))
+        return pages
+    return [Image.open(path).convert("RGB")]
+
+
+def run(pages, single_pass: bool):
+    t0 = time.perf_counter()
+    text = "\n".join(ocr_image(img, single_pass=single_pass)[0] for img in pages).strip()
+    return extract_fields(text), time.perf_counter() - t0
+
+
+def main(fixtures_dir: str) -> int:
+    files = sorted(
+        p for p in Path(fixtures_dir).iterdir()
+        if p.suffix.lower() in IMAGE_SUFFIXES or p.suffix.lower() == ".pdf"
+    )
+    if not files:
+        print(f"no fixtures found in {fixtures_dir}")
+        return 2
+
+    mismatches = 0
+    total_two, total_one = 0.0, 0.0
+
+    for path in files:
+        pages = load_pages(path)
+        fields_two, t_two = run(pages, single_pass=False)
+        fields_one, t_one = run(pages, single_pass=True)
+        total_two += t_two
+        total_one += t_one
+
+        status = "ok" if fields_one == fields_two else "MISMATCH"
+        if fields_one != fields_two:
+            mismatches += 1
+        print(f"{status:8} {path.name}: two-pass={t_two:.2f}s single-pass={t_one:.2f}s")
+        if fields_one != fields_two:
+            print(f"         two-pass:    {fields_two}")
+            print(f"         single-pass: {fields_one}")
+
+    print(
+        f"\n{len(files)} receipts, {mismatches} mismatches; "
+        f"two-pass {total_two:.2f}s, single-pass {total_one:.2f}s "
+        f"({total_two / total_one if total_one else 0:.2f}x)"
+    )
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(2)
+    sys.exit(main(sys.argv[1]))
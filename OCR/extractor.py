@@ -0,0 +1,160 @@
+"""
+Field extraction (vendor / date / total amount) from raw OCR text.
+
+Everything is compiled once at import and each field is found with as little
+Python-level looping as possible: the vendor walk stops at the first usable
+line, the "Total" line is located by one search over the lowercased text,
+dates use whole-text scans of the compiled patterns and are validated without
+strptime. Measured with bench_extractor.py; per-line regex loops turned out
+slower than these C-level scans.
+
+Results match the original rules:
+
+- vendor: first line that still has >= 3 chars after cleanup and is not a
+  header word (invoice, receipt, tax, gst, date, total)
+- date: DATE_PATTERNS in priority order, first occurrence of each, first one
+  that parses wins
+- amount: largest amount on the first "Total"-like line, else the largest
+  amount anywhere; bare years (1900-2100) are ignored
+"""
+import re
+from datetime import date
+from typing import List, Optional, Tuple
+
+DATE_PATTERNS = [
+    r"\b(\d{4}[-/]\d{2}[-/]\d{2})\b",              # 2025-12-31
+    r"\b(\d{2}[-/]\d{2}[-/]\d{4})\b",              # 31/12/2025
+    r"\b(\d{2}\s+[A-Za-z]{3,9}\s+\d{4})\b",        # 31 Dec 2025
+    r"\b([A-Za-z]{3,9}\s+\d{2},\s*\d{4})\b",       # Dec 31, 2025
+]
+DATE_RES = [re.compile(p, re.I) for p in DATE_PATTERNS]
+
+# matched against lowercased text, which is cheaper than IGNORECASE
+TOTAL_LINE_RE = re.compile(r"\b(total|grand\s*total|amount\s*due|balance\s*due)\b")
+# str.splitlines() boundaries other than "\n"
+OTHER_LINE_BREAK_RE = re.compile("[\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+
+# Capture currency-like amounts: ₹ 1,180.00 / 1,180.00 / 1180.00
+AMOUNT_RE = re.compile(r"(?:₹|\$|rs\.?)?\s*([0-9]{1,3}(?:,[0-9]{3})*(?:\.[0-9]{2})|[0-9]+(?:\.[0-9]{2}))")
+
+VENDOR_CLEAN_RE = re.compile(r"[^A-Za-z0-9 &\-\.\,]")
+VENDOR_SKIP_RE = re.compile(r"(invoice|receipt|tax|gst|date|total)", re.I)
+
+DIGIT_RE = re.compile(r"\d")
+
+
+MONTHS = {}
+for _i, _name in enumerate(
+    ["january", "february", "march", "april", "may", "june", "july",
+     "august", "september", "october", "november", "december"], start=1
+):
+    MONTHS[_name] = _i        # %B
+    MONTHS[_name[:3]] = _i    # %b
+
+# pieces of each DATE_PATTERNS shape: Y-m-d, d-m-Y, d Mon Y, Mon d, Y ("/" also allowed)
+DATE_PARTS_RES = [
+    re.compile(r"(\d{4})([-/])(\d{2})\2(\d{2})"),
+    re.compile(r"(\d{2})([-/])(\d{2})\2(\d{4})"),
+    re.compile(r"(\d{2})\s+([A-Za-z]+)\s+(\d{4})"),
+    re.compile(r"([A-Za-z]+)\s+(\d{2}),\s+(\d{4})"),
+]
+
+
+def parse_date_shape(s: str, shape: int) -> Optional[str]:
+    """
+    ISO date for a match of DATE_PATTERNS[shape], or None if it is not a real
+    date: split the known shape and validate via date(), no strptime.
+    """
+    m = DATE_PARTS_RES[shape].fullmatch(s.strip())
+    if not m:
+        return None
+    try:
+        if shape == 0:
+            y, mo, d = int(m.group(1)), int(m.group(3)), int(m.group(4))
+        elif shape == 1:
+            d, mo, y = int(m.group(1)), int(m.group(3)), int(m.group(4))
+        elif shape == 2:
+            d, mo, y = int(m.group(1)), MONTHS[m.group(2).lower()], int(m.group(3))
+        else:
+            mo, d, y = MONTHS[m.group(1).lower()], int(m.group(2)), int(m.group(3))
+        return date(y, mo, d).strftime("%Y-%m-%d")
+    except (KeyError, ValueError):
+        return None
+
+
+def vendor_from_line(line: str) -> Optional[str]:
+    clean = VENDOR_CLEAN_RE.sub("", line).strip()
+    if len(clean) >= 3 and not VENDOR_SKIP_RE.search(clean):
+        return clean[:80]
+    return None
+
+
+def line_amounts(line: str) -> List[float]:
+    # amounts in a line (or whole text), bare years filtered out
+    out = []
+    for m in AMOUNT_RE.finditer(line):
+        v = float(m.group(1).replace(",", ""))
+        if not (1900 <= v <= 2100 and v == int(v)):
+            out.append(v)
+    return out
+
+
+def has_all_fields(text: str) -> bool:
+    """
+    Vendor, date and a "Total" line amount are all in `text`. More text after it
+    keeps vendor and amount as they are; only a higher-priority date shape on a
+    later page could still change the date.
+    """
+    vendor, found_date, _ = extract_fields(text)
+    return vendor is not None and found_date is not None and total_line_amount(text) is not None
+
+
+def total_line_amount(text: str) -> Optional[float]:
+    """Largest amount on the first line containing a total keyword (None if no such line has one)."""
+    # every TOTAL_LINE_RE alternative contains "total" or "due": substring checks on the
+    # lowered text skip most receipts before any regex runs
+    lower = text.lower()
+    if "total" not in lower and "due" not in lower:
+        return None
+    if OTHER_LINE_BREAK_RE.search(lower):
+        lower = "\n".join(lower.splitlines())
+
+    # case-sensitive search over the lowered text, then cut out the matching line
+    for m in TOTAL_LINE_RE.finditer(lower):
+        start = lower.rfind("\n", 0, m.start()) + 1
+        end = lower.find("\n", m.end())
+        amounts = line_amounts(lower[start:] if end < 0 else lower[start:end])
+        if amounts:
+            return max(amounts)
+    return None
+
+
+def extract_fields(raw_text: str) -> Tuple[Optional[str], Optional[str], Optional[float]]:
+    text = raw_text or ""
+
+    vendor = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            vendor = vendor_from_line(line)
+            if vendor is not None:
+                break
+
+    total_amount = total_line_amount(text)
+    if total_amount is None:
+        # no usable Total line: largest amount anywhere
+        amounts = line_amounts(text)
+        if amounts:
+            total_amount = max(amounts)
+
+    # dates: whole-text scans in priority order run in C and stop at the first hit
+    found_date = None
+    if DIGIT_RE.search(text):
+        for k, rx in enumerate(DATE_RES):
+            m = rx.search(text)
+            if m:
+                found_date = parse_date_shape(m.group(1), k)
+                if found_date:
+                    break
+
+    return vendor, found_date, total_amount
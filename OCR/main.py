@@ -1,22 +1,81 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import io, re, os, tempfile
+import io, os, tempfile, asyncio, hashlib, json, threading, zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager, contextmanager
 from typing import Optional, List, Tuple
-from datetime import datetime
 import fitz  # PyMuPDF
 import pytesseract
 from PIL import Image
+
+from extractor import extract_fields, has_all_fields
+
 pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
-# Optional PDF support
-try:
-    from pdf2image import convert_from_bytes
-    PDF_ENABLED = True
-except Exception:
-    PDF_ENABLED = False
+# Tesseract is CPU-bound: run it in a process pool sized to the cores and
+# reject work beyond OCR_MAX_INFLIGHT requests instead of queueing it unbounded.
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+OCR_MAX_INFLIGHT = int(os.getenv("OCR_MAX_INFLIGHT", str(OCR_WORKERS * 4)))
+OCR_MAX_PAGES = int(os.getenv("OCR_MAX_PAGES", "3"))
+OCR_RETRY_AFTER_SECONDS = os.getenv("OCR_RETRY_AFTER_SECONDS", "2")
+# /ocr/batch limits: files per request (zip members included) and files OCR'd at once
+OCR_BATCH_MAX_FILES = int(os.getenv("OCR_BATCH_MAX_FILES", "500"))
+# ...and their total size once zip archives are expanded
+OCR_BATCH_MAX_BYTES = int(os.getenv("OCR_BATCH_MAX_BYTES", str(200 * 1024 * 1024)))
+OCR_BATCH_CONCURRENCY = int(os.getenv("OCR_BATCH_CONCURRENCY", str(OCR_WORKERS)))
+
+# Rebuild text from image_to_data instead of running image_to_string as a second pass
+OCR_SINGLE_PASS = os.getenv("OCR_SINGLE_PASS", "true").lower() == "true"
+
+# PDFs: use the embedded text layer when a page has one, otherwise rasterize at an
+# adaptive DPI (capped pixel budget, grayscale) and stop once vendor, date and total are found
+OCR_PDF_TEXT_LAYER = os.getenv("OCR_PDF_TEXT_LAYER", "true").lower() == "true"
+OCR_TEXT_LAYER_MIN_CHARS = int(os.getenv("OCR_TEXT_LAYER_MIN_CHARS", "20"))
+OCR_PDF_DPI = int(os.getenv("OCR_PDF_DPI", "250"))
+OCR_PDF_MIN_DPI = int(os.getenv("OCR_PDF_MIN_DPI", "150"))
+OCR_PDF_MAX_PIXELS = int(os.getenv("OCR_PDF_MAX_PIXELS", str(12_000_000)))
+
+# Result cache keyed on sha256(content) + engine/config version: in-memory LRU, optional disk tier
+OCR_ENGINE_VERSION = os.getenv("OCR_ENGINE_VERSION", "1")
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", "1024"))
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", "")
+OCR_CACHE_VERSION = (
+    f"{OCR_ENGINE_VERSION}-{'sp' if OCR_SINGLE_PASS else 'tp'}-p{OCR_MAX_PAGES}"
+    f"-{'tl' if OCR_PDF_TEXT_LAYER else 'r'}{OCR_PDF_DPI}"
+)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_cache: "OrderedDict[str, dict]" = OrderedDict()
+_inflight = 0
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _pool
+    _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS)
+    try:
+        yield
+    finally:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def reset_pool(broken: ProcessPoolExecutor) -> None:
+    # a worker died (OOM kill, crash in tesseract/fitz) and took the pool with it;
+    # the first caller to notice replaces it, the rest find it already replaced
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS)
+            broken.shutdown(wait=False, cancel_futures=True)
+
 
-app = FastAPI(title="OCR Service", version="0.1.0")
+app = FastAPI(title="OCR Service", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -33,105 +92,42 @@ class OCRResponse(BaseModel):
     confidence: float
     raw_text: str
 
-AMOUNT_PATTERNS = [
-    r"(?:total|amount\s+due|grand\s+total)\s*[:\-]?\s*(?:₹|\$|rs\.?)?\s*([0-9]+(?:[.,][0-9]{2})?)",
-    r"(?:₹|\$|rs\.?)\s*([0-9]+(?:[.,][0-9]{2})?)\s*(?:total)?",
-]
-
-DATE_PATTERNS = [
-    r"\b(\d{4}[-/]\d{2}[-/]\d{2})\b",              # 2025-12-31
-    r"\b(\d{2}[-/]\d{2}[-/]\d{4})\b",              # 31/12/2025
-    r"\b(\d{2}\s+[A-Za-z]{3,9}\s+\d{4})\b",        # 31 Dec 2025
-    r"\b([A-Za-z]{3,9}\s+\d{2},\s*\d{4})\b",       # Dec 31, 2025
-]
-
-def normalize_amount(s: str) -> Optional[float]:
-    if not s:
-        return None
-    s = s.replace(",", "")
-    s = s.replace(" ", "")
-    s = s.replace("O", "0")  # common OCR error
-    try:
-        return float(s)
-    except Exception:
-        return None
-
-def parse_date(s: str) -> Optional[str]:
-    if not s:
-        return None
-    s = s.strip()
-    fmts = ["%Y-%m-%d", "%Y/%m/%d", "%d-%m-%Y", "%d/%m/%Y", "%d %b %Y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y"]
-    for f in fmts:
-        try:
-            dt = datetime.strptime(s, f)
-            return dt.strftime("%Y-%m-%d")
-        except Exception:
-            continue
-    return None
-
-def guess_vendor(lines: List[str]) -> Optional[str]:
-    # pick first non-trivial line
-    for line in lines:
-        clean = re.sub(r"[^A-Za-z0-9 &\-\.\,]", "", line).strip()
-        if len(clean) >= 3 and not re.search(r"(invoice|receipt|tax|gst|date|total)", clean, re.I):
-            return clean[:80]
-    return None
-
-def extract_fields(raw_text: str):
-    text = raw_text or ""
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
 
-    vendor = guess_vendor(lines)
+def text_from_data(data: dict) -> str:
+    """
+    Rebuild image_to_string-style text from an image_to_data result:
+    words joined per Tesseract line, blank line between paragraphs/blocks.
+    """
+    lines: List[str] = []
+    words: List[str] = []
+    current = None
 
-    # ---- DATE (same idea as before) ----
-    found_date = None
-    for pat in DATE_PATTERNS:
-        m = re.search(pat, text, re.I)
-        if m:
-            found_date = parse_date(m.group(1))
-            if found_date:
-                break
-
-    # ---- AMOUNT (improved) ----
-    # 1) Prefer amounts on lines that look like totals
-    total_keywords = re.compile(r"\b(total|grand\s*total|amount\s*due|balance\s*due)\b", re.I)
-
-    # Capture currency-like amounts: ₹ 1,180.00 / 1,180.00 / 1180.00
-    amt_re = re.compile(r"(?:₹|\$|rs\.?)?\s*([0-9]{1,3}(?:,[0-9]{3})*(?:\.[0-9]{2})|[0-9]+(?:\.[0-9]{2}))")
-
-    def to_float(s: str):
-        try:
-            s = s.replace(",", "").strip()
-            return float(s)
-        except:
-            return None
-
-    def is_year_like(v: float):
-        # Filter out years like 2026, 2025 etc
-        return 1900 <= v <= 2100 and abs(v - int(v)) < 1e-9
+    for i, word in enumerate(data.get("text", [])):
+        if data["level"][i] != 5:  # word level
+            continue
+        word = (word or "").strip()
+        if not word:
+            continue
 
-    # Pass A: find "Total" line(s)
-    found_amount = None
-    for line in lines:
-        if total_keywords.search(line):
-            candidates = [to_float(m.group(1)) for m in amt_re.finditer(line)]
-            candidates = [c for c in candidates if c is not None and not is_year_like(c)]
-            if candidates:
-                # If multiple amounts on the line, choose the largest (usually Total)
-                found_amount = max(candidates)
-                break
+        key = (data["page_num"][i], data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        if key != current:
+            if words:
+                lines.append(" ".join(words))
+                words = []
+            if current is not None and key[:3] != current[:3]:
+                lines.append("")
+            current = key
+        words.append(word)
 
-    # Pass B: fallback - search whole text for "Subtotal/Tax/Total" style amounts, pick the max but ignore years
-    if found_amount is None:
-        candidates = [to_float(m.group(1)) for m in amt_re.finditer(text)]
-        candidates = [c for c in candidates if c is not None and not is_year_like(c)]
-        if candidates:
-            found_amount = max(candidates)
+    if words:
+        lines.append(" ".join(words))
+    return "\n".join(lines)
 
-    return vendor, found_date, found_amount
 
+def ocr_image(img: Image.Image, single_pass: Optional[bool] = None) -> Tuple[str, float]:
+    if single_pass is None:
+        single_pass = OCR_SINGLE_PASS
 
-def ocr_image(img: Image.Image) -> Tuple[str, float]:
     # Confidence using image_to_data
     data = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT)
     confs = []
@@ -143,55 +139,294 @@ def ocr_image(img: Image.Image) -> Tuple[str, float]:
         except:
             pass
     avg_conf = (sum(confs) / len(confs) / 100.0) if confs else 0.0  # 0..1
-    raw_text = pytesseract.image_to_string(img)
+
+    # one engine run per page: text comes from the same image_to_data result
+    if single_pass:
+        raw_text = text_from_data(data)
+    else:
+        raw_text = pytesseract.image_to_string(img)
     return raw_text, max(0.0, min(1.0, avg_conf))
 
-@app.post("/ocr", response_model=OCRResponse)
-async def ocr(file: UploadFile = File(...)):
-    if not file:
-        raise HTTPException(status_code=400, detail="file is required")
 
-    content = await file.read()
-    if not content:
-        raise HTTPException(status_code=400, detail="empty file")
+def ocr_image_bytes(content: bytes) -> Tuple[str, float]:
+    # runs in a pool worker
+    img = Image.open(io.BytesIO(content)).convert("RGB")
+    return ocr_image(img)
+
+
+def pdf_render_dpi(page) -> int:
+    # keep width*height under OCR_PDF_MAX_PIXELS: large-format pages get a lower DPI
+    w_in, h_in = page.rect.width / 72.0, page.rect.height / 72.0
+    if w_in <= 0 or h_in <= 0:
+        return OCR_PDF_DPI
+    budget_dpi = int((OCR_PDF_MAX_PIXELS / (w_in * h_in)) ** 0.5)
+    return max(OCR_PDF_MIN_DPI, min(OCR_PDF_DPI, budget_dpi))
+
+
+def ocr_pdf_page(content: bytes, page_index: int) -> Tuple[str, float]:
+    # runs in a pool worker; each page is rendered and OCR'd independently
+    doc = fitz.open(stream=content, filetype="pdf")
+    page = doc.load_page(page_index)
+    pix = page.get_pixmap(dpi=pdf_render_dpi(page), colorspace=fitz.csGRAY)
+    img = Image.frombytes("L", [pix.width, pix.height], pix.samples)
+    return ocr_image(img)
+
+
+def pdf_text_layer(content: bytes) -> List[Optional[str]]:
+    """
+    Embedded text per page (first OCR_MAX_PAGES), None where the page needs OCR.
+    E-invoices carry a text layer, so they skip rasterization entirely.
+    """
+    doc = fitz.open(stream=content, filetype="pdf")
+    pages: List[Optional[str]] = []
+    for i in range(min(OCR_MAX_PAGES, doc.page_count)):
+        text = doc.load_page(i).get_text() if OCR_PDF_TEXT_LAYER else ""
+        pages.append(text if len("".join(text.split())) >= OCR_TEXT_LAYER_MIN_CHARS else None)
+    return pages
+
+
+def cache_key(content: bytes) -> str:
+    return f"{hashlib.sha256(content).hexdigest()}-{OCR_CACHE_VERSION}"
+
+
+def cache_get(key: str) -> Optional[dict]:
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+    if OCR_CACHE_DIR:
+        try:
+            with open(os.path.join(OCR_CACHE_DIR, f"{key}.json"), "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+        cache_put(key, value, disk=False)
+        return value
+    return None
+
 
-    filename = (file.filename or "").lower()
-    is_pdf = filename.endswith(".pdf") or (file.content_type == "application/pdf")
+def cache_put(key: str, value: dict, disk: bool = True) -> None:
+    _cache[key] = value
+    _cache.move_to_end(key)
+    while len(_cache) > OCR_CACHE_SIZE:
+        _cache.popitem(last=False)
 
-    images: List[Image.Image] = []
+    if disk and OCR_CACHE_DIR:
+        # write-then-rename so concurrent readers never see a partial file
+        os.makedirs(OCR_CACHE_DIR, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=OCR_CACHE_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp, os.path.join(OCR_CACHE_DIR, f"{key}.json"))
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+def check_capacity() -> None:
+    if _inflight >= OCR_MAX_INFLIGHT:
+        raise HTTPException(
+            status_code=503,
+            detail="OCR service is saturated, retry later",
+            headers={"Retry-After": OCR_RETRY_AFTER_SECONDS},
+        )
+
+
+def admit() -> None:
+    # single event loop, so a plain counter is enough
+    global _inflight
+    check_capacity()
+    _inflight += 1
+
+
+def release() -> None:
+    global _inflight
+    _inflight -= 1
 
+
+@contextmanager
+def admission():
+    admit()
     try:
-        if is_pdf:
-            doc = fitz.open(stream=content, filetype="pdf")
-            for i in range(min(3, doc.page_count)):  # MVP: first 3 pages
-                page = doc.load_page(i)
-                pix = page.get_pixmap(dpi=250)
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                images.append(img)
-        else:
-            img = Image.open(io.BytesIO(content)).convert("RGB")
-            images.append(img)
-    except HTTPException:
-        raise
+        yield
+    finally:
+        release()
+
+
+async def run_ocr(content: bytes, is_pdf: bool) -> Tuple[List[str], List[float]]:
+    loop = asyncio.get_running_loop()
+    pool = _pool
+
+    try:
+        if not is_pdf:
+            text, conf = await loop.run_in_executor(pool, ocr_image_bytes, content)
+            return [text], [conf]
+
+        layer = await loop.run_in_executor(None, pdf_text_layer, content)
+        # scanned pages OCR in parallel; text-layer pages cost nothing
+        jobs = {i: pool.submit(ocr_pdf_page, content, i) for i, text in enumerate(layer) if text is None}
+
+        texts: List[str] = []
+        confs: List[float] = []
+        try:
+            for i, text in enumerate(layer):
+                if text is None:
+                    text, conf = await asyncio.wrap_future(jobs[i])
+                else:
+                    conf = 1.0
+                texts.append(text)
+                confs.append(conf)
+
+                # every field found in the pages read so far: skip the rest
+                if has_all_fields("\n".join(texts)):
+                    break
+        finally:
+            # drops pages still queued for the pool; a page already in a worker
+            # finishes there and its result is discarded
+            for job in jobs.values():
+                job.cancel()
+    except BrokenProcessPool:
+        reset_pool(pool)
+        raise HTTPException(
+            status_code=503,
+            detail="OCR worker pool restarted, retry later",
+            headers={"Retry-After": OCR_RETRY_AFTER_SECONDS},
+        )
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Unsupported/invalid file: {str(e)}")
 
-    all_text = []
-    confs = []
-    for img in images:
-        t, c = ocr_image(img)
-        all_text.append(t)
-        confs.append(c)
+    return texts, confs
+
+
+def is_pdf_upload(filename: str, content_type: Optional[str]) -> bool:
+    return (filename or "").lower().endswith(".pdf") or content_type == "application/pdf"
+
+
+async def ocr_content(content: bytes, is_pdf: bool, key: str) -> OCRResponse:
+    all_text, confs = await run_ocr(content, is_pdf)
 
     raw_text = "\n".join(all_text).strip()
     confidence = sum(confs) / len(confs) if confs else 0.0
 
     vendor, date, total_amount = extract_fields(raw_text)
 
-    return OCRResponse(
+    result = OCRResponse(
         vendor=vendor,
         date=date,
         total_amount=total_amount,
         confidence=confidence,
         raw_text=raw_text[:20000],  # avoid giant payloads
     )
+    cache_put(key, result.model_dump())
+    return result
+
+
+@app.post("/ocr", response_model=OCRResponse)
+async def ocr(file: UploadFile = File(...)):
+    if not file:
+        raise HTTPException(status_code=400, detail="file is required")
+
+    content = await file.read()
+    if not content:
+        raise HTTPException(status_code=400, detail="empty file")
+
+    # duplicates are answered from the cache without taking an OCR slot
+    key = cache_key(content)
+    cached = cache_get(key)
+    if cached is not None:
+        return OCRResponse(**cached)
+
+    with admission():
+        return await ocr_content(content, is_pdf_upload(file.filename, file.content_type), key)
+
+
+def batch_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"at most {OCR_BATCH_MAX_FILES} files and {OCR_BATCH_MAX_BYTES} bytes per batch",
+    )
+
+
+def unpack_zip(content: bytes, max_files: int, max_bytes: int) -> List[Tuple[str, bytes, Optional[str]]]:
+    """
+    Expand a zip archive into batch items. The member count and declared sizes are
+    checked against the limits before anything is decompressed; zipfile stops reading
+    a member at its declared size, so a zip bomb cannot get past them.
+    """
+    try:
+        with zipfile.ZipFile(io.BytesIO(content)) as zf:
+            members = [
+                info for info in zf.infolist()
+                if not info.is_dir() and not os.path.basename(info.filename).startswith(".")
+            ]
+            if len(members) > max_files or sum(info.file_size for info in members) > max_bytes:
+                raise batch_too_large()
+            return [(info.filename, zf.read(info), None) for info in members]
+    except zipfile.BadZipFile as e:
+        raise HTTPException(status_code=400, detail=f"Invalid zip archive: {str(e)}")
+
+
+@app.post("/ocr/batch")
+async def ocr_batch(files: List[UploadFile] = File(...)):
+    """
+    OCR many receipts in one request. Accepts several `files` parts, zip archives
+    among them are expanded. Streams one NDJSON line per file as soon as it finishes:
+    {"index", "filename", "ok", "result" | "error"}.
+    """
+    items: List[Tuple[str, bytes, Optional[str]]] = []
+    size = 0
+    for f in files:
+        content = await f.read()
+        name = f.filename or ""
+        if name.lower().endswith(".zip") or f.content_type in ("application/zip", "application/x-zip-compressed"):
+            new = unpack_zip(content, OCR_BATCH_MAX_FILES - len(items), OCR_BATCH_MAX_BYTES - size)
+        else:
+            new = [(name, content, f.content_type)]
+        items.extend(new)
+        size += sum(len(data) for _, data, _ in new)
+        if len(items) > OCR_BATCH_MAX_FILES or size > OCR_BATCH_MAX_BYTES:
+            raise batch_too_large()
+
+    if not items:
+        raise HTTPException(status_code=400, detail="files are required")
+
+    # the whole batch holds one admission slot while it streams; OCR_BATCH_CONCURRENCY
+    # bounds its share of the pool. Saturation is answered with a 503 up front, the slot
+    # itself is taken inside stream() so it is released however the response ends.
+    check_capacity()
+    sem = asyncio.Semaphore(OCR_BATCH_CONCURRENCY)
+
+    async def one(index: int, name: str, content: bytes, content_type: Optional[str]) -> dict:
+        line = {"index": index, "filename": name}
+        if not content:
+            return {**line, "ok": False, "error": "empty file"}
+
+        key = cache_key(content)
+        cached = cache_get(key)
+        if cached is not None:
+            return {**line, "ok": True, "result": cached}
+
+        async with sem:
+            try:
+                result = await ocr_content(content, is_pdf_upload(name, content_type), key)
+            except HTTPException as e:
+                return {**line, "ok": False, "error": e.detail}
+            except Exception as e:
+                # one bad file must not end the stream for the rest of the batch
+                return {**line, "ok": False, "error": f"{type(e).__name__}: {e}"}
+        return {**line, "ok": True, "result": result.model_dump()}
+
+    async def stream():
+        # not admit(): the check above already passed; a batch racing it may overshoot by one
+        global _inflight
+        _inflight += 1
+        tasks = [asyncio.create_task(one(i, *item)) for i, item in enumerate(items)]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                yield json.dumps(await fut) + "\n"
+        finally:
+            for t in tasks:
+                t.cancel()
+            release()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,106 @@
+"""
+Tests for the OCR service that need no Tesseract binary.
+
+    python -m unittest test_main
+"""
+import asyncio
+import io
+import unittest
+import zipfile
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+from fastapi import HTTPException, UploadFile
+
+import main
+
+
+def make_zip(members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+class BrokenPool(Executor):
+    def __init__(self, *args, **kwargs):
+        self.shut_down = False
+
+    def submit(self, fn, *args, **kwargs):
+        raise BrokenProcessPool("a worker died")
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.shut_down = True
+
+
+class AdmissionTests(unittest.TestCase):
+    def ocr(self, data=b"image bytes"):
+        return asyncio.run(main.ocr(UploadFile(io.BytesIO(data), filename="r.jpg")))
+
+    def test_saturated_service_asks_to_retry(self):
+        with mock.patch.object(main, "_inflight", main.OCR_MAX_INFLIGHT):
+            with self.assertRaises(HTTPException) as cm:
+                self.ocr()
+        self.assertEqual(cm.exception.status_code, 503)
+        self.assertEqual(cm.exception.headers, {"Retry-After": main.OCR_RETRY_AFTER_SECONDS})
+
+    def test_broken_pool_is_replaced_once(self):
+        broken = BrokenPool()
+        with mock.patch.object(main, "_pool", broken), mock.patch.object(main, "ProcessPoolExecutor", BrokenPool):
+            with self.assertRaises(HTTPException) as cm:
+                self.ocr()
+            self.assertEqual(cm.exception.status_code, 503)
+            self.assertIn("Retry-After", cm.exception.headers)
+            self.assertTrue(broken.shut_down)
+            replacement = main._pool
+            self.assertIsNot(replacement, broken)
+
+            # a caller still holding the old pool does not replace the new one
+            main.reset_pool(broken)
+            self.assertIs(main._pool, replacement)
+        self.assertEqual(main._inflight, 0)
+
+
+class UnpackZipTests(unittest.TestCase):
+    def test_members_are_expanded(self):
+        content = make_zip({"a.jpg": b"aaa", "scans/b.pdf": b"bb", "scans/": b"", ".DS_Store": b"x"})
+        items = main.unpack_zip(content, 10, 100)
+        self.assertEqual(items, [("a.jpg", b"aaa", None), ("scans/b.pdf", b"bb", None)])
+
+    def test_limits_are_checked_before_decompressing(self):
+        content = make_zip({"a.jpg": b"\0" * 1000, "b.jpg": b"\0" * 1000})
+        with mock.patch.object(zipfile.ZipFile, "read") as read:
+            for max_files, max_bytes in ((1, 10_000), (10, 1999)):
+                with self.assertRaises(HTTPException) as cm:
+                    main.unpack_zip(content, max_files, max_bytes)
+                self.assertEqual(cm.exception.status_code, 413)
+            read.assert_not_called()
+
+    def test_invalid_archive(self):
+        with self.assertRaises(HTTPException) as cm:
+            main.unpack_zip(b"not a zip", 10, 100)
+        self.assertEqual(cm.exception.status_code, 400)
+
+
+class BatchLimitTests(unittest.TestCase):
+    def post(self, *uploads):
+        files = [UploadFile(io.BytesIO(data), filename=name) for name, data in uploads]
+        return asyncio.run(main.ocr_batch(files))
+
+    @mock.patch.object(main, "OCR_BATCH_MAX_BYTES", 1500)
+    def test_expanded_size_counts_across_parts(self):
+        with self.assertRaises(HTTPException) as cm:
+            self.post(("a.jpg", b"\0" * 1000), ("more.zip", make_zip({"b.jpg": b"\0" * 1000})))
+        self.assertEqual(cm.exception.status_code, 413)
+
+    @mock.patch.object(main, "OCR_BATCH_MAX_FILES", 2)
+    def test_file_count_counts_zip_members(self):
+        with self.assertRaises(HTTPException) as cm:
+            self.post(("a.jpg", b"a"), ("more.zip", make_zip({"b.jpg": b"b", "c.jpg": b"c"})))
+        self.assertEqual(cm.exception.status_code, 413)
+
+
+if __name__ == "__main__":
+    unittest.main()
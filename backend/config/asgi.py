@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+# route the async views (expenses.async_views); set ASYNC_VIEWS=false to serve the DRF ones
+os.environ.setdefault("ASYNC_VIEWS", "true")
 
 application = get_asgi_application()
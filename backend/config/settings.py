@@ -9,11 +9,63 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+# parts of chunked uploads; same filesystem as MEDIA_ROOT so completed files are moved, not copied
+RECEIPT_UPLOAD_STAGING_DIR = os.getenv("RECEIPT_UPLOAD_STAGING_DIR", os.path.join(MEDIA_ROOT, ".uploads"))
 
 
 OCR_SERVICE_URL = os.getenv("OCR_SERVICE_URL", "http://127.0.0.1:8001")
 OCR_TIMEOUT_SECONDS = int(os.getenv("OCR_TIMEOUT_SECONDS", "12"))
 
+# OCR HTTP client: pooled keep-alive session, connect/read timeouts, jittered retries
+# for connection errors and 502/503/504, and a circuit breaker that fails fast while the
+# service is down (OCR_TIMEOUT_SECONDS above is the read timeout).
+OCR_CONNECT_TIMEOUT_SECONDS = float(os.getenv("OCR_CONNECT_TIMEOUT_SECONDS", "2"))
+OCR_POOL_SIZE = int(os.getenv("OCR_POOL_SIZE", "10"))
+OCR_HTTP_RETRIES = int(os.getenv("OCR_HTTP_RETRIES", "2"))
+OCR_HTTP_RETRY_BACKOFF_SECONDS = float(os.getenv("OCR_HTTP_RETRY_BACKOFF_SECONDS", "0.5"))
+OCR_BREAKER_FAILURE_THRESHOLD = int(os.getenv("OCR_BREAKER_FAILURE_THRESHOLD", "5"))
+OCR_BREAKER_RESET_SECONDS = float(os.getenv("OCR_BREAKER_RESET_SECONDS", "30"))
+
+# OCR job queue: uploads only enqueue, `manage.py ocr_worker` does the OCR.
+# Set OCR_ASYNC=false to run OCR inline in the upload request (local dev without a worker).
+OCR_ASYNC = os.getenv("OCR_ASYNC", "true").lower() == "true"
+OCR_MAX_ATTEMPTS = int(os.getenv("OCR_MAX_ATTEMPTS", "5"))
+OCR_RETRY_BASE_SECONDS = int(os.getenv("OCR_RETRY_BASE_SECONDS", "10"))
+OCR_RETRY_MAX_SECONDS = int(os.getenv("OCR_RETRY_MAX_SECONDS", "600"))
+OCR_JOB_LEASE_SECONDS = int(os.getenv("OCR_JOB_LEASE_SECONDS", "300"))
+OCR_WORKER_CONCURRENCY = int(os.getenv("OCR_WORKER_CONCURRENCY", "4"))
+# Bump when the OCR engine/config changes so cached results by content hash are not reused
+OCR_CACHE_VERSION = os.getenv("OCR_CACHE_VERSION", "1")
+
+# How receipt files are sent after the permission check: "django" (sendfile via the WSGI
+# server's file_wrapper), "nginx" (X-Accel-Redirect), "sendfile" (X-Sendfile) or "redirect"
+# (presigned storage URL; S3 receipt storage only, refused at startup otherwise). See expenses/delivery.py.
+RECEIPT_DELIVERY_BACKEND = os.getenv("RECEIPT_DELIVERY_BACKEND", "django")
+# internal nginx location aliased to MEDIA_ROOT, used with the "nginx" backend
+RECEIPT_ACCEL_PREFIX = os.getenv("RECEIPT_ACCEL_PREFIX", "/protected-media/")
+
+# WebP/JPEG quality of the receipt thumb/preview renditions
+RECEIPT_RENDITION_QUALITY = int(os.getenv("RECEIPT_RENDITION_QUALITY", "70"))
+
+# Resumable chunked receipt uploads (/api/receipt-uploads/)
+RECEIPT_UPLOAD_MAX_BYTES = int(os.getenv("RECEIPT_UPLOAD_MAX_BYTES", str(25 * 1024 * 1024)))
+RECEIPT_UPLOAD_PART_MAX_BYTES = int(os.getenv("RECEIPT_UPLOAD_PART_MAX_BYTES", str(5 * 1024 * 1024)))
+RECEIPT_UPLOAD_SESSION_HOURS = int(os.getenv("RECEIPT_UPLOAD_SESSION_HOURS", "24"))
+
+# Seconds a user's role / reports_to stays in the per-process cache (used when the JWT lacks the claims)
+ROLE_CACHE_TTL_SECONDS = int(os.getenv("ROLE_CACHE_TTL_SECONDS", "60"))
+
+# Serve /api/me/, the claim list and receipt downloads from async views (on by default under config.asgi)
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "false").lower() == "true"
+
+# Request metrics on /metrics (expenses/metrics.py); scrape with `Authorization: Bearer $METRICS_TOKEN`
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# requests slower than this are logged with their query count / time
+METRICS_SLOW_REQUEST_MS = float(os.getenv("METRICS_SLOW_REQUEST_MS", "500"))
+# share of requests run under cProfile (0..1); the slow ones are dumped to METRICS_PROFILE_DIR
+METRICS_PROFILE_SAMPLE_RATE = float(os.getenv("METRICS_PROFILE_SAMPLE_RATE", "0"))
+METRICS_PROFILE_DIR = os.getenv("METRICS_PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -36,6 +88,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "corsheaders",
     "users",
@@ -43,6 +96,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "expenses.metrics.RequestMetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -141,6 +195,40 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Receipt files (see expenses/storage.py): "local", "s3" (any S3-compatible store) or "standin"
+RECEIPT_STORAGE_BACKEND = os.getenv("RECEIPT_STORAGE_BACKEND", "local")
+
+RECEIPT_STORAGES = {
+    "local": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "s3": {
+        "BACKEND": "storages.backends.s3.S3Storage",
+        "OPTIONS": {
+            "bucket_name": os.getenv("RECEIPT_S3_BUCKET", "receipts"),
+            "endpoint_url": os.getenv("RECEIPT_S3_ENDPOINT_URL") or None,  # e.g. http://localhost:9000 for MinIO
+            "access_key": os.getenv("RECEIPT_S3_ACCESS_KEY"),
+            "secret_key": os.getenv("RECEIPT_S3_SECRET_KEY"),
+            "region_name": os.getenv("RECEIPT_S3_REGION") or None,
+            "default_acl": None,
+            "file_overwrite": False,
+            "querystring_auth": True,
+            "querystring_expire": int(os.getenv("RECEIPT_S3_URL_EXPIRE_SECONDS", "300")),
+        },
+    },
+    "standin": {
+        "BACKEND": "expenses.storage.ObjectStoreStandIn",
+        # URLs point at the DEBUG-only MEDIA_URL route and are not signed, so no "redirect" delivery
+        "OPTIONS": {"location": os.path.join(MEDIA_ROOT, "objectstore"), "base_url": MEDIA_URL + "objectstore/"},
+    },
+}
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    "receipts": RECEIPT_STORAGES[RECEIPT_STORAGE_BACKEND],
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -148,13 +236,18 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # reads are served from token claims, writes load the user (see expenses/authentication.py)
+        "expenses.authentication.ReadStatelessJWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",
         "rest_framework.authentication.BasicAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # every list endpoint is cursor-paginated; views with their own ordering set pagination_class
+    "DEFAULT_PAGINATION_CLASS": "expenses.pagination.IdCursorPagination",
+    # default page size (override per request with ?page_size=)
+    "PAGE_SIZE": int(os.getenv("API_PAGE_SIZE", "50")),
 }
 if DEBUG:
     REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = [
@@ -165,3 +258,18 @@ else:
     REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = [
         "rest_framework.renderers.JSONRenderer",
     ]
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "plain": {"format": "%(asctime)s %(levelname)s %(name)s %(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "plain"},
+    },
+    "root": {"handlers": ["console"], "level": "WARNING"},
+    "loggers": {
+        "expenses": {"level": os.getenv("EXPENSES_LOG_LEVEL", "INFO")},
+    },
+}
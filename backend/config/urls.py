@@ -10,7 +10,10 @@ from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
 from expenses.views import ExpenseViewSet
 from expenses.custom_token import CustomTokenObtainPairView
+from expenses import async_views
 from expenses.me import me
+from expenses.metrics import metrics_view
+from expenses.ocr_status import ocr_status
 
 router = DefaultRouter()
 router.register(r"expenses", ExpenseViewSet, basename="expense")
@@ -22,8 +25,18 @@ urlpatterns = [
     path("api/token/", CustomTokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("api/me/", me),
+    path("api/ocr/status/", ocr_status),
+    path("metrics", metrics_view),
     path("api/", include("expenses.urls")),
 ]
 
+if settings.ASYNC_VIEWS:
+    # ASGI: async versions of the read-heavy endpoints take precedence (expenses.async_views)
+    urlpatterns = [
+        path("api/me/", async_views.me),
+        path("api/expenses/", async_views.expense_list),
+        path("api/expenses/<int:pk>/receipt/", async_views.expense_receipt),
+    ] + urlpatterns
+
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -1,8 +1,46 @@
 from django.contrib import admin
-from .models import Expense
+from django.db import transaction
+
+from . import search
+from .counters import record_changes, snapshot_of, snapshots
+from .models import Expense, Receipt
+from .search import search_query
 
 @admin.register(Expense)
 class ExpenseAdmin(admin.ModelAdmin):
     list_display = ("id", "title", "amount", "category", "status", "submitted_by", "created_at")
     list_filter = ("status", "category", "created_at")
-    search_fields = ("title", "description", "submitted_by__username")
+    # full-text over expenses.search (claim text, comments, OCR); a username matches exactly
+    search_fields = ("submitted_by__username",)
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        matches = queryset.filter(search_vector=search_query(search_term))
+        return matches | queryset.filter(submitted_by__username=search_term), False
+
+    # same bookkeeping as the API's perform_create / perform_update / perform_destroy
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            before = snapshots(Expense.objects.select_for_update().filter(pk=obj.pk)) if change else {}
+            super().save_model(request, obj, form, change)
+            record_changes([(before.get(obj.pk), snapshot_of(obj))])
+            search.refresh([obj.pk])
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, Expense.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            before = snapshots(Expense.objects.select_for_update().filter(pk__in=queryset.values("pk")))
+            Expense.objects.filter(pk__in=list(before)).delete()
+            record_changes((snap, None) for snap in before.values())
+
+
+@admin.register(Receipt)
+class ReceiptAdmin(admin.ModelAdmin):
+    list_display = ("id", "expense", "ocr_status", "content_hash", "created_at")
+    list_filter = ("ocr_status",)
+    # paste a hash to find the same file across claims
+    search_fields = ("=content_hash",)
@@ -4,3 +4,22 @@ from django.apps import AppConfig
 class ExpensesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "expenses"
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_save
+
+        from .delivery import check_configuration
+        from .metrics import install_query_wrapper
+        from .roles import user_saved
+
+        # role / reports_to changes must not be served from the role cache
+        post_save.connect(user_saved, sender=get_user_model(), dispatch_uid="expenses_role_cache_save")
+        post_delete.connect(user_saved, sender=get_user_model(), dispatch_uid="expenses_role_cache_delete")
+
+        # per-request query count / time for /metrics
+        connection_created.connect(install_query_wrapper, dispatch_uid="expenses_metrics_queries")
+
+        # "redirect" delivery hands out storage URLs; they must be signed
+        check_configuration()
@@ -0,0 +1,113 @@
+"""
+Async versions of the read-heavy endpoints, routed in front of the DRF views when
+the app runs under ASGI (config/asgi.py turns on ASYNC_VIEWS).
+
+DRF views are sync, so these are plain Django views with the same authentication
+(ReadStatelessJWTAuthentication), permissions and response bodies:
+
+    GET /api/me/
+    GET /api/expenses/                   (POST still goes to the DRF view)
+    GET /api/expenses/{id}/receipt/
+
+Authentication is the same as in the DRF views: Bearer tokens carrying the
+role claims are checked on the event loop, session / basic auth and older
+tokens run the REST_FRAMEWORK authentication classes in a thread.
+
+The receipt stream is the big win: its body is an async iterator, so a slow
+client holds a coroutine instead of a worker thread. The list endpoint runs
+DRF's paginate_queryset in a thread, as Django's async ORM would for each query.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.encoding import smart_str
+from django.views.decorators.http import require_safe
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .authentication import aauthenticate
+from .delivery import aserve_receipt
+from .filters import filter_expenses
+from .models import Expense
+from .pagination import ExpenseCursorPagination
+from .roles import get_user_role
+from .serializers import ExpenseListSerializer
+from .views import ExpenseViewSet, can_view_receipt, receipt_file, role_queue, with_receipt_flag
+
+_expense_list_or_create = ExpenseViewSet.as_view({"get": "list", "post": "create"})
+
+
+def _json(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type="application/json")
+
+
+def _unauthorized():
+    response = _json({"detail": "Authentication credentials were not provided."}, status=401)
+    response["WWW-Authenticate"] = 'Bearer realm="api"'
+    return response
+
+
+def _api_error(exc: APIException):
+    detail = exc.detail if isinstance(exc.detail, (dict, list)) else {"detail": exc.detail}
+    return _json(detail, status=exc.status_code)
+
+
+@require_safe
+async def me(request):
+    if not await aauthenticate(request):
+        return _unauthorized()
+    return _json({
+        "username": request.user.username,
+        "role": get_user_role(request),
+    })
+
+
+async def expense_list(request):
+    if request.method not in ("GET", "HEAD"):
+        return await sync_to_async(_expense_list_or_create)(request)
+
+    if not await aauthenticate(request):
+        return _unauthorized()
+
+    base = with_receipt_flag(Expense.objects.select_related("submitted_by", "current_approver"))
+    paginator = ExpenseCursorPagination()
+    try:
+        qs = filter_expenses(role_queue(base, get_user_role(request), request.user.id), request.GET)
+        # DRF's own cursor handling, so cursors and links match the sync list view
+        page = await sync_to_async(paginator.paginate_queryset)(qs, Request(request))
+    except APIException as e:
+        return _api_error(e)
+
+    return _json({
+        "next": paginator.get_next_link(),
+        "previous": paginator.get_previous_link(),
+        "results": ExpenseListSerializer(page, many=True).data,
+    })
+
+
+@require_safe
+async def expense_receipt(request, pk):
+    if not await aauthenticate(request):
+        return _unauthorized()
+
+    exp = await Expense.objects.filter(pk=pk).afirst()
+    if exp is None:
+        return _json({"detail": "Not found."}, status=404)
+
+    if not can_view_receipt(request, exp):
+        return _json({"detail": "Not allowed."}, status=403)
+
+    receipt_obj = await exp.receipts.order_by("-id").afirst()
+
+    rendition = request.GET.get("rendition")
+    if rendition not in (None, "thumb", "preview"):
+        return _json({"detail": "rendition must be thumb or preview."}, status=400)
+
+    file_field, content_hash = receipt_file(exp, receipt_obj, rendition)
+    if not file_field:
+        return _json({"detail": "No receipt found"}, status=404)
+
+    download = request.GET.get("download") == "1"
+    filename = smart_str(file_field.name.split("/")[-1])
+
+    return await aserve_receipt(request, file_field, filename=filename, download=download, content_hash=content_hash)
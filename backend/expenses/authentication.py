@@ -0,0 +1,100 @@
+from asgiref.sync import sync_to_async
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.request import Request
+from rest_framework.settings import api_settings as drf_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+# claims CustomTokenObtainPairSerializer puts in every access token
+CLAIMS_USER_FIELDS = ("role", "reports_to_id", "username", "is_staff")
+
+
+class ClaimsUser(TokenUser):
+    """Request user built from validated access-token claims, no database row behind it."""
+
+    # simplejwt 5.5 stores the user id claim as a str; compare like CustomUser.id
+    @cached_property
+    def id(self):
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def pk(self):
+        return self.id
+
+    @property
+    def role(self):
+        return self.token.get("role")
+
+    @property
+    def reports_to_id(self):
+        return self.token.get("reports_to_id")
+
+
+class ReadStatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that skips the CustomUser SELECT on read requests.
+
+    GET/HEAD/OPTIONS with a token carrying CLAIMS_USER_FIELDS get a ClaimsUser.
+    Writes, and tokens issued before those claims existed, load the user as usual,
+    so is_active and the current role are always checked before anything changes.
+    A deactivated user keeps read access until the access token expires.
+    """
+
+    def authenticate(self, request):
+        if request.method not in SAFE_METHODS:
+            return super().authenticate(request)
+
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if all(claim in validated_token for claim in CLAIMS_USER_FIELDS):
+            return ClaimsUser(validated_token), validated_token
+
+        return self.get_user(validated_token), validated_token
+
+
+_read_auth = ReadStatelessJWTAuthentication()
+
+
+def _drf_authenticate(request):
+    """(user, auth) from REST_FRAMEWORK's DEFAULT_AUTHENTICATION_CLASSES, or (None, None)."""
+    drf_request = Request(request, authenticators=[cls() for cls in drf_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    if not drf_request.user.is_authenticated:
+        return None, None
+    return drf_request.user, drf_request.auth
+
+
+async def aauthenticate(request) -> bool:
+    """
+    The DRF views' authentication for plain async views (expenses.async_views).
+    Sets request.user / request.auth and returns True if the request is authenticated.
+    Bearer tokens with the claims need no database and no thread; older tokens, and
+    session / basic auth through the REST_FRAMEWORK classes, run in a thread.
+    """
+    try:
+        header = _read_auth.get_header(request)
+        raw_token = _read_auth.get_raw_token(header) if header is not None else None
+        if raw_token is None:
+            user, auth = await sync_to_async(_drf_authenticate)(request)
+            if user is None:
+                return False
+        else:
+            auth = _read_auth.get_validated_token(raw_token)
+            if all(claim in auth for claim in CLAIMS_USER_FIELDS):
+                user = ClaimsUser(auth)
+            else:
+                user = await sync_to_async(_read_auth.get_user)(auth)
+    except AuthenticationFailed:
+        return False
+
+    request.user, request.auth = user, auth
+    return True
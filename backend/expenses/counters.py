@@ -0,0 +1,128 @@
+"""
+Keeps ClaimCounter in step with Expense.
+
+Every write path passes the claim's snapshot before and after the change to
+record_changes() inside its own transaction. The counter rows are updated there
+too, so the counters commit or roll back together with the claims. That includes
+the admin (ExpenseAdmin). Migration 0015 fills the counters for existing claims,
+and `manage.py rebuild_claim_counters` rebuilds them after manual data fixes.
+
+Contention: every claim write also updates the ALL-scope row of its
+(status, category), and there are only 30 of those. The row lock is held until
+the transaction commits, so concurrent writes on the same status/category queue
+behind each other, and a bulk transition holds several of these rows at once.
+Rows are locked in a fixed order, so this serializes without deadlocking. If it
+ever limits write throughput, drop the ALL scope and sum the SUBMITTER rows in
+claim_summary instead; that trades the hot rows for a scan of one row per user.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Sum
+
+from .models import ClaimCounter, Expense
+
+SNAPSHOT_FIELDS = ("id", "submitted_by_id", "current_approver_id", "status", "category", "amount")
+
+
+def snapshots(qs) -> dict:
+    """{id: snapshot} for the claims in `qs`."""
+    return {row["id"]: row for row in qs.values(*SNAPSHOT_FIELDS)}
+
+
+def snapshot_of(expense: Expense) -> dict:
+    return {field: getattr(expense, field) for field in SNAPSHOT_FIELDS}
+
+
+def _keys(snap):
+    yield ClaimCounter.Scope.ALL, None, snap["status"], snap["category"]
+    if snap["submitted_by_id"]:
+        yield ClaimCounter.Scope.SUBMITTER, snap["submitted_by_id"], snap["status"], snap["category"]
+    if snap["current_approver_id"]:
+        yield ClaimCounter.Scope.APPROVER, snap["current_approver_id"], snap["status"], snap["category"]
+
+
+def _apply(key, count: int, total: Decimal) -> None:
+    scope, user_id, status, category = key
+    rows = ClaimCounter.objects.filter(scope=scope, user_id=user_id, status=status, category=category)
+    if rows.update(count=F("count") + count, total=F("total") + total):
+        return
+    try:
+        with transaction.atomic():
+            ClaimCounter.objects.create(
+                scope=scope, user_id=user_id, status=status, category=category, count=count, total=total
+            )
+    except IntegrityError:
+        # created concurrently; it exists now
+        rows.update(count=F("count") + count, total=F("total") + total)
+
+
+def record_changes(changes) -> None:
+    """
+    `changes` is an iterable of (before, after) snapshots; None means created / deleted.
+    Call inside the transaction that changes the claims.
+    """
+    deltas = defaultdict(lambda: [0, Decimal("0")])
+    for before, after in changes:
+        for snap, sign in ((before, -1), (after, 1)):
+            if snap is None:
+                continue
+            for key in _keys(snap):
+                deltas[key][0] += sign
+                deltas[key][1] += sign * Decimal(snap["amount"])
+
+    # fixed order so concurrent transactions lock counter rows in the same sequence
+    for key in sorted(deltas, key=lambda k: (k[0], k[1] or 0, k[2], k[3])):
+        count, total = deltas[key]
+        if count or total:
+            _apply(key, count, total)
+
+
+def rebuild(expense_model=Expense, counter_model=ClaimCounter) -> int:
+    """
+    Recompute every counter from the claims; returns the number of counter rows.
+    A data migration passes its historical models.
+    """
+    groupings = [
+        (ClaimCounter.Scope.ALL, None),
+        (ClaimCounter.Scope.SUBMITTER, "submitted_by_id"),
+        (ClaimCounter.Scope.APPROVER, "current_approver_id"),
+    ]
+    rows = []
+    with transaction.atomic():
+        # writers queue behind this lock and apply their deltas on top of the rebuilt rows
+        with connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {counter_model._meta.db_table} IN EXCLUSIVE MODE")
+        counter_model.objects.all().delete()
+        for scope, user_field in groupings:
+            fields = ["status", "category"] + ([user_field] if user_field else [])
+            qs = expense_model.objects.all()
+            if user_field:
+                qs = qs.filter(**{f"{user_field}__isnull": False})
+            for row in qs.values(*fields).annotate(n=Count("id"), s=Sum("amount")).order_by():
+                rows.append(counter_model(
+                    scope=scope,
+                    user_id=row[user_field] if user_field else None,
+                    status=row["status"],
+                    category=row["category"],
+                    count=row["n"],
+                    total=row["s"] or 0,
+                ))
+        counter_model.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def claim_summary(*, scope: str, user_id=None) -> dict:
+    """Counts and totals for one scope, by status and by category."""
+    out = {"count": 0, "total": Decimal("0"), "by_status": {}, "by_category": {}}
+    for row in ClaimCounter.objects.filter(scope=scope, user_id=user_id).values("status", "category", "count", "total"):
+        if not row["count"]:
+            continue
+        out["count"] += row["count"]
+        out["total"] += row["total"]
+        for group, value in (("by_status", row["status"]), ("by_category", row["category"])):
+            bucket = out[group].setdefault(value, {"count": 0, "total": Decimal("0")})
+            bucket["count"] += row["count"]
+            bucket["total"] += row["total"]
+    return out
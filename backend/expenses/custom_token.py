@@ -8,6 +8,9 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 
         # Add custom claims
         token["role"] = user.role  # assumes your User model has a role field
+        token["reports_to_id"] = user.reports_to_id
+        token["username"] = user.username
+        token["is_staff"] = user.is_staff
         return token
 
     def validate(self, attrs):
@@ -0,0 +1,247 @@
+"""
+Receipt file delivery.
+
+The view does the permission check, then hands the file to one of these backends
+(setting RECEIPT_DELIVERY_BACKEND):
+
+- "django"   stream from Django; whole files go out as FileResponse, which WSGI
+             servers with wsgi.file_wrapper (gunicorn, uwsgi) send with sendfile(2)
+- "nginx"    X-Accel-Redirect to an internal location aliased to MEDIA_ROOT
+- "sendfile" X-Sendfile with the absolute path (Apache mod_xsendfile, lighttpd)
+- "redirect" 302 to the storage URL, a short-lived presigned URL, so the bucket
+             serves the bytes. Only for storage that signs its URLs ("s3" with
+             querystring_auth): a plain MEDIA_URL would let anyone holding the
+             link skip the permission check, so check_configuration() refuses it
+             at startup.
+
+"nginx" and "sendfile" need receipts on a local disk ("local" receipt storage).
+
+All of them send a strong ETag and answer If-None-Match with 304 before touching
+the file. Range requests are handled by the proxy for the offloading backends and
+here for "django".
+
+aserve_receipt() is the same for async views: with "django" the body is an async
+iterator, so under ASGI a slow download holds a coroutine rather than a thread.
+"""
+import hashlib
+import mimetypes
+import re
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import storages
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def file_etag(file_field, content_hash: str = "") -> str:
+    # content hash when known, otherwise name + size + mtime
+    if content_hash:
+        return f'"{content_hash}"'
+    storage = file_field.storage
+    stamp = f"{file_field.name}:{storage.size(file_field.name)}:{storage.get_modified_time(file_field.name).timestamp()}"
+    return f'"{hashlib.sha256(stamp.encode()).hexdigest()}"'
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [t.strip() for t in header.split(",")]
+    return any(t.removeprefix("W/") == etag for t in tags)
+
+
+def parse_range(header: str, size: int):
+    """
+    (start, end) inclusive for a single "bytes=" range, None to serve the whole file
+    (absent, malformed or multi-range header), or False if it cannot be satisfied.
+    """
+    m = RANGE_RE.match(header or "")
+    if not m:
+        return None
+    first, last = m.group(1), m.group(2)
+    if not first and not last:
+        return None
+    if not first:
+        # suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _iter_range(f, start: int, length: int):
+    try:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+async def _aiter_range(f, start: int, length: int):
+    # reads happen in the thread pool; the event loop only waits on them
+    read = sync_to_async(f.read, thread_sensitive=False)
+    try:
+        await sync_to_async(f.seek, thread_sensitive=False)(start)
+        while length > 0:
+            chunk = await read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def _byte_range(request, size: int, etag: str):
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range != etag:
+        return None
+    return parse_range(request.headers.get("Range"), size)
+
+
+def _unsatisfiable(size: int) -> HttpResponse:
+    response = HttpResponse(status=416)
+    response["Content-Range"] = f"bytes */{size}"
+    return response
+
+
+class DjangoDelivery:
+    def deliver(self, request, file_field, *, filename, download, etag):
+        size = file_field.size
+        byte_range = _byte_range(request, size, etag)
+
+        if byte_range is False:
+            return _unsatisfiable(size)
+
+        if byte_range is None:
+            return FileResponse(file_field.open("rb"), as_attachment=download, filename=filename)
+
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _iter_range(file_field.open("rb"), start, length),
+            status=206,
+            content_type=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        )
+        response["Content-Length"] = str(length)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Disposition"] = content_disposition_header(download, filename)
+        return response
+
+    async def adeliver(self, request, file_field, *, filename, download, etag):
+        size = await sync_to_async(lambda: file_field.size, thread_sensitive=False)()
+        byte_range = _byte_range(request, size, etag)
+
+        if byte_range is False:
+            return _unsatisfiable(size)
+
+        start, end = byte_range or (0, size - 1)
+        length = end - start + 1
+        f = await sync_to_async(file_field.open, thread_sensitive=False)("rb")
+        response = StreamingHttpResponse(
+            _aiter_range(f, start, length),
+            status=206 if byte_range else 200,
+            content_type=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        )
+        response["Content-Length"] = str(length)
+        if byte_range:
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Disposition"] = content_disposition_header(download, filename)
+        return response
+
+
+class NginxAccelDelivery:
+    def deliver(self, request, file_field, *, filename, download, etag):
+        response = HttpResponse(content_type=mimetypes.guess_type(filename)[0] or "application/octet-stream")
+        response["X-Accel-Redirect"] = settings.RECEIPT_ACCEL_PREFIX.rstrip("/") + "/" + quote(file_field.name)
+        response["Content-Disposition"] = content_disposition_header(download, filename)
+        return response
+
+
+class XSendfileDelivery:
+    def deliver(self, request, file_field, *, filename, download, etag):
+        response = HttpResponse(content_type=mimetypes.guess_type(filename)[0] or "application/octet-stream")
+        response["X-Sendfile"] = file_field.path
+        response["Content-Disposition"] = content_disposition_header(download, filename)
+        return response
+
+
+class RedirectDelivery:
+    def deliver(self, request, file_field, *, filename, download, etag):
+        return HttpResponseRedirect(file_field.storage.url(file_field.name))
+
+
+BACKENDS = {
+    "django": DjangoDelivery,
+    "nginx": NginxAccelDelivery,
+    "sendfile": XSendfileDelivery,
+    "redirect": RedirectDelivery,
+}
+
+
+def get_backend():
+    return BACKENDS[settings.RECEIPT_DELIVERY_BACKEND]()
+
+
+def check_configuration():
+    if settings.RECEIPT_DELIVERY_BACKEND == "redirect" and not getattr(storages["receipts"], "querystring_auth", False):
+        raise ImproperlyConfigured(
+            'RECEIPT_DELIVERY_BACKEND "redirect" needs receipt storage with presigned URLs '
+            '(RECEIPT_STORAGE_BACKEND "s3"); other storage URLs are not access-checked.'
+        )
+
+
+def _finish(response, etag: str):
+    response["ETag"] = etag
+    # behind auth: browsers may keep it but must revalidate (a 304 costs no file I/O)
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def serve_receipt(request, file_field, *, filename, download=False, content_hash=""):
+    etag = file_etag(file_field, content_hash)
+
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        response = HttpResponse(status=304)
+    else:
+        response = get_backend().deliver(request, file_field, filename=filename, download=download, etag=etag)
+        response["Accept-Ranges"] = "bytes"
+
+    return _finish(response, etag)
+
+
+async def aserve_receipt(request, file_field, *, filename, download=False, content_hash=""):
+    if content_hash:
+        etag = file_etag(file_field, content_hash)
+    else:
+        etag = await sync_to_async(file_etag, thread_sensitive=False)(file_field)
+
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        response = HttpResponse(status=304)
+    else:
+        backend = get_backend()
+        if hasattr(backend, "adeliver"):
+            response = await backend.adeliver(request, file_field, filename=filename, download=download, etag=etag)
+        else:
+            # the offloading backends only set headers
+            response = backend.deliver(request, file_field, filename=filename, download=download, etag=etag)
+        response["Accept-Ranges"] = "bytes"
+
+    return _finish(response, etag)
@@ -0,0 +1,100 @@
+"""
+Query-string filters for the claim list (GET /api/expenses/).
+
+Every filter narrows the caller's role queue and is served by an index on
+Expense / Receipt (see their Meta.indexes); bad values are a 400, not an empty page.
+
+    status=A,B  category=A,B  submitted_by=<user id>
+    amount__gte / amount__lte=<decimal>
+    created_at__gte / created_at__lte=<date or ISO datetime>   (a date __lte includes that day)
+    vendor=<prefix of the OCR vendor, any case>
+    q=<full-text search, see expenses.search>
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Exists, OuterRef
+from django.db.models.fields.json import KT
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from . import search
+from .models import Expense, Receipt
+
+
+def _choices(params, name, allowed):
+    values = [v for raw in params.getlist(name) for v in raw.split(",") if v]
+    unknown = sorted(set(values) - set(allowed))
+    if unknown:
+        raise ValidationError({name: f"Unknown value: {', '.join(unknown)}."})
+    return values
+
+
+def _decimal(params, name):
+    try:
+        value = Decimal(params[name])
+    except (InvalidOperation, ValueError):
+        value = None
+    if value is None or not value.is_finite():
+        raise ValidationError({name: "Must be a number."})
+    return value
+
+
+def _moment(params, name):
+    """(aware datetime, True if only a date was given)"""
+    raw = params[name]
+    try:
+        # date first: parse_datetime also accepts a bare date on Python 3.11+
+        day = parse_date(raw)
+        value = None if day else parse_datetime(raw)
+    except ValueError:
+        value = day = None
+    if value is None and day is None:
+        raise ValidationError({name: "Must be a date (YYYY-MM-DD) or an ISO 8601 datetime."})
+    if value is None:
+        value = datetime.combine(day, time.min)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value, day is not None
+
+
+def filter_expenses(qs, params):
+    if "status" in params:
+        qs = qs.filter(status__in=_choices(params, "status", Expense.Status.values))
+    if "category" in params:
+        qs = qs.filter(category__in=_choices(params, "category", Expense.Category.values))
+
+    if "submitted_by" in params:
+        try:
+            qs = qs.filter(submitted_by_id=int(params["submitted_by"]))
+        except ValueError:
+            raise ValidationError({"submitted_by": "Must be a user id."})
+
+    if "amount__gte" in params:
+        qs = qs.filter(amount__gte=_decimal(params, "amount__gte"))
+    if "amount__lte" in params:
+        qs = qs.filter(amount__lte=_decimal(params, "amount__lte"))
+
+    if "created_at__gte" in params:
+        qs = qs.filter(created_at__gte=_moment(params, "created_at__gte")[0])
+    if "created_at__lte" in params:
+        value, is_day = _moment(params, "created_at__lte")
+        if is_day:
+            qs = qs.filter(created_at__lt=value + timedelta(days=1))
+        else:
+            qs = qs.filter(created_at__lte=value)
+
+    vendor = params.get("vendor", "").strip().lower()
+    if vendor:
+        # matches the receipt_vendor_idx expression
+        receipts = Receipt.objects.annotate(vendor=Lower(KT("ocr_result__vendor"))).filter(
+            expense=OuterRef("pk"), vendor__startswith=vendor
+        )
+        qs = qs.filter(Exists(receipts))
+
+    q = params.get("q", "").strip()
+    if q:
+        qs = search.matching(qs, q)
+    return qs
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from expenses.models import Receipt
+from expenses.services.ocr_cache import content_sha256, store
+
+
+class Command(BaseCommand):
+    help = "Compute content_hash for receipts uploaded before hashing existed and seed the OCR cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        done = 0
+        qs = Receipt.objects.filter(content_hash="").exclude(file="").order_by("id")
+
+        for receipt in qs.iterator(chunk_size=options["batch_size"]):
+            try:
+                with receipt.file.open("rb") as f:
+                    receipt.content_hash = content_sha256(f)
+            except OSError as e:
+                self.stderr.write(f"receipt {receipt.id}: {e}")
+                continue
+
+            receipt.save(update_fields=["content_hash"])
+            if receipt.ocr_status == "SUCCESS" and receipt.ocr_result:
+                store(receipt.content_hash, receipt.ocr_result)
+            done += 1
+
+        self.stdout.write(f"Hashed {done} receipts")
@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from expenses.authentication import ReadStatelessJWTAuthentication
+from expenses.custom_token import CustomTokenObtainPairSerializer
+from expenses.views import ExpenseViewSet
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Compare GET /api/expenses/ throughput with the stock and the claims-based JWT authentication."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", required=True, help="User whose queue is listed (e.g. bench-emp-0).")
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--page-size", type=int, default=50)
+
+    def handle(self, *args, **options):
+        user = CustomUser.objects.get(username=options["username"])
+        token = CustomTokenObtainPairSerializer.get_token(user).access_token
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        url = f"/api/expenses/?page_size={options['page_size']}"
+
+        original = ExpenseViewSet.authentication_classes
+        try:
+            for label, auth_class in (
+                ("JWTAuthentication", JWTAuthentication),
+                ("ReadStatelessJWTAuthentication", ReadStatelessJWTAuthentication),
+            ):
+                ExpenseViewSet.authentication_classes = [auth_class]
+                self.report(label, client, url, options["requests"])
+        finally:
+            ExpenseViewSet.authentication_classes = original
+
+    def report(self, label, client, url, n):
+        # warm-up, and the per-request query count
+        with CaptureQueriesContext(connection) as ctx:
+            resp = client.get(url, HTTP_HOST="localhost")
+        if resp.status_code != 200:
+            self.stderr.write(f"{label}: GET returned {resp.status_code}")
+            return
+
+        started = time.perf_counter()
+        for _ in range(n):
+            client.get(url, HTTP_HOST="localhost")
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{label:32} {n / elapsed:8.1f} req/s  {elapsed / n * 1000:6.2f} ms/req  "
+            f"{len(ctx.captured_queries)} queries/req"
+        )
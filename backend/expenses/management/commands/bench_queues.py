@@ -0,0 +1,124 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from expenses import counters, search
+from expenses.models import Expense, Receipt
+from users.models import CustomUser
+
+BENCH_PREFIX = "bench-"
+
+
+class Command(BaseCommand):
+    help = "Seed synthetic claims and report EXPLAIN plans and timings for each role's queue query."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--expenses", type=int, default=1_000_000, help="Number of claims to seed.")
+        parser.add_argument("--employees", type=int, default=5_000)
+        parser.add_argument("--managers", type=int, default=200)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--runs", type=int, default=20, help="Timed executions per query.")
+        parser.add_argument("--skip-seed", action="store_true", help="Reuse previously seeded data.")
+        parser.add_argument("--cleanup", action="store_true", help="Delete seeded data and exit.")
+
+    def handle(self, *args, **options):
+        if options["cleanup"]:
+            Expense.objects.filter(title__startswith=BENCH_PREFIX).delete()
+            CustomUser.objects.filter(username__startswith=BENCH_PREFIX).delete()
+            # the raw deletes skipped record_changes(); recount what is left
+            counters.rebuild()
+            self.stdout.write("Benchmark data removed")
+            return
+
+        if not options["skip_seed"]:
+            self.seed(options)
+
+        employee = CustomUser.objects.filter(username__startswith=f"{BENCH_PREFIX}emp-").order_by("id").first()
+        manager = CustomUser.objects.filter(username__startswith=f"{BENCH_PREFIX}mgr-").order_by("id").first()
+        if not employee or not manager:
+            self.stderr.write("No benchmark users found; run without --skip-seed first.")
+            return
+
+        page = options["page_size"]
+        queues = {
+            "EMPLOYEE": Expense.objects.filter(submitted_by=employee),
+            "MANAGER": Expense.objects.filter(status=Expense.Status.SUBMITTED, current_approver=manager),
+            "FINANCE": Expense.objects.filter(status=Expense.Status.APPROVED),
+            "RECEIPTS (FINANCE)": Receipt.objects.filter(expense__status__in=[
+                Expense.Status.APPROVED,
+                Expense.Status.FINANCE_APPROVED,
+                Expense.Status.PAID,
+            ]).order_by("-id")[:page],
+        }
+        for role in ("EMPLOYEE", "MANAGER", "FINANCE"):
+            queues[role] = queues[role].order_by("-created_at", "-id")[:page]
+
+        for role, qs in queues.items():
+            self.report(role, qs, options["runs"])
+
+    def seed(self, options):
+        n_emp, n_mgr = options["employees"], options["managers"]
+        batch = options["batch_size"]
+
+        self.stdout.write(f"Seeding {n_mgr} managers, {n_emp} employees, {options['expenses']} claims...")
+        with transaction.atomic():
+            managers = CustomUser.objects.bulk_create([
+                CustomUser(username=f"{BENCH_PREFIX}mgr-{i}", role="MANAGER") for i in range(n_mgr)
+            ])
+            employees = CustomUser.objects.bulk_create([
+                CustomUser(username=f"{BENCH_PREFIX}emp-{i}", role="EMPLOYEE", reports_to=managers[i % n_mgr])
+                for i in range(n_emp)
+            ])
+
+        # realistic skew: most claims are already settled, few are waiting on someone
+        statuses = (
+            [Expense.Status.PAID] * 60
+            + [Expense.Status.FINANCE_APPROVED] * 10
+            + [Expense.Status.APPROVED] * 10
+            + [Expense.Status.REJECTED] * 5
+            + [Expense.Status.SUBMITTED] * 10
+            + [Expense.Status.DRAFT] * 5
+        )
+        categories = [c for c, _ in Expense.Category.choices]
+
+        created = 0
+        started = time.perf_counter()
+        while created < options["expenses"]:
+            rows = []
+            for _ in range(min(batch, options["expenses"] - created)):
+                emp = random.choice(employees)
+                st = random.choice(statuses)
+                rows.append(Expense(
+                    title=f"{BENCH_PREFIX}{created}",
+                    amount=Decimal(random.randint(100, 500_000)) / 100,
+                    category=random.choice(categories),
+                    status=st,
+                    submitted_by=emp,
+                    current_approver_id=emp.reports_to_id if st == Expense.Status.SUBMITTED else None,
+                ))
+                created += 1
+            # bulk_create skips what the API does on create: the search vector and the counters
+            search.refresh([e.id for e in Expense.objects.bulk_create(rows, batch_size=batch)])
+            self.stdout.write(f"  {created} claims", ending="\r")
+
+        counters.rebuild()
+        self.stdout.write(f"\nSeeded in {time.perf_counter() - started:.1f}s")
+
+    def report(self, label, qs, runs):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {label} =="))
+        self.stdout.write(qs.explain(analyze=True, buffers=True))
+
+        timings = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            list(qs)
+            timings.append((time.perf_counter() - t0) * 1000)
+        timings.sort()
+
+        p50 = timings[len(timings) // 2]
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(f"runs={runs} p50={p50:.2f}ms p95={p95:.2f}ms max={timings[-1]:.2f}ms")
@@ -0,0 +1,98 @@
+import asyncio
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.custom_token import CustomTokenObtainPairSerializer
+from expenses.services import ocr_client
+from users.models import CustomUser
+
+ENDPOINTS = {
+    "me": "/api/me/",
+    "list": "/api/expenses/?page_size=50",
+    "receipt": "/api/expenses/{expense_id}/receipt/",
+}
+READ_CHUNK = 16 * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the same endpoint on a WSGI and an ASGI deployment of this app and compare "
+        "throughput and latency. Start both first, e.g. "
+        "`gunicorn config.wsgi -w 4 --threads 8 -b :8000` and `uvicorn config.asgi:application --port 8010`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--wsgi-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--asgi-url", default="http://127.0.0.1:8010")
+        parser.add_argument("--username", required=True, help="User the requests are made as (e.g. bench-emp-0).")
+        parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="list")
+        parser.add_argument("--expense-id", type=int, help="Claim whose receipt is downloaded (--endpoint receipt).")
+        parser.add_argument("--concurrency", type=int, default=200, help="Open connections / clients in flight.")
+        parser.add_argument("--duration", type=float, default=20.0, help="Seconds per server.")
+        parser.add_argument(
+            "--slow-kbps", type=float, default=0,
+            help="Read response bodies at this rate per client, to simulate slow downloads (0 = full speed).",
+        )
+
+    def handle(self, *args, **options):
+        if ocr_client.httpx is None:
+            raise CommandError("bench_servers needs httpx installed.")
+        if options["endpoint"] == "receipt" and not options["expense_id"]:
+            raise CommandError("--endpoint receipt needs --expense-id.")
+
+        user = CustomUser.objects.get(username=options["username"])
+        token = CustomTokenObtainPairSerializer.get_token(user).access_token
+        path = ENDPOINTS[options["endpoint"]].format(expense_id=options["expense_id"])
+
+        self.stdout.write(
+            f"{options['endpoint']}: {options['concurrency']} clients, {options['duration']:.0f}s each"
+            + (f", bodies read at {options['slow_kbps']:.0f} KB/s" if options["slow_kbps"] else "")
+        )
+        for label in ("wsgi", "asgi"):
+            url = options[f"{label}_url"].rstrip("/") + path
+            stats = asyncio.run(self.run(url, str(token), options))
+            self.report(label.upper(), stats, options["duration"])
+
+    async def run(self, url, token, options):
+        httpx = ocr_client.httpx
+        limits = httpx.Limits(max_connections=options["concurrency"], max_keepalive_connections=options["concurrency"])
+        bytes_per_second = options["slow_kbps"] * 1024
+        latencies, errors = [], []
+        deadline = time.perf_counter() + options["duration"]
+
+        async def client_loop(client):
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    async with client.stream("GET", url) as resp:
+                        async for chunk in resp.aiter_bytes(READ_CHUNK):
+                            if bytes_per_second:
+                                await asyncio.sleep(len(chunk) / bytes_per_second)
+                    if resp.status_code >= 400:
+                        errors.append(resp.status_code)
+                        continue
+                except httpx.HTTPError as e:
+                    errors.append(type(e).__name__)
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        async with httpx.AsyncClient(
+            headers={"Authorization": f"Bearer {token}"}, limits=limits, timeout=60.0
+        ) as client:
+            await asyncio.gather(*(client_loop(client) for _ in range(options["concurrency"])))
+        return latencies, errors
+
+    def report(self, label, stats, duration):
+        latencies, errors = stats
+        if not latencies:
+            self.stdout.write(f"{label}: no successful requests ({len(errors)} errors, e.g. {errors[:3]})")
+            return
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f"{label}  {len(latencies) / duration:8.1f} req/s  "
+            f"p50 {statistics.median(latencies) * 1000:7.1f} ms  p99 {p99 * 1000:7.1f} ms  "
+            f"{len(errors)} errors"
+        )
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from expenses.models import Receipt
+from expenses.services.ocr_client import call_ocr_service_batch, OCRServiceError
+from expenses.services.ocr_queue import record_success
+
+
+class Command(BaseCommand):
+    help = "Re-run OCR for receipts in bulk through the OCR service's /ocr/batch endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--status", action="append", help="ocr_status to reprocess (repeatable, default FAILED).")
+        parser.add_argument("--all", action="store_true", help="Reprocess every receipt regardless of status.")
+        parser.add_argument("--batch-size", type=int, default=50, help="Files per /ocr/batch request.")
+        parser.add_argument("--limit", type=int, default=None)
+
+    def handle(self, *args, **options):
+        qs = Receipt.objects.exclude(file="").order_by("id")
+        if not options["all"]:
+            qs = qs.filter(ocr_status__in=options["status"] or ["FAILED"])
+        if options["limit"]:
+            qs = qs[:options["limit"]]
+
+        by_id = {receipt.id: receipt for receipt in qs}
+
+        ok = failed = 0
+        try:
+            for receipt_id, result, error in call_ocr_service_batch(
+                base_url=settings.OCR_SERVICE_URL,
+                files=[(receipt.id, receipt.file) for receipt in by_id.values()],
+                timeout_seconds=max(settings.OCR_TIMEOUT_SECONDS * options["batch_size"], 120),
+                batch_size=options["batch_size"],
+            ):
+                receipt = by_id[receipt_id]
+                if result is not None:
+                    record_success(receipt, result)
+                    ok += 1
+                else:
+                    receipt.ocr_status = "FAILED"
+                    receipt.ocr_error = error
+                    receipt.save(update_fields=["ocr_status", "ocr_error"])
+                    failed += 1
+        except OCRServiceError as e:
+            self.stderr.write(f"OCR batch aborted: {e}")
+
+        self.stdout.write(f"Reprocessed {ok + failed} receipts: {ok} succeeded, {failed} failed")
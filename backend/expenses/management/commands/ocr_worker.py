@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import os
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from expenses.services import ocr_client
+from expenses.services.ocr_client import breaker
+from expenses.services.ocr_queue import aprocess_receipt, claim_receipts, process_receipt
+from expenses.services.renditions import render_next
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Drain PENDING receipts from the OCR job queue (and render their previews) with N concurrent workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=settings.OCR_WORKER_CONCURRENCY)
+        parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Exit once no due receipts are left.")
+        parser.add_argument(
+            "--async",
+            action="store_true",
+            dest="use_async",
+            help="Keep --concurrency OCR calls in flight on one event loop (httpx) instead of a thread each.",
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options["concurrency"])
+        self.poll_interval = options["poll_interval"]
+        self.once = options["once"]
+        self.stop = threading.Event()
+
+        use_async = options["use_async"]
+        if use_async and ocr_client.httpx is None:
+            raise CommandError("--async needs httpx installed.")
+
+        # every worker claims its next receipt as soon as it is free, so a slow one holds up only itself;
+        # with --async the threads only render previews, which is CPU work
+        threads = min(concurrency, os.cpu_count() or 1) if use_async else concurrency
+        workers = [
+            threading.Thread(target=self.work, args=(not use_async,), name=f"ocr-worker-{i}")
+            for i in range(threads)
+        ]
+
+        self.stdout.write(f"OCR worker started (concurrency={concurrency}{', async' if use_async else ''})")
+        for worker in workers:
+            worker.start()
+        try:
+            if use_async:
+                asyncio.run(self.run_async(concurrency))
+            for worker in workers:
+                worker.join()
+        finally:
+            self.stop.set()
+            for worker in workers:
+                worker.join()
+
+        self.stdout.write("OCR worker stopped")
+
+    def work(self, ocr):
+        """One worker thread: OCR the next due receipt (if `ocr`), else render the next preview, else wait."""
+        try:
+            while not self.stop.is_set():
+                try:
+                    wait = self.step(ocr)
+                except Exception:
+                    # a receipt that failed mid-way keeps its lease and is retried once it expires
+                    logger.exception("OCR worker iteration failed")
+                    # the failure may have left this thread's connection unusable
+                    connections.close_all()
+                    wait = self.poll_interval
+
+                if wait is None:
+                    if self.once:
+                        break
+                    wait = self.poll_interval
+                if wait > 0:
+                    self.stop.wait(wait)
+        finally:
+            # the connections this thread opened
+            connections.close_all()
+
+    def step(self, ocr):
+        """Do one unit of work. Returns 0 after some work, seconds to wait, or None when idle."""
+        # don't churn the OCR queue while the OCR service is known to be down
+        wait = breaker.retry_after() if ocr else 0
+        if ocr and wait <= 0:
+            ids = claim_receipts(1)
+            if ids:
+                self.stdout.write(f"receipt {ids[0]}: {process_receipt(ids[0])}")
+                return 0
+
+        # renditions are local work and go on while OCR is paused
+        rendered = render_next()
+        if rendered is not None:
+            self.stdout.write(f"rendered previews for receipt {rendered}")
+            return 0
+
+        return wait if wait > 0 else None
+
+    async def run_async(self, concurrency):
+        httpx = ocr_client.httpx
+        limits = httpx.Limits(max_connections=settings.OCR_POOL_SIZE)
+        async with httpx.AsyncClient(limits=limits) as client:
+            await asyncio.gather(*(self.work_async(client) for _ in range(concurrency)))
+
+    async def work_async(self, client):
+        """One OCR slot on the event loop: claim a receipt, OCR it on the shared client, repeat."""
+        while not self.stop.is_set():
+            wait = breaker.retry_after()
+            if wait <= 0:
+                try:
+                    ids = await sync_to_async(claim_receipts)(1)
+                    if ids:
+                        self.stdout.write(f"receipt {ids[0]}: {await aprocess_receipt(ids[0], client=client)}")
+                        continue
+                except Exception:
+                    logger.exception("OCR worker slot failed")
+                    wait = self.poll_interval
+
+            if wait > 0:
+                await asyncio.sleep(wait)
+            elif self.once:
+                break
+            else:
+                await asyncio.sleep(self.poll_interval)
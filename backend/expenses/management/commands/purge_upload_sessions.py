@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from expenses.models import ReceiptUploadSession
+from expenses.services.chunked_upload import discard
+
+
+class Command(BaseCommand):
+    help = "Delete chunked receipt uploads that were never completed, and their staged parts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=settings.RECEIPT_UPLOAD_SESSION_HOURS)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["hours"])
+        done = 0
+
+        for session in ReceiptUploadSession.objects.filter(created_at__lt=cutoff).iterator():
+            discard(session)
+            done += 1
+
+        self.stdout.write(f"Removed {done} abandoned uploads")
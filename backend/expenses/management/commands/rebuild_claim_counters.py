@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from expenses.counters import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the dashboard claim counters from the claims (initial fill, or after manual data fixes)."
+
+    def handle(self, *args, **options):
+        rows = rebuild()
+        self.stdout.write(f"Rebuilt {rows} counter rows")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from expenses.search import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the full-text search vector of every claim (after changing what is indexed)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        done = rebuild(options["batch_size"])
+        self.stdout.write(f"Rebuilt search vectors for {done} claims")
@@ -8,5 +8,5 @@ from .roles import get_user_role
 def me(request):
     return Response({
         "username": request.user.username,
-        "role": get_user_role(request.user),
+        "role": get_user_role(request),
     })
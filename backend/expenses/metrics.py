@@ -0,0 +1,339 @@
+"""
+Request metrics in Prometheus text format (GET /metrics) and sampled profiles.
+
+RequestMetricsMiddleware times every request per view (DRF viewsets as
+`ExpenseViewSet.submit` etc.) and records, per request:
+
+- latency, response size
+- DB query count and time: an execute wrapper on every connection adds to the
+  current request's stats (a contextvar, so queries the async ORM runs in a
+  thread are counted too)
+- time in named spans: "serializer" (to_representation of our serializers) and
+  "ocr" (OCR service round trips made inside the request)
+
+Metrics are kept per process, so with several workers each one is scraped on its
+own. The registry is a few dozen lines instead of prometheus_client, which would
+need its multiprocess mode under gunicorn.
+
+With METRICS_PROFILE_SAMPLE_RATE > 0 that share of sync requests runs under
+cProfile, and those slower than METRICS_SLOW_REQUEST_MS are dumped to
+METRICS_PROFILE_DIR (open with `python -m pstats` or snakeviz).
+"""
+import bisect
+import cProfile
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[n] for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels(self.labelnames, key)} {value}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels[n] for n in self.labelnames)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(row)) for key, row in self._values.items()]
+        for key, row in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), row[:-1]):
+                cumulative += count
+                le = 'le="%s"' % bound
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {row[-1]}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}"
+
+
+REGISTRY = []
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Request latency by view.", ("view", "method", "status")
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "DB queries per request by view.", ("view",), QUERY_BUCKETS
+)
+REQUEST_DB_SECONDS = Histogram("http_request_db_seconds", "DB time per request by view.", ("view",))
+REQUEST_SPAN_SECONDS = Histogram(
+    "http_request_span_seconds", "Time per request in serializer / ocr spans, by view.", ("view", "span")
+)
+RESPONSE_BYTES = Histogram(
+    "http_response_size_bytes", "Response body size by view (streams with a Content-Length only).",
+    ("view",), SIZE_BUCKETS,
+)
+OCR_SECONDS = Histogram(
+    "ocr_request_duration_seconds", "OCR service round trips, in requests and in ocr_worker.", ("source", "outcome")
+)
+PROFILES_WRITTEN = Counter("http_request_profiles_total", "cProfile dumps written for slow requests.", ("view",))
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "spans", "open_spans")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.spans = {}
+        self.open_spans = set()
+
+
+_current = ContextVar("request_stats", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """connection execute wrapper, installed on every connection in ExpensesConfig.ready()."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def span(name):
+    """Add the time spent inside to the current request's `name` span (nested calls count once)."""
+    stats = _current.get()
+    if stats is None or name in stats.open_spans:
+        yield
+        return
+    stats.open_spans.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.open_spans.discard(name)
+        stats.spans[name] = stats.spans.get(name, 0.0) + time.perf_counter() - started
+
+
+@contextmanager
+def ocr_round_trip():
+    from .services.ocr_client import OCRServiceUnavailable
+
+    source = "request" if _current.get() is not None else "worker"
+    outcome = "error"
+    started = time.perf_counter()
+    try:
+        with span("ocr"):
+            yield
+        outcome = "ok"
+    except OCRServiceUnavailable:
+        outcome = "unavailable"
+        raise
+    finally:
+        OCR_SECONDS.observe(time.perf_counter() - started, source=source, outcome=outcome)
+
+
+class TimedRepresentationMixin:
+    """Serializer mixin: to_representation time goes to the "serializer" span."""
+
+    def to_representation(self, instance):
+        with span("serializer"):
+            return super().to_representation(instance)
+
+
+def view_label(view_func, method: str) -> str:
+    cls = getattr(view_func, "cls", None)
+    if cls is not None:
+        # one label per viewset action: ExpenseViewSet.list / .submit / .bulk_approve ...
+        action = (getattr(view_func, "actions", None) or {}).get(method.lower())
+        return f"{cls.__name__}.{action}" if action else cls.__name__
+    return f"{view_func.__module__}.{getattr(view_func, '__name__', type(view_func).__name__)}"
+
+
+_profile_lock = threading.Lock()
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        profiler = self._start_profile()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            elapsed = time.perf_counter() - started
+            if profiler:
+                profiler.disable()
+                _profile_lock.release()
+            _current.reset(token)
+        self._record(request, response, stats, elapsed, profiler)
+        return response
+
+    async def __acall__(self, request):
+        # async requests are not profiled: cProfile would mix in every coroutine on the loop
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+        self._record(request, response, stats, elapsed, None)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_view = view_label(view_func, request.method)
+
+    def _start_profile(self):
+        rate = settings.METRICS_PROFILE_SAMPLE_RATE
+        if rate <= 0 or random.random() >= rate:
+            return None
+        # one profiler at a time per process (Python 3.12+ allows no more)
+        if not _profile_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _record(self, request, response, stats, elapsed, profiler):
+        view = getattr(request, "_metrics_view", "unresolved")
+        REQUEST_SECONDS.observe(elapsed, view=view, method=request.method, status=response.status_code)
+        REQUEST_QUERIES.observe(stats.queries, view=view)
+        REQUEST_DB_SECONDS.observe(stats.db_seconds, view=view)
+        for name, seconds in stats.spans.items():
+            REQUEST_SPAN_SECONDS.observe(seconds, view=view, span=name)
+
+        size = None
+        if not response.streaming:
+            size = len(response.content)
+        elif response.has_header("Content-Length"):
+            size = int(response["Content-Length"])
+        if size is not None:
+            RESPONSE_BYTES.observe(size, view=view)
+
+        elapsed_ms = elapsed * 1000
+        if elapsed_ms < settings.METRICS_SLOW_REQUEST_MS:
+            return
+        spans = " ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in stats.spans.items())
+        logger.warning(
+            "slow request %s %s view=%s status=%s %.0fms queries=%s db=%.0fms %s",
+            request.method, request.path, view, response.status_code, elapsed_ms,
+            stats.queries, stats.db_seconds * 1000, spans,
+        )
+        if profiler:
+            os.makedirs(settings.METRICS_PROFILE_DIR, exist_ok=True)
+            path = os.path.join(
+                settings.METRICS_PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{view}-{elapsed_ms:.0f}ms.prof"
+            )
+            profiler.dump_stats(path)
+            PROFILES_WRITTEN.inc(view=view)
+
+
+def _breaker_samples():
+    from .services.ocr_client import breaker
+
+    snap = breaker.snapshot()
+    yield "# HELP ocr_breaker_state OCR circuit breaker state of this process (1 = current)."
+    yield "# TYPE ocr_breaker_state gauge"
+    for state in ("closed", "open", "half_open"):
+        yield f'ocr_breaker_state{{state="{state}"}} {int(snap["state"] == state)}'
+    yield "# TYPE ocr_breaker_consecutive_failures gauge"
+    yield f"ocr_breaker_consecutive_failures {snap['consecutive_failures']}"
+    yield "# TYPE ocr_breaker_opened_total counter"
+    yield f"ocr_breaker_opened_total {snap['opened_total']}"
+    yield "# TYPE ocr_breaker_short_circuited_total counter"
+    yield f"ocr_breaker_short_circuited_total {snap['short_circuited_total']}"
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    lines.extend(_breaker_samples())
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """GET /metrics; needs `Authorization: Bearer $METRICS_TOKEN`, or DEBUG when no token is set."""
+    token = settings.METRICS_TOKEN
+    if token:
+        allowed = request.headers.get("Authorization") == f"Bearer {token}"
+    else:
+        allowed = settings.DEBUG
+    if not allowed:
+        return HttpResponse(status=403)
+    return HttpResponse(render(), content_type="text/plain; version=0.0.4; charset=utf-8")
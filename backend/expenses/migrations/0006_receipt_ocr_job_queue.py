@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("expenses", "0005_expense_current_approver_alter_expense_status_and_more"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="receipt",
+            name="ocr_status",
+            field=models.CharField(
+                choices=[
+                    ("PENDING", "Pending"),
+                    ("PROCESSING", "Processing"),
+                    ("SUCCESS", "Success"),
+                    ("FAILED", "Failed"),
+                ],
+                default="PENDING",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="receipt",
+            name="ocr_attempts",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="receipt",
+            name="ocr_next_attempt_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="receipt",
+            name="ocr_locked_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
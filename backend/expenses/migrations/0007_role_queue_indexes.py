@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("expenses", "0006_receipt_ocr_job_queue"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="expense",
+            index=models.Index(
+                condition=models.Q(("status", "SUBMITTED")),
+                fields=["current_approver", "-created_at", "-id"],
+                name="expense_submitted_queue_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="expense",
+            index=models.Index(
+                fields=["status", "-created_at", "-id"],
+                name="expense_status_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="expense",
+            index=models.Index(
+                fields=["submitted_by", "-created_at", "-id"],
+                name="expense_submitter_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="receipt",
+            index=models.Index(
+                condition=models.Q(("ocr_status__in", ["PENDING", "PROCESSING"])),
+                fields=["id"],
+                name="receipt_ocr_queue_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="approvalhistory",
+            index=models.Index(
+                fields=["expense", "timestamp"],
+                name="approvalhistory_expense_ts_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("expenses", "0007_role_queue_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="receipt",
+            name="content_hash",
+            field=models.CharField(blank=True, db_index=True, default="", max_length=64),
+        ),
+        migrations.CreateModel(
+            name="OCRResultCache",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("content_hash", models.CharField(max_length=64)),
+                ("ocr_version", models.CharField(max_length=40)),
+                ("result", models.JSONField()),
+                ("confidence", models.FloatField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("content_hash", "ocr_version"),
+                        name="ocr_cache_hash_version_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("expenses", "0008_receipt_content_hash_ocrresultcache"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="receipt",
+            name="thumb",
+            field=models.FileField(blank=True, upload_to="receipts/renditions/"),
+        ),
+        migrations.AddField(
+            model_name="receipt",
+            name="preview",
+            field=models.FileField(blank=True, upload_to="receipts/renditions/"),
+        ),
+        migrations.AddField(
+            model_name="receipt",
+            name="rendition_status",
+            field=models.CharField(
+                choices=[
+                    ("PENDING", "Pending"),
+                    ("DONE", "Done"),
+                    ("SKIPPED", "Skipped"),
+                    ("FAILED", "Failed"),
+                ],
+                default="PENDING",
+                max_length=10,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="receipt",
+            index=models.Index(
+                condition=models.Q(("rendition_status", "PENDING")),
+                fields=["id"],
+                name="receipt_rendition_queue_idx",
+            ),
+        ),
+    ]
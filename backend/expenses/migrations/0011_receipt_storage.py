@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:00
+
+import expenses.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("expenses", "0010_receiptuploadsession"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="expense",
+            name="receipt",
+            field=models.FileField(
+                blank=True,
+                null=True,
+                storage=expenses.storage.receipt_storage,
+                upload_to="receipts/",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="receipt",
+            name="file",
+            field=models.FileField(storage=expenses.storage.receipt_storage, upload_to="receipts/"),
+        ),
+        migrations.AlterField(
+            model_name="receipt",
+            name="thumb",
+            field=models.FileField(
+                blank=True,
+                storage=expenses.storage.receipt_storage,
+                upload_to="receipts/renditions/",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="receipt",
+            name="preview",
+            field=models.FileField(
+                blank=True,
+                storage=expenses.storage.receipt_storage,
+                upload_to="receipts/renditions/",
+            ),
+        ),
+    ]
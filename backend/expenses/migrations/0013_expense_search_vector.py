@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("expenses", "0012_claimcounter"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="expense",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="expense",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"],
+                name="expense_search_idx",
+            ),
+        ),
+    ]
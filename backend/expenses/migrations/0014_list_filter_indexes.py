@@ -0,0 +1,60 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:30
+
+import django.contrib.postgres.indexes
+import django.db.models.fields.json
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("expenses", "0013_expense_search_vector"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="expense",
+            index=models.Index(
+                condition=models.Q(("status", "SUBMITTED")),
+                fields=["current_approver", "-amount", "-id"],
+                name="expense_submitted_amount_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="expense",
+            index=models.Index(
+                fields=["status", "-amount", "-id"],
+                name="expense_status_amount_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="expense",
+            index=models.Index(
+                fields=["submitted_by", "-amount", "-id"],
+                name="expense_submitter_amount_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="expense",
+            index=django.contrib.postgres.indexes.BrinIndex(
+                fields=["created_at"],
+                name="expense_created_brin",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="receipt",
+            index=models.Index(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Lower(
+                        django.db.models.fields.json.KT("ocr_result__vendor")
+                    ),
+                    name="text_pattern_ops",
+                ),
+                models.F("expense"),
+                name="receipt_vendor_idx",
+            ),
+        ),
+    ]
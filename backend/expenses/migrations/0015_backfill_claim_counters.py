@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    from expenses.counters import rebuild
+
+    rebuild(apps.get_model("expenses", "Expense"), apps.get_model("expenses", "ClaimCounter"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("expenses", "0014_list_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    from expenses.search import rebuild
+
+    rebuild(expense_model=apps.get_model("expenses", "Expense"), receipt_model=apps.get_model("expenses", "Receipt"))
+
+
+class Migration(migrations.Migration):
+    # batches commit one by one instead of in a single long transaction
+    atomic = False
+
+    dependencies = [
+        ("expenses", "0015_backfill_claim_counters"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
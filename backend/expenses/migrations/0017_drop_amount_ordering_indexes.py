@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("expenses", "0016_backfill_search_vectors"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="expense",
+            name="expense_submitted_amount_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="expense",
+            name="expense_status_amount_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="expense",
+            name="expense_submitter_amount_idx",
+        ),
+    ]
@@ -1,6 +1,14 @@
+import uuid
+
+from django.contrib.postgres.indexes import BrinIndex, GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.fields.json import KT
+from django.db.models.functions import Lower
 from django.conf import settings
 
+from .storage import receipt_storage
+
 
 class Expense(models.Model):
     class Category(models.TextChoices):
@@ -32,7 +40,7 @@ class Expense(models.Model):
     )
 
     # Optional legacy field (you already use Receipt model too)
-    receipt = models.FileField(upload_to="receipts/", blank=True, null=True)
+    receipt = models.FileField(upload_to="receipts/", storage=receipt_storage, blank=True, null=True)
 
     status = models.CharField(max_length=30, choices=Status.choices, default=Status.DRAFT)
 
@@ -67,6 +75,24 @@ class Expense(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # claim text + comments + receipts' OCR text, maintained by expenses.search.refresh()
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        # matched to the role queues in ExpenseViewSet.get_queryset (always ordered newest first)
+        indexes = [
+            models.Index(
+                fields=["current_approver", "-created_at", "-id"],
+                name="expense_submitted_queue_idx",
+                condition=models.Q(status="SUBMITTED"),
+            ),
+            models.Index(fields=["status", "-created_at", "-id"], name="expense_status_created_idx"),
+            models.Index(fields=["submitted_by", "-created_at", "-id"], name="expense_submitter_created_idx"),
+            # created_at range scans over history; rows are inserted in created_at order, so BRIN stays tiny
+            BrinIndex(fields=["created_at"], name="expense_created_brin"),
+            GinIndex(fields=["search_vector"], name="expense_search_idx"),
+        ]
+
     def can_approve_by_manager(self):
         return self.status == self.Status.SUBMITTED
 
@@ -79,10 +105,13 @@ class Expense(models.Model):
 
 class Receipt(models.Model):
     expense = models.ForeignKey(Expense, on_delete=models.CASCADE, related_name="receipts")
-    file = models.FileField(upload_to="receipts/")
+    file = models.FileField(upload_to="receipts/", storage=receipt_storage)
+    # SHA-256 of the file bytes: OCR cache key and duplicate-receipt detection
+    content_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)
 
     OCR_STATUS_CHOICES = [
         ("PENDING", "Pending"),
+        ("PROCESSING", "Processing"),
         ("SUCCESS", "Success"),
         ("FAILED", "Failed"),
     ]
@@ -91,12 +120,119 @@ class Receipt(models.Model):
     ocr_result = models.JSONField(null=True, blank=True)
     ocr_error = models.TextField(null=True, blank=True)
 
+    # OCR job queue bookkeeping (drained by `manage.py ocr_worker`)
+    ocr_attempts = models.PositiveSmallIntegerField(default=0)
+    ocr_next_attempt_at = models.DateTimeField(null=True, blank=True)
+    ocr_locked_at = models.DateTimeField(null=True, blank=True)
+
+    # small renditions for the review screens, rendered by `manage.py ocr_worker`
+    RENDITION_STATUS_CHOICES = [
+        ("PENDING", "Pending"),
+        ("DONE", "Done"),
+        ("SKIPPED", "Skipped"),
+        ("FAILED", "Failed"),
+    ]
+    thumb = models.FileField(upload_to="receipts/renditions/", storage=receipt_storage, blank=True)
+    preview = models.FileField(upload_to="receipts/renditions/", storage=receipt_storage, blank=True)
+    rendition_status = models.CharField(max_length=10, choices=RENDITION_STATUS_CHOICES, default="PENDING")
+
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # keeps `ocr_worker` claims cheap once most receipts are done
+            models.Index(
+                fields=["id"],
+                name="receipt_ocr_queue_idx",
+                condition=models.Q(ocr_status__in=["PENDING", "PROCESSING"]),
+            ),
+            models.Index(
+                fields=["id"],
+                name="receipt_rendition_queue_idx",
+                condition=models.Q(rendition_status="PENDING"),
+            ),
+            # ?vendor= prefix filter on the claim list (expenses.filters)
+            models.Index(
+                OpClass(Lower(KT("ocr_result__vendor")), name="text_pattern_ops"),
+                models.F("expense"),
+                name="receipt_vendor_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"Receipt({self.id}) for Expense({self.expense_id})"
 
 
+class OCRResultCache(models.Model):
+    """OCR output per receipt content, so re-uploads of the same file skip the OCR service."""
+
+    content_hash = models.CharField(max_length=64)
+    ocr_version = models.CharField(max_length=40)
+    result = models.JSONField()
+    confidence = models.FloatField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["content_hash", "ocr_version"], name="ocr_cache_hash_version_uniq"),
+        ]
+
+    def __str__(self):
+        return f"OCRResultCache({self.content_hash[:12]}, {self.ocr_version})"
+
+
+class ReceiptUploadSession(models.Model):
+    """A resumable chunked receipt upload in progress; parts are appended to a staging file."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    expense = models.ForeignKey(Expense, on_delete=models.CASCADE, related_name="upload_sessions")
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    # bytes received so far; the next part must start here
+    offset = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"ReceiptUploadSession({self.id}, {self.offset}/{self.size})"
+
+
+class ClaimCounter(models.Model):
+    """
+    Denormalized claim count and amount per (scope, user, status, category), kept in step
+    with Expense by expenses.counters in the same transaction as every change.
+    """
+    class Scope(models.TextChoices):
+        SUBMITTER = "SUBMITTER", "Submitted by user"
+        APPROVER = "APPROVER", "Waiting on user"
+        ALL = "ALL", "All claims"
+
+    scope = models.CharField(max_length=10, choices=Scope.choices)
+    # NULL for the ALL scope
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE)
+    status = models.CharField(max_length=30, choices=Expense.Status.choices)
+    category = models.CharField(max_length=20, choices=Expense.Category.choices)
+    count = models.BigIntegerField(default=0)
+    total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["scope", "user", "status", "category"],
+                name="claimcounter_user_key",
+                condition=models.Q(user__isnull=False),
+            ),
+            models.UniqueConstraint(
+                fields=["scope", "status", "category"],
+                name="claimcounter_all_key",
+                condition=models.Q(user__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.user_id}:{self.status}:{self.category} = {self.count}"
+
+
 class ApprovalHistory(models.Model):
     class Action(models.TextChoices):
         SUBMITTED = "SUBMITTED", "Submitted"
@@ -113,5 +249,10 @@ class ApprovalHistory(models.Model):
     remarks = models.TextField(blank=True, default="")
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["expense", "timestamp"], name="approvalhistory_expense_ts_idx"),
+        ]
+
     def __str__(self):
         return f"{self.expense_id} - {self.action}"
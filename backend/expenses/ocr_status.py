@@ -0,0 +1,10 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from .services.ocr_client import breaker
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def ocr_status(request):
+    # circuit breaker state of this process's OCR client (closed / open / half_open)
+    return Response(breaker.snapshot())
@@ -0,0 +1,33 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+
+
+class ExpenseCursorPagination(CursorPagination):
+    # DRF positions the cursor on the first key only (WHERE created_at < p) and steps over
+    # rows that tie on it with an offset; created_at is near-unique, so that offset stays
+    # ~0. "-id" just makes the order inside a tie deterministic.
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    # ?ordering= whitelist; each one is an index scan on every role queue (Expense.Meta.indexes).
+    # Only near-unique leading keys: on e.g. amount, large tie groups would page by offset.
+    orderings = {
+        "-created_at": ("-created_at", "-id"),
+        "created_at": ("created_at", "id"),
+    }
+
+    def get_ordering(self, request, queryset, view):
+        value = request.query_params.get("ordering")
+        if not value:
+            return self.ordering
+        if value not in self.orderings:
+            raise ValidationError({"ordering": f"Must be one of: {', '.join(self.orderings)}."})
+        return self.orderings[value]
+
+
+class IdCursorPagination(CursorPagination):
+    # REST_FRAMEWORK's DEFAULT_PAGINATION_CLASS (receipts use it too): newest first by id
+    ordering = "-id"
+    page_size_query_param = "page_size"
+    max_page_size = 200
@@ -1,9 +1,79 @@
-def get_user_role(user):
+"""
+Who is asking: role (EMPLOYEE / MANAGER / FINANCE) and reports_to_id of the caller.
+
+Resolved without touching the database whenever possible:
+
+1. the user instance itself when it is a loaded CustomUser (writes, session / basic auth)
+2. validated JWT claims (`role`, `reports_to_id`, added by CustomTokenObtainPairSerializer)
+   for the ClaimsUser that reads get
+3. a per-process TTL cache keyed by user id, dropped on every CustomUser save/delete
+
+Claims are as fresh as the access token (SIMPLE_JWT ACCESS_TOKEN_LIFETIME), so they
+only ever decide reads; writes load the user and see its current role and manager.
+"""
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+
+class UserAccess(NamedTuple):
+    role: Optional[str]
+    reports_to_id: Optional[int]
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _cached_access(user_id) -> UserAccess:
+    now = time.monotonic()
+    with _cache_lock:
+        hit = _cache.get(user_id)
+        if hit and hit[0] > now:
+            return hit[1]
+
+    row = get_user_model().objects.filter(pk=user_id).values_list("role", "reports_to_id").first()
+    access = UserAccess(*row) if row else UserAccess(None, None)
+
+    with _cache_lock:
+        _cache[user_id] = (now + settings.ROLE_CACHE_TTL_SECONDS, access)
+    return access
+
+
+def invalidate_user(user_id) -> None:
+    with _cache_lock:
+        _cache.pop(user_id, None)
+
+
+def get_user_access(user, token=None) -> Optional[UserAccess]:
     if not user or not user.is_authenticated:
         return None
-    names = set(user.groups.values_list("name", flat=True))
-    if "finance" in names:
-        return "finance"
-    if "manager" in names:
-        return "manager"
-    return "employee"
+
+    if isinstance(user, get_user_model()):
+        return UserAccess(user.role, user.reports_to_id)
+
+    if token is not None and "role" in token and "reports_to_id" in token:
+        return UserAccess(token["role"], token["reports_to_id"])
+
+    return _cached_access(user.id)
+
+
+def request_access(request) -> Optional[UserAccess]:
+    # resolved once per request
+    access = getattr(request, "_user_access", None)
+    if access is None:
+        access = get_user_access(request.user, getattr(request, "auth", None))
+        request._user_access = access
+    return access
+
+
+def get_user_role(request) -> Optional[str]:
+    access = request_access(request)
+    return access.role if access else None
+
+
+def user_saved(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
@@ -0,0 +1,74 @@
+"""
+Full-text search over claims (Expense.search_vector, GIN-indexed).
+
+The vector covers the claim text, the manager / finance comments and the OCR
+vendor and raw text of the claim's receipts. It is rebuilt in the database by
+refresh() after every write that changes one of those: claim create / edit,
+workflow transitions that set a comment, and OCR completion.
+Existing claims are filled by migration 0016; `manage.py rebuild_search_vectors`
+recomputes every vector after changing what is indexed.
+"""
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db.models import OuterRef, Subquery
+from django.db.models.fields.json import KT
+
+from .models import Expense, Receipt
+
+CONFIG = "english"
+
+# Expense fields that feed the vector; writes touching none of them skip the refresh
+SEARCH_FIELDS = {"title", "description", "manager_comment", "finance_comment"}
+
+
+def _ocr_text(key: str, receipt_model=Receipt):
+    """All receipts' OCR `key` for the outer claim, space-joined."""
+    return Subquery(
+        receipt_model.objects.filter(expense=OuterRef("pk"), ocr_status="SUCCESS")
+        .values("expense")
+        .annotate(text=StringAgg(KT(f"ocr_result__{key}"), delimiter=" "))
+        .values("text")
+    )
+
+
+def search_vector(receipt_model=Receipt):
+    return (
+        SearchVector("title", weight="A", config=CONFIG)
+        + SearchVector(_ocr_text("vendor", receipt_model), weight="A", config=CONFIG)
+        + SearchVector("description", weight="B", config=CONFIG)
+        + SearchVector("manager_comment", "finance_comment", weight="C", config=CONFIG)
+        + SearchVector(_ocr_text("raw_text", receipt_model), weight="D", config=CONFIG)
+    )
+
+
+def refresh(expense_ids, expense_model=Expense, receipt_model=Receipt) -> None:
+    ids = [pk for pk in expense_ids if pk is not None]
+    if ids:
+        expense_model.objects.filter(pk__in=ids).update(search_vector=search_vector(receipt_model))
+
+
+def rebuild(batch_size: int = 1000, expense_model=Expense, receipt_model=Receipt) -> int:
+    """
+    Recompute every claim's vector; returns the number of claims.
+    A data migration passes its historical models.
+    """
+    last_id, done = 0, 0
+    while True:
+        ids = list(
+            expense_model.objects.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return done
+        # one short UPDATE per batch, so live writes are never blocked for long
+        refresh(ids, expense_model, receipt_model)
+        last_id, done = ids[-1], done + len(ids)
+
+
+def search_query(q: str) -> SearchQuery:
+    # websearch syntax: quoted phrases, OR, -exclusion; never raises on user input
+    return SearchQuery(q, search_type="websearch", config=CONFIG)
+
+
+def matching(qs, q: str):
+    """Claims in `qs` matching `q`; keeps the caller's ordering (lists are cursor-paginated)."""
+    return qs.filter(search_vector=search_query(q))
@@ -1,10 +1,13 @@
 from rest_framework import serializers
 from django.conf import settings
-from .models import Expense, Receipt, ApprovalHistory
-from .services.ocr_client import call_ocr_service, OCRServiceError
+from .metrics import TimedRepresentationMixin
+from .models import Expense, Receipt, ReceiptUploadSession, ApprovalHistory
+from .services.ocr_cache import apply_cached_result, content_sha256
+from .services.ocr_queue import run_inline
+from .services.renditions import render_receipt
 
 
-class ApprovalHistorySerializer(serializers.ModelSerializer):
+class ApprovalHistorySerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     approver_username = serializers.SerializerMethodField()
 
     class Meta:
@@ -25,7 +28,7 @@ class ApprovalHistorySerializer(serializers.ModelSerializer):
         return None
 
 
-class ExpenseSerializer(serializers.ModelSerializer):
+class ExpenseSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     has_receipt = serializers.SerializerMethodField()
 
     # ✅ NEW: approval history included in claim detail response
@@ -84,6 +87,9 @@ class ExpenseSerializer(serializers.ModelSerializer):
         # supports both old Expense.receipt and Receipt model
         if getattr(obj, "receipt", None):
             return True
+        # annotated by ExpenseViewSet.get_queryset to avoid a query per row
+        if hasattr(obj, "has_receipts"):
+            return obj.has_receipts
         return obj.receipts.exists()
 
     def get_submitted_by_username(self, obj):
@@ -93,33 +99,92 @@ class ExpenseSerializer(serializers.ModelSerializer):
         return obj.current_approver.username if getattr(obj, "current_approver", None) else None
 
 
-class ReceiptUploadSerializer(serializers.ModelSerializer):
+class ExpenseListSerializer(ExpenseSerializer):
+    """
+    Slim row for list endpoints: no description and no nested approval history.
+    The full ExpenseSerializer is used for retrieve and workflow actions.
+    """
+
+    class Meta(ExpenseSerializer.Meta):
+        fields = [
+            "id",
+            "title",
+            "amount",
+            "category",
+            "status",
+            "submitted_by",
+            "submitted_by_username",
+            "current_approver",
+            "current_approver_username",
+            "created_at",
+            "updated_at",
+            "has_receipt",
+        ]
+        read_only_fields = [
+            "submitted_by",
+            "submitted_by_username",
+            "current_approver",
+            "current_approver_username",
+            "created_at",
+            "updated_at",
+            "has_receipt",
+        ]
+
+
+class ReceiptUploadSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    is_duplicate = serializers.SerializerMethodField()
+
     class Meta:
         model = Receipt
-        fields = ["id", "expense", "file", "ocr_status", "ocr_confidence", "ocr_result", "ocr_error"]
-        read_only_fields = ["ocr_status", "ocr_confidence", "ocr_result", "ocr_error"]
+        fields = [
+            "id", "expense", "file", "content_hash", "is_duplicate",
+            "ocr_status", "ocr_confidence", "ocr_result", "ocr_error", "rendition_status",
+        ]
+        read_only_fields = [
+            "content_hash", "is_duplicate", "ocr_status", "ocr_confidence", "ocr_result", "ocr_error", "rendition_status",
+        ]
+
+    def get_is_duplicate(self, obj):
+        # same file already attached to another claim
+        if hasattr(obj, "has_duplicates"):
+            return obj.has_duplicates
+        if not obj.content_hash:
+            return False
+        return Receipt.objects.filter(content_hash=obj.content_hash).exclude(expense_id=obj.expense_id).exists()
 
     def create(self, validated_data):
+        # OCR runs out of band: the receipt is queued as PENDING and picked up by `manage.py ocr_worker`
+        # chunked uploads arrive with the hash already computed part by part
+        if not validated_data.get("content_hash"):
+            validated_data["content_hash"] = content_sha256(validated_data["file"])
         receipt = super().create(validated_data)
 
-        # default
-        receipt.ocr_status = "PENDING"
-        receipt.save(update_fields=["ocr_status"])
-
-        try:
-            ocr_json = call_ocr_service(
-                base_url=settings.OCR_SERVICE_URL,
-                file_path=receipt.file.path,
-                timeout_seconds=settings.OCR_TIMEOUT_SECONDS,
-            )
-            receipt.ocr_status = "SUCCESS"
-            receipt.ocr_result = ocr_json
-            receipt.ocr_confidence = ocr_json.get("confidence")
-            receipt.ocr_error = None
-            receipt.save(update_fields=["ocr_status", "ocr_result", "ocr_confidence", "ocr_error"])
-        except OCRServiceError as e:
-            receipt.ocr_status = "FAILED"
-            receipt.ocr_error = str(e)
-            receipt.save(update_fields=["ocr_status", "ocr_error"])
+        if not settings.OCR_ASYNC:
+            # no worker running: previews are rendered in the request as well
+            render_receipt(receipt)
+
+        # duplicate content: reuse the earlier OCR result, nothing to queue
+        if apply_cached_result(receipt):
+            return receipt
+
+        if not settings.OCR_ASYNC:
+            run_inline(receipt)
 
         return receipt
+
+
+class ReceiptUploadSessionSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    part_max_bytes = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReceiptUploadSession
+        fields = ["id", "expense", "filename", "size", "offset", "part_max_bytes", "created_at"]
+        read_only_fields = ["id", "offset", "part_max_bytes", "created_at"]
+
+    def get_part_max_bytes(self, obj):
+        return settings.RECEIPT_UPLOAD_PART_MAX_BYTES
+
+    def validate_size(self, value):
+        if value <= 0 or value > settings.RECEIPT_UPLOAD_MAX_BYTES:
+            raise serializers.ValidationError(f"File size must be 1..{settings.RECEIPT_UPLOAD_MAX_BYTES} bytes.")
+        return value
@@ -0,0 +1,160 @@
+"""
+Resumable chunked receipt uploads: init -> PUT parts in order -> complete.
+
+Parts are appended to a staging file under RECEIPT_UPLOAD_STAGING_DIR and fed
+to a SHA-256 as they arrive, so `complete` already knows the content hash and
+FileSystemStorage moves the staging file into place instead of copying it.
+The running hash lives in this process; if the next part lands on another
+process (or after a restart) the hash is rebuilt from the staged bytes once.
+With several Django nodes the staging directory must be shared between them.
+With object storage the staged file is streamed into the bucket instead of moved.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+
+from ..models import ReceiptUploadSession
+
+CHUNK_SIZE = 64 * 1024
+MAX_HASHERS = 256
+
+
+class UploadError(Exception):
+    pass
+
+
+class UploadOffsetMismatch(UploadError):
+    def __init__(self, expected: int):
+        super().__init__(f"Expected offset {expected}.")
+        self.expected = expected
+
+
+class StagedFile(File):
+    """The assembled upload; storages that can move files use temporary_file_path()."""
+
+    def __init__(self, path: str, name: str):
+        super().__init__(open(path, "rb"), name=name)
+        self._path = path
+
+    def temporary_file_path(self) -> str:
+        return self._path
+
+
+# session id -> (offset, running sha256)
+_hashers = OrderedDict()
+_hashers_lock = threading.Lock()
+
+
+def _take_hasher(session_id, offset: int, path: str):
+    with _hashers_lock:
+        hit = _hashers.pop(session_id, None)
+    if hit and hit[0] == offset:
+        return hit[1]
+
+    h = hashlib.sha256()
+    remaining = offset
+    with open(path, "rb") as f:
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            h.update(chunk)
+            remaining -= len(chunk)
+    return h
+
+
+def _keep_hasher(session_id, offset: int, h) -> None:
+    with _hashers_lock:
+        _hashers[session_id] = (offset, h)
+        while len(_hashers) > MAX_HASHERS:
+            _hashers.popitem(last=False)
+
+
+def staging_path(session: ReceiptUploadSession) -> str:
+    return os.path.join(settings.RECEIPT_UPLOAD_STAGING_DIR, f"{session.id}.part")
+
+
+def start_session(*, expense, user, filename: str, size: int) -> ReceiptUploadSession:
+    session = ReceiptUploadSession.objects.create(
+        expense=expense, created_by=user, filename=os.path.basename(filename), size=size
+    )
+    os.makedirs(settings.RECEIPT_UPLOAD_STAGING_DIR, exist_ok=True)
+    open(staging_path(session), "wb").close()
+    return session
+
+
+def _check_part(session: ReceiptUploadSession, offset: int, length: int) -> None:
+    if offset != session.offset:
+        raise UploadOffsetMismatch(session.offset)
+    if length <= 0 or length > settings.RECEIPT_UPLOAD_PART_MAX_BYTES:
+        raise UploadError(f"Part size must be 1..{settings.RECEIPT_UPLOAD_PART_MAX_BYTES} bytes.")
+    if offset + length > session.size:
+        raise UploadError("Part goes past the declared file size.")
+
+
+def append_part(session_id, *, offset: int, length: int, stream) -> ReceiptUploadSession:
+    """
+    Write `length` bytes from `stream` at `offset`, which must be the session's current offset.
+
+    The part is first received into a temp file with no transaction open, so a slow
+    client holds no DB lock; the session row is only locked to re-check the offset
+    and append, which is a local copy. A part that fails half-way never reaches the
+    staging file.
+    """
+    _check_part(ReceiptUploadSession.objects.get(pk=session_id), offset, length)
+
+    with tempfile.TemporaryFile(dir=settings.RECEIPT_UPLOAD_STAGING_DIR) as part:
+        received = 0
+        while received < length:
+            chunk = stream.read(min(CHUNK_SIZE, length - received))
+            if not chunk:
+                break
+            part.write(chunk)
+            received += len(chunk)
+        if received != length:
+            raise UploadError("Part ended before Content-Length bytes were received.")
+
+        with transaction.atomic():
+            # a duplicate of this part may have been appended while it was being received
+            session = ReceiptUploadSession.objects.select_for_update().get(pk=session_id)
+            _check_part(session, offset, length)
+
+            path = staging_path(session)
+            h = _take_hasher(session.id, offset, path)
+            part.seek(0)
+            with open(path, "r+b") as f:
+                f.seek(offset)
+                f.truncate()
+                while chunk := part.read(CHUNK_SIZE):
+                    f.write(chunk)
+                    h.update(chunk)
+
+            session.offset = offset + length
+            session.save(update_fields=["offset"])
+            _keep_hasher(session.id, session.offset, h)
+    return session
+
+
+def assembled_file(session: ReceiptUploadSession):
+    """(StagedFile, sha256 hex) for a fully received session; call with the session row locked."""
+    if session.offset != session.size:
+        raise UploadError(f"Upload incomplete: {session.offset} of {session.size} bytes received.")
+    path = staging_path(session)
+    digest = _take_hasher(session.id, session.offset, path).hexdigest()
+    return StagedFile(path, session.filename), digest
+
+
+def discard(session: ReceiptUploadSession) -> None:
+    with _hashers_lock:
+        _hashers.pop(session.id, None)
+    try:
+        os.remove(staging_path(session))
+    except FileNotFoundError:
+        pass
+    session.delete()
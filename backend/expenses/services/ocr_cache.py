@@ -0,0 +1,52 @@
+import hashlib
+
+from django.conf import settings
+
+from .. import search
+from ..models import OCRResultCache, Receipt
+
+
+def content_sha256(f) -> str:
+    # f is a Django File/UploadedFile; chunks() rewinds before reading
+    h = hashlib.sha256()
+    for chunk in f.chunks():
+        h.update(chunk)
+    f.seek(0)
+    return h.hexdigest()
+
+
+def lookup(content_hash: str):
+    if not content_hash:
+        return None
+    return OCRResultCache.objects.filter(
+        content_hash=content_hash, ocr_version=settings.OCR_CACHE_VERSION
+    ).first()
+
+
+def store(content_hash: str, ocr_json: dict) -> None:
+    if not content_hash:
+        return
+    OCRResultCache.objects.update_or_create(
+        content_hash=content_hash,
+        ocr_version=settings.OCR_CACHE_VERSION,
+        defaults={"result": ocr_json, "confidence": ocr_json.get("confidence")},
+    )
+
+
+def apply_cached_result(receipt: Receipt) -> bool:
+    """Fill the receipt from the cache if this content was OCR'd before. Returns True on a hit."""
+    cached = lookup(receipt.content_hash)
+    if cached is None:
+        return False
+
+    receipt.ocr_status = "SUCCESS"
+    receipt.ocr_result = cached.result
+    receipt.ocr_confidence = cached.confidence
+    receipt.ocr_error = None
+    receipt.ocr_locked_at = None
+    receipt.ocr_next_attempt_at = None
+    receipt.save(update_fields=[
+        "ocr_status", "ocr_result", "ocr_confidence", "ocr_error", "ocr_locked_at", "ocr_next_attempt_at",
+    ])
+    search.refresh([receipt.expense_id])
+    return True
@@ -1,18 +1,255 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+
 import requests
+from asgiref.sync import sync_to_async
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+# Optional async client (ocr_worker --async)
+try:
+    import httpx
+except ImportError:
+    httpx = None
 
 class OCRServiceError(Exception):
     pass
 
-def call_ocr_service(*, base_url: str, file_path: str, timeout_seconds: int = 12) -> dict:
+class OCRServiceUnavailable(OCRServiceError):
+    """Raised without contacting the service while the circuit breaker is open."""
+    pass
+
+
+# responses worth retrying / counting against the service (the file itself is not the problem)
+RETRYABLE_STATUS = {502, 503, 504}
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half_open after `reset_seconds`, letting a single trial call through;
+    half_open -> closed on success, back to open on failure.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.opened_total = 0
+        self.short_circuited_total = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def retry_after(self) -> float:
+        # seconds until an open breaker lets a trial call through
+        with self._lock:
+            if self._current_state() != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+
+    def before_call(self) -> None:
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self.short_circuited_total += 1
+        raise OCRServiceUnavailable("OCR service unavailable (circuit open)")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        # the attempt ended without an answer either way (a local error, a cancelled task):
+        # let the next call be the half-open trial instead
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.opened_total += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "opened_total": self.opened_total,
+                "short_circuited_total": self.short_circuited_total,
+            }
+
+
+breaker = CircuitBreaker(
+    failure_threshold=settings.OCR_BREAKER_FAILURE_THRESHOLD,
+    reset_seconds=settings.OCR_BREAKER_RESET_SECONDS,
+)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    # one keep-alive connection pool per process, shared by all worker threads
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.OCR_POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def _post(url: str, timeout_seconds: int, send) -> requests.Response:
+    """
+    POST through the shared session with breaker checks and jittered retries.
+    OCR is a pure function of the file, so connection errors and 502/503/504 are safe to retry.
+    `send(session, timeout)` performs one attempt.
+    """
+    timeout = (settings.OCR_CONNECT_TIMEOUT_SECONDS, timeout_seconds)
+    attempts = settings.OCR_HTTP_RETRIES + 1
+
+    for attempt in range(attempts):
+        breaker.before_call()
+        try:
+            resp = send(get_session(), timeout)
+        except requests.ReadTimeout as e:
+            # read timeouts are not retried: the service is already busy with this file
+            breaker.record_failure()
+            raise OCRServiceError("OCR timeout") from e
+        except requests.ConnectionError as e:
+            breaker.record_failure()
+            if attempt + 1 < attempts:
+                time.sleep(random.uniform(0, settings.OCR_HTTP_RETRY_BACKOFF_SECONDS * (2 ** attempt)))
+                continue
+            raise OCRServiceError(f"OCR request failed: {e}") from e
+        except requests.RequestException as e:
+            breaker.record_failure()
+            raise OCRServiceError(f"OCR request failed: {e}") from e
+        except BaseException:
+            breaker.release()
+            raise
+
+        if resp.status_code in RETRYABLE_STATUS:
+            breaker.record_failure()
+            if attempt + 1 < attempts:
+                resp.close()
+                time.sleep(random.uniform(0, settings.OCR_HTTP_RETRY_BACKOFF_SECONDS * (2 ** attempt)))
+                continue
+        else:
+            # the service answered (a 500 included): whatever went wrong is about this file
+            breaker.record_success()
+        return resp
+
+
+def call_ocr_service(*, base_url: str, file, timeout_seconds: int = 12) -> dict:
+    """`file` is a Django File / FieldFile, read through its storage (no local path needed)."""
     url = f"{base_url.rstrip('/')}/ocr"
+    filename = os.path.basename(file.name)
+
+    with file.open("rb") as f:
+        def send(session, timeout):
+            f.seek(0)
+            files = {"file": (filename, f, "application/octet-stream")}
+            return session.post(url, files=files, timeout=timeout)
+
+        resp = _post(url, timeout_seconds, send)
+
+    if resp.status_code != 200:
+        raise OCRServiceError(f"OCR returned {resp.status_code}: {resp.text[:300]}")
+
     try:
-        with open(file_path, "rb") as f:
-            files = {"file": (file_path.split("/")[-1], f, "application/octet-stream")}
-            resp = requests.post(url, files=files, timeout=timeout_seconds)
-    except requests.Timeout as e:
-        raise OCRServiceError("OCR timeout") from e
-    except requests.RequestException as e:
-        raise OCRServiceError(f"OCR request failed: {e}") from e
+        return resp.json()
+    except Exception as e:
+        raise OCRServiceError("OCR returned invalid JSON") from e
+
+
+async def _apost(client, url: str, timeout_seconds: int, files) -> "httpx.Response":
+    """_post() for httpx.AsyncClient: same breaker, retry and timeout policy."""
+    timeout = httpx.Timeout(timeout_seconds, connect=settings.OCR_CONNECT_TIMEOUT_SECONDS)
+    attempts = settings.OCR_HTTP_RETRIES + 1
+
+    for attempt in range(attempts):
+        breaker.before_call()
+        try:
+            resp = await client.post(url, files=files(), timeout=timeout)
+        except httpx.ReadTimeout as e:
+            breaker.record_failure()
+            raise OCRServiceError("OCR timeout") from e
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            breaker.record_failure()
+            if attempt + 1 < attempts:
+                await asyncio.sleep(random.uniform(0, settings.OCR_HTTP_RETRY_BACKOFF_SECONDS * (2 ** attempt)))
+                continue
+            raise OCRServiceError(f"OCR request failed: {e}") from e
+        except httpx.HTTPError as e:
+            breaker.record_failure()
+            raise OCRServiceError(f"OCR request failed: {e}") from e
+        except BaseException:
+            breaker.release()
+            raise
+
+        if resp.status_code in RETRYABLE_STATUS:
+            breaker.record_failure()
+            if attempt + 1 < attempts:
+                await asyncio.sleep(random.uniform(0, settings.OCR_HTTP_RETRY_BACKOFF_SECONDS * (2 ** attempt)))
+                continue
+        else:
+            breaker.record_success()
+        return resp
+
+
+def _read_file(file) -> bytes:
+    with file.open("rb") as f:
+        return f.read()
+
+
+async def acall_ocr_service(*, client, base_url: str, file, timeout_seconds: int = 12) -> dict:
+    """
+    call_ocr_service() on an httpx.AsyncClient; waiting for the OCR service ties up no thread.
+    The receipt is read from storage in a worker thread first.
+    """
+    if httpx is None:
+        raise RuntimeError("The async OCR client needs httpx (pip install httpx).")
+
+    url = f"{base_url.rstrip('/')}/ocr"
+    filename = os.path.basename(file.name)
+    data = await sync_to_async(_read_file, thread_sensitive=False)(file)
+
+    resp = await _apost(client, url, timeout_seconds, lambda: {"file": (filename, data, "application/octet-stream")})
 
     if resp.status_code != 200:
         raise OCRServiceError(f"OCR returned {resp.status_code}: {resp.text[:300]}")
@@ -21,3 +258,50 @@ def call_ocr_service(*, base_url: str, file_path: str, timeout_seconds: int = 12
         return resp.json()
     except Exception as e:
         raise OCRServiceError("OCR returned invalid JSON") from e
+
+
+def call_ocr_service_batch(*, base_url: str, files: list, timeout_seconds: int = 120, batch_size: int = 50):
+    """
+    OCR many files through POST /ocr/batch, `batch_size` files per request.
+    `files` is a list of (key, Django File) pairs; files are read through their storage.
+    Yields (key, result_dict | None, error | None) in completion order as NDJSON lines arrive.
+    """
+    url = f"{base_url.rstrip('/')}/ocr/batch"
+
+    for start in range(0, len(files), batch_size):
+        chunk = files[start:start + batch_size]
+        handles = []
+        try:
+            for _, file in chunk:
+                handles.append(file.open("rb"))
+
+            def send(session, timeout):
+                parts = []
+                for f in handles:
+                    f.seek(0)
+                    parts.append(("files", (os.path.basename(f.name), f, "application/octet-stream")))
+                return session.post(url, files=parts, timeout=timeout, stream=True)
+
+            resp = _post(url, timeout_seconds, send)
+
+            with resp:
+                if resp.status_code != 200:
+                    raise OCRServiceError(f"OCR batch returned {resp.status_code}: {resp.text[:300]}")
+
+                try:
+                    for line in resp.iter_lines():
+                        if not line:
+                            continue
+                        item = json.loads(line)
+                        key = chunk[item["index"]][0]
+                        if item.get("ok"):
+                            yield key, item["result"], None
+                        else:
+                            yield key, None, item.get("error") or "OCR failed"
+                except (ValueError, KeyError, IndexError) as e:
+                    raise OCRServiceError("OCR batch returned invalid NDJSON") from e
+                except requests.RequestException as e:
+                    raise OCRServiceError(f"OCR batch stream failed: {e}") from e
+        finally:
+            for f in handles:
+                f.close()
@@ -0,0 +1,161 @@
+import logging
+import random
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .. import search
+from ..metrics import ocr_round_trip
+from ..models import Receipt
+from .ocr_cache import apply_cached_result, store as store_cached_result
+from .ocr_client import acall_ocr_service, breaker, call_ocr_service, OCRServiceError, OCRServiceUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay_seconds(attempts: int) -> float:
+    # exponential backoff with full jitter, capped
+    base = settings.OCR_RETRY_BASE_SECONDS
+    cap = settings.OCR_RETRY_MAX_SECONDS
+    return random.uniform(0, min(cap, base * (2 ** max(attempts - 1, 0))))
+
+
+def claim_receipts(limit: int) -> list:
+    """
+    Atomically move up to `limit` due receipts to PROCESSING and return their ids.
+    Rows locked by another worker are skipped, so several workers can drain the queue.
+    Receipts stuck in PROCESSING past the lease (crashed worker) are picked up again.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.OCR_JOB_LEASE_SECONDS)
+
+    with transaction.atomic():
+        ids = list(
+            Receipt.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(ocr_status="PENDING", ocr_next_attempt_at__isnull=True)
+                | Q(ocr_status="PENDING", ocr_next_attempt_at__lte=now)
+                | Q(ocr_status="PROCESSING", ocr_locked_at__lt=stale)
+            )
+            .order_by("id")
+            .values_list("id", flat=True)[:limit]
+        )
+        if ids:
+            Receipt.objects.filter(id__in=ids).update(
+                ocr_status="PROCESSING",
+                ocr_locked_at=now,
+                ocr_attempts=F("ocr_attempts") + 1,
+            )
+    return ids
+
+
+def process_receipt(receipt_id: int, *, retry: bool = True) -> str:
+    """
+    Run OCR for one claimed receipt and record the outcome.
+    Failures are rescheduled with backoff until OCR_MAX_ATTEMPTS is reached,
+    or marked FAILED right away with retry=False.
+    """
+    receipt = Receipt.objects.filter(pk=receipt_id).first()
+    if receipt is None:
+        return "MISSING"  # deleted while queued
+
+    # identical content may have been OCR'd since this receipt was queued
+    if apply_cached_result(receipt):
+        return receipt.ocr_status
+
+    try:
+        with ocr_round_trip():
+            ocr_json = call_ocr_service(
+                base_url=settings.OCR_SERVICE_URL,
+                file=receipt.file,
+                timeout_seconds=settings.OCR_TIMEOUT_SECONDS,
+            )
+    except (OCRServiceError, OSError) as e:
+        return record_failure(receipt, e, retry=retry)
+
+    record_success(receipt, ocr_json)
+    return receipt.ocr_status
+
+
+async def aprocess_receipt(receipt_id: int, *, client) -> str:
+    """
+    process_receipt() with the OCR call made on `client` (httpx.AsyncClient), so one
+    event loop can keep many receipts in flight; the short DB writes run in a thread.
+    """
+    receipt = await Receipt.objects.filter(pk=receipt_id).afirst()
+    if receipt is None:
+        return "MISSING"
+
+    if await sync_to_async(apply_cached_result)(receipt):
+        return receipt.ocr_status
+
+    try:
+        with ocr_round_trip():
+            ocr_json = await acall_ocr_service(
+                client=client,
+                base_url=settings.OCR_SERVICE_URL,
+                file=receipt.file,
+                timeout_seconds=settings.OCR_TIMEOUT_SECONDS,
+            )
+    except (OCRServiceError, OSError) as e:
+        return await sync_to_async(record_failure)(receipt, e)
+
+    await sync_to_async(record_success)(receipt, ocr_json)
+    return receipt.ocr_status
+
+
+def record_failure(receipt: Receipt, error: Exception, retry: bool = True) -> str:
+    if retry and isinstance(error, OCRServiceUnavailable):
+        # circuit open: defer until the breaker allows a trial call, without spending an attempt
+        receipt.ocr_status = "PENDING"
+        receipt.ocr_error = str(error)
+        receipt.ocr_locked_at = None
+        receipt.ocr_attempts = max(receipt.ocr_attempts - 1, 0)
+        receipt.ocr_next_attempt_at = timezone.now() + timedelta(seconds=breaker.retry_after())
+        receipt.save(update_fields=["ocr_status", "ocr_error", "ocr_locked_at", "ocr_attempts", "ocr_next_attempt_at"])
+        return "DEFERRED"
+
+    receipt.ocr_error = str(error)
+    receipt.ocr_locked_at = None
+    if not retry or receipt.ocr_attempts >= settings.OCR_MAX_ATTEMPTS:
+        receipt.ocr_status = "FAILED"
+        receipt.ocr_next_attempt_at = None
+    else:
+        receipt.ocr_status = "PENDING"
+        receipt.ocr_next_attempt_at = timezone.now() + timedelta(
+            seconds=retry_delay_seconds(receipt.ocr_attempts)
+        )
+    receipt.save(update_fields=["ocr_status", "ocr_error", "ocr_locked_at", "ocr_next_attempt_at"])
+    logger.warning("OCR failed for receipt %s (attempt %s): %s", receipt.id, receipt.ocr_attempts, error)
+    return receipt.ocr_status
+
+
+def record_success(receipt: Receipt, ocr_json: dict) -> None:
+    store_cached_result(receipt.content_hash, ocr_json)
+
+    receipt.ocr_status = "SUCCESS"
+    receipt.ocr_result = ocr_json
+    receipt.ocr_confidence = ocr_json.get("confidence")
+    receipt.ocr_error = None
+    receipt.ocr_locked_at = None
+    receipt.ocr_next_attempt_at = None
+    receipt.save(update_fields=[
+        "ocr_status", "ocr_result", "ocr_confidence", "ocr_error", "ocr_locked_at", "ocr_next_attempt_at",
+    ])
+    search.refresh([receipt.expense_id])
+
+
+def run_inline(receipt: Receipt) -> None:
+    # synchronous path (OCR_ASYNC disabled): claim this receipt and process it now
+    Receipt.objects.filter(pk=receipt.pk).update(
+        ocr_status="PROCESSING",
+        ocr_locked_at=timezone.now(),
+        ocr_attempts=F("ocr_attempts") + 1,
+    )
+    # no worker will pick a PENDING retry up: fail right away, as before the queue existed
+    process_receipt(receipt.pk, retry=False)
+    receipt.refresh_from_db()
@@ -0,0 +1,116 @@
+"""
+Thumbnail / preview renditions of receipts for the review screens.
+
+Photos become WebP (JPEG if Pillow lacks WebP), PDFs a PNG of the first page.
+Rendered in the background by `manage.py ocr_worker`; served by the receipt
+endpoint with ?rendition=thumb|preview, falling back to the original.
+"""
+import io
+import logging
+import os
+from typing import Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps, features
+
+from ..models import Receipt
+
+# Optional PDF support
+try:
+    import fitz  # PyMuPDF
+    PDF_ENABLED = True
+except Exception:
+    PDF_ENABLED = False
+
+logger = logging.getLogger(__name__)
+
+# longest side in pixels
+RENDITION_SIZES = {
+    "thumb": 320,
+    "preview": 1600,
+}
+PHOTO_FORMAT, PHOTO_EXT = ("WEBP", "webp") if features.check("webp") else ("JPEG", "jpg")
+
+
+def is_pdf(data: bytes) -> bool:
+    return data[:5] == b"%PDF-"
+
+
+def pdf_first_page(data: bytes, size: int) -> Image.Image:
+    doc = fitz.open(stream=data, filetype="pdf")
+    try:
+        page = doc[0]
+        zoom = size / max(page.rect.width, page.rect.height)
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    finally:
+        doc.close()
+
+
+def photo(data: bytes, size: int) -> Image.Image:
+    img = Image.open(io.BytesIO(data))
+    # JPEG: let the decoder downscale (1/2 .. 1/8) instead of decoding every pixel
+    img.draft("RGB", (size, size))
+    img = ImageOps.exif_transpose(img)
+    return img.convert("RGB")
+
+
+def encode(img: Image.Image, size: int, fmt: str) -> bytes:
+    img = img.copy()
+    img.thumbnail((size, size))
+    out = io.BytesIO()
+    if fmt == "PNG":
+        img.save(out, "PNG", optimize=True)
+    else:
+        img.save(out, fmt, quality=settings.RECEIPT_RENDITION_QUALITY)
+    return out.getvalue()
+
+
+def render_receipt(receipt: Receipt) -> str:
+    """Write thumb + preview for one receipt and record rendition_status."""
+    try:
+        with receipt.file.open("rb") as f:
+            data = f.read()
+
+        if is_pdf(data):
+            if not PDF_ENABLED:
+                receipt.rendition_status = "SKIPPED"
+                receipt.save(update_fields=["rendition_status"])
+                return receipt.rendition_status
+            source = pdf_first_page(data, RENDITION_SIZES["preview"])
+            fmt, ext = "PNG", "png"
+        else:
+            source = photo(data, RENDITION_SIZES["preview"])
+            fmt, ext = PHOTO_FORMAT, PHOTO_EXT
+
+        stem = os.path.splitext(os.path.basename(receipt.file.name))[0]
+        for name, size in RENDITION_SIZES.items():
+            getattr(receipt, name).save(f"{stem}.{name}.{ext}", ContentFile(encode(source, size, fmt)), save=False)
+        receipt.rendition_status = "DONE"
+    except Exception as e:
+        # undecodable / truncated uploads: the original is still served
+        logger.warning("Rendition failed for receipt %s: %s", receipt.id, e)
+        receipt.rendition_status = "FAILED"
+
+    receipt.save(update_fields=["thumb", "preview", "rendition_status"])
+    return receipt.rendition_status
+
+
+def render_next() -> Optional[int]:
+    """
+    Render the oldest receipt still waiting for renditions; returns its id, or None if none are left.
+    The row stays locked while rendering, so concurrent workers skip it.
+    """
+    with transaction.atomic():
+        receipt = (
+            Receipt.objects.select_for_update(skip_locked=True)
+            .filter(rendition_status="PENDING")
+            .order_by("id")
+            .first()
+        )
+        if receipt is None:
+            return None
+        render_receipt(receipt)
+    return receipt.id
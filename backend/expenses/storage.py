@@ -0,0 +1,65 @@
+"""
+Storage for receipt files (STORAGES["receipts"], chosen with RECEIPT_STORAGE_BACKEND).
+
+- "local"   FileSystemStorage under MEDIA_ROOT (single node)
+- "s3"      django-storages S3Storage; any S3-compatible store (AWS, MinIO, ...)
+- "standin" ObjectStoreStandIn: a directory that behaves like a bucket, for
+            running and testing the object-store code paths without one
+
+Receipt code only uses the Storage API (open / save / size / url), never .path,
+so Django nodes can share one bucket behind a load balancer.
+"""
+import os
+
+from django.core.files.storage import FileSystemStorage, Storage, storages
+from django.utils.deconstruct import deconstructible
+
+
+def receipt_storage():
+    return storages["receipts"]
+
+
+@deconstructible
+class ObjectStoreStandIn(Storage):
+    """
+    Local stand-in for an S3-compatible bucket. Objects live under `location`,
+    but like a real object store there is no path() and uploads are always
+    streamed in (never moved), so anything that would only work on a shared
+    local disk fails here the same way it would against S3.
+    """
+
+    def __init__(self, location=None, base_url=None):
+        self._fs = FileSystemStorage(location=location, base_url=base_url)
+
+    def _open(self, name, mode="rb"):
+        return self._fs._open(name, mode)
+
+    def _save(self, name, content):
+        # hide temporary_file_path(): the object is written from the stream
+        full_path = self._fs.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "xb") as f:
+            for chunk in content.chunks():
+                f.write(chunk)
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        return self._fs.get_available_name(name, max_length=max_length)
+
+    def delete(self, name):
+        self._fs.delete(name)
+
+    def exists(self, name):
+        return self._fs.exists(name)
+
+    def size(self, name):
+        return self._fs.size(name)
+
+    def url(self, name):
+        return self._fs.url(name)
+
+    def get_modified_time(self, name):
+        return self._fs.get_modified_time(name)
+
+    def listdir(self, path):
+        return self._fs.listdir(path)
@@ -1,3 +1,790 @@
-from django.test import TestCase
+import base64
+import hashlib
+import importlib
+import io
+import json
+import os
+import tempfile
+import threading
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib import admin
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.files.storage import storages
+from django.db import DatabaseError, connection, connections
+from django.core.files.base import ContentFile
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from users.models import CustomUser
+from . import async_views, metrics
+from .admin import ExpenseAdmin
+from .custom_token import CustomTokenObtainPairSerializer
+from .delivery import check_configuration, etag_matches, parse_range
+from .management.commands import ocr_worker
+from .models import Expense, Receipt, ApprovalHistory
+from .services.chunked_upload import StagedFile, UploadError, append_part, staging_path, start_session
+from .services import ocr_client
+from .services.ocr_client import OCRServiceUnavailable
+from .services.ocr_queue import process_receipt, record_success, run_inline
+from .services.renditions import RENDITION_SIZES, render_receipt
+from .storage import ObjectStoreStandIn
+from .workflow import BULK_MAX_IDS
+
+
+class ExpenseListQueryCountTests(TestCase):
+    def setUp(self):
+        self.manager = CustomUser.objects.create_user(username="manager", password="x", role="MANAGER")
+        self.employee = CustomUser.objects.create_user(
+            username="employee", password="x", role="EMPLOYEE", reports_to=self.manager
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee)
+
+    def seed(self, n):
+        expenses = Expense.objects.bulk_create([
+            Expense(
+                title=f"Claim {i}",
+                amount=10,
+                status=Expense.Status.SUBMITTED,
+                submitted_by=self.employee,
+                current_approver=self.manager,
+            )
+            for i in range(n)
+        ])
+        ApprovalHistory.objects.bulk_create([
+            ApprovalHistory(expense=e, approver=self.employee, action=ApprovalHistory.Action.SUBMITTED)
+            for e in expenses
+        ])
+        Receipt.objects.bulk_create([Receipt(expense=e, file="receipts/r.pdf") for e in expenses[::2]])
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get("/api/expenses/")
+        self.assertEqual(resp.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_list_query_count_is_flat(self):
+        self.seed(10)
+        small = self.count_list_queries()
+
+        self.seed(990)
+        large = self.count_list_queries()
+
+        self.assertEqual(small, large)
+
+
+class ConcurrentApprovalTests(TransactionTestCase):
+    def setUp(self):
+        self.manager = CustomUser.objects.create_user(username="manager", password="x", role="MANAGER")
+        self.employee = CustomUser.objects.create_user(
+            username="employee", password="x", role="EMPLOYEE", reports_to=self.manager
+        )
+        self.expense = Expense.objects.create(
+            title="Taxi",
+            amount=25,
+            status=Expense.Status.SUBMITTED,
+            submitted_by=self.employee,
+            current_approver=self.manager,
+        )
+
+    def test_parallel_approvals_apply_once(self):
+        n = 8
+        barrier = threading.Barrier(n)
+        codes = []
+
+        def approve():
+            client = APIClient()
+            client.force_authenticate(self.manager)
+            try:
+                barrier.wait()
+                resp = client.post(f"/api/expenses/{self.expense.id}/manager_approve/", {"manager_comment": "ok"})
+                codes.append(resp.status_code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=approve) for _ in range(n)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(sorted(codes), [200] + [409] * (n - 1))
+        self.expense.refresh_from_db()
+        self.assertEqual(self.expense.status, Expense.Status.APPROVED)
+        self.assertEqual(
+            ApprovalHistory.objects.filter(expense=self.expense, action=ApprovalHistory.Action.APPROVED).count(), 1
+        )
+
+    def test_approve_after_reject_conflicts(self):
+        client = APIClient()
+        client.force_authenticate(self.manager)
+
+        self.assertEqual(client.post(f"/api/expenses/{self.expense.id}/manager_reject/").status_code, 200)
+        self.assertEqual(client.post(f"/api/expenses/{self.expense.id}/manager_approve/").status_code, 409)
+
+    def test_other_users_are_refused_before_the_status_check(self):
+        other = CustomUser.objects.create_user(username="other", password="x", role="MANAGER")
+        client = APIClient()
+        client.force_authenticate(other)
+        self.assertEqual(client.post(f"/api/expenses/{self.expense.id}/manager_approve/").status_code, 403)
+
+        self.expense.status = Expense.Status.DRAFT
+        self.expense.save()
+        self.assertEqual(client.post(f"/api/expenses/{self.expense.id}/manager_reject/").status_code, 403)
+
+
+class BulkWorkflowTests(TestCase):
+    def setUp(self):
+        self.manager = CustomUser.objects.create_user(username="manager", password="x", role="MANAGER")
+        self.employee = CustomUser.objects.create_user(
+            username="employee", password="x", role="EMPLOYEE", reports_to=self.manager
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def claim(self, status=Expense.Status.SUBMITTED, submitted_by=None, current_approver=None):
+        return Expense.objects.create(
+            title="Taxi",
+            amount=25,
+            status=status,
+            submitted_by=submitted_by or self.employee,
+            current_approver=current_approver if current_approver is not None else self.manager,
+        )
+
+    def test_bulk_approve_reports_each_id(self):
+        eligible = [self.claim(), self.claim()]
+        draft = self.claim(status=Expense.Status.DRAFT)
+        other_manager = CustomUser.objects.create_user(username="other", password="x", role="MANAGER")
+        elsewhere = self.claim(current_approver=other_manager)
+
+        ids = [e.id for e in eligible] + [draft.id, 999999, elsewhere.id]
+        resp = self.client.post("/api/expenses/bulk_approve/", {"ids": ids}, format="json")
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["updated"], 2)
+        self.assertEqual(resp.data["results"], [
+            {"id": eligible[0].id, "ok": True},
+            {"id": eligible[1].id, "ok": True},
+            {"id": draft.id, "ok": False, "detail": "Not eligible (status DRAFT)."},
+            {"id": 999999, "ok": False, "detail": "Not found."},
+            {"id": elsewhere.id, "ok": False, "detail": "Not allowed."},
+        ])
+        for exp in eligible:
+            exp.refresh_from_db()
+            self.assertEqual((exp.status, exp.approved_by), (Expense.Status.APPROVED, self.manager))
+        self.assertEqual(
+            sorted(ApprovalHistory.objects.filter(action=ApprovalHistory.Action.APPROVED).values_list("expense_id", flat=True)),
+            sorted(e.id for e in eligible),
+        )
+
+    def test_status_is_hidden_outside_scope(self):
+        other_manager = CustomUser.objects.create_user(username="other", password="x", role="MANAGER")
+        elsewhere = self.claim(status=Expense.Status.PAID, current_approver=other_manager)
+
+        resp = self.client.post("/api/expenses/bulk_reject/", {"ids": [elsewhere.id]}, format="json")
+        self.assertEqual(resp.data["results"], [{"id": elsewhere.id, "ok": False, "detail": "Not allowed."}])
+
+    def test_managers_cannot_bulk_approve_their_own_claims(self):
+        own = self.claim(submitted_by=self.manager)
+
+        resp = self.client.post("/api/expenses/bulk_approve/", {"ids": [own.id]}, format="json")
+        self.assertEqual(resp.data["updated"], 0)
+        self.assertEqual(resp.data["results"], [{"id": own.id, "ok": False, "detail": "Not allowed."}])
+        own.refresh_from_db()
+        self.assertEqual(own.status, Expense.Status.SUBMITTED)
+
+    def test_finance_actions_need_the_finance_role(self):
+        approved = self.claim(status=Expense.Status.APPROVED)
+        for url in ("/api/expenses/bulk_finance_approve/", "/api/expenses/bulk_mark_paid/"):
+            resp = self.client.post(url, {"ids": [approved.id]}, format="json")
+            self.assertEqual(resp.status_code, 403)
+
+        finance = CustomUser.objects.create_user(username="finance", password="x", role="FINANCE")
+        self.client.force_authenticate(finance)
+        resp = self.client.post("/api/expenses/bulk_finance_approve/", {"ids": [approved.id]}, format="json")
+        self.assertEqual(resp.data["updated"], 1)
+        resp = self.client.post(
+            "/api/expenses/bulk_mark_paid/", {"ids": [approved.id], "payment_reference": "RUN-1"}, format="json"
+        )
+        self.assertEqual(resp.data["updated"], 1)
+        approved.refresh_from_db()
+        self.assertEqual((approved.status, approved.payment_reference), (Expense.Status.PAID, "RUN-1"))
+
+    def test_bad_ids_are_rejected(self):
+        for ids in ([], list(range(1, BULK_MAX_IDS + 2)), ["one"], "1,2"):
+            resp = self.client.post("/api/expenses/bulk_approve/", {"ids": ids}, format="json")
+            self.assertEqual(resp.status_code, 400, ids)
+
+    def test_duplicate_ids_collapse(self):
+        exp = self.claim()
+
+        resp = self.client.post("/api/expenses/bulk_approve/", {"ids": [exp.id, exp.id, str(exp.id)]}, format="json")
+        self.assertEqual(resp.data["updated"], 1)
+        self.assertEqual(resp.data["results"], [{"id": exp.id, "ok": True}])
+        self.assertEqual(ApprovalHistory.objects.filter(expense=exp).count(), 1)
+
+
+class RoleResolutionTests(TestCase):
+    def setUp(self):
+        self.manager = CustomUser.objects.create_user(username="manager", password="x", role="MANAGER")
+        self.employee = CustomUser.objects.create_user(
+            username="employee", password="x", role="EMPLOYEE", reports_to=self.manager
+        )
+
+    def test_me_reads_role_from_token_claims(self):
+        token = CustomTokenObtainPairSerializer.get_token(self.employee).access_token
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = client.get("/api/me/")
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["role"], "EMPLOYEE")
+        self.assertFalse([q for q in ctx.captured_queries if "auth_group" in q["sql"]])
+
+    def test_reads_do_not_load_the_user_row(self):
+        token = CustomTokenObtainPairSerializer.get_token(self.employee).access_token
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = client.get("/api/expenses/")
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if 'FROM "users_customuser"' in q["sql"]])
+
+    def test_writes_use_the_current_role_not_the_token(self):
+        finance = CustomUser.objects.create_user(username="finance", password="x", role="FINANCE")
+        token = CustomTokenObtainPairSerializer.get_token(finance).access_token
+        finance.role = "EMPLOYEE"
+        finance.save()
+        exp = Expense.objects.create(
+            title="Taxi", amount="30.00", submitted_by=self.employee, status=Expense.Status.APPROVED
+        )
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        resp = client.post(f"/api/expenses/{exp.id}/finance_approve/")
+        self.assertEqual(resp.status_code, 403)
+
+
+class ReceiptDeliveryHelperTests(SimpleTestCase):
+    def test_parse_range(self):
+        self.assertEqual(parse_range("bytes=0-99", 1000), (0, 99))
+        self.assertEqual(parse_range("bytes=900-", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=-100", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=500-5000", 1000), (500, 999))
+        self.assertIs(parse_range("bytes=1000-", 1000), False)
+        self.assertIsNone(parse_range("bytes=0-1,5-9", 1000))
+        self.assertIsNone(parse_range(None, 1000))
+
+    def test_etag_matches(self):
+        self.assertTrue(etag_matches('"abc"', '"abc"'))
+        self.assertTrue(etag_matches('W/"x", "abc"', '"abc"'))
+        self.assertTrue(etag_matches("*", '"abc"'))
+        self.assertFalse(etag_matches('"abd"', '"abc"'))
+        self.assertFalse(etag_matches(None, '"abc"'))
+
+    @override_settings(RECEIPT_DELIVERY_BACKEND="redirect")
+    def test_redirect_needs_presigned_urls(self):
+        with self.assertRaises(ImproperlyConfigured):
+            check_configuration()
+        with mock.patch("expenses.delivery.storages", {"receipts": mock.Mock(querystring_auth=True)}):
+            check_configuration()
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ReceiptRenditionTests(TestCase):
+    def test_photo_gets_small_renditions(self):
+        user = CustomUser.objects.create_user(username="employee", password="x")
+        expense = Expense.objects.create(title="Lunch", amount=12, submitted_by=user)
+
+        buf = io.BytesIO()
+        Image.new("RGB", (4000, 3000), "white").save(buf, "JPEG")
+        receipt = Receipt(expense=expense)
+        receipt.file.save("lunch.jpg", ContentFile(buf.getvalue()))
+
+        self.assertEqual(render_receipt(receipt), "DONE")
+        for name, size in RENDITION_SIZES.items():
+            with getattr(receipt, name).open("rb") as f:
+                self.assertEqual(max(Image.open(f).size), size)
+
+
+@override_settings(OCR_HTTP_RETRIES=0)
+class OCRCircuitBreakerTests(SimpleTestCase):
+    def post(self, status):
+        resp = mock.Mock(status_code=status)
+        return ocr_client._post("http://ocr/ocr", 1, lambda session, timeout: resp)
+
+    def test_only_retryable_statuses_count_against_the_service(self):
+        with mock.patch.object(ocr_client, "breaker", ocr_client.CircuitBreaker(1, 60)) as breaker:
+            self.post(500)
+            self.assertEqual(breaker.state, "closed")
+            self.post(503)
+            self.assertEqual(breaker.state, "open")
+
+    def test_a_local_error_does_not_wedge_the_half_open_trial(self):
+        def send(session, timeout):
+            raise OSError("storage read failed")
+
+        with mock.patch.object(ocr_client, "breaker", ocr_client.CircuitBreaker(1, 0)) as breaker:
+            self.post(503)
+            self.assertEqual(breaker.state, "half_open")
+            with self.assertRaises(OSError):
+                ocr_client._post("http://ocr/ocr", 1, send)
+
+            self.assertEqual(self.post(200).status_code, 200)
+            self.assertEqual(breaker.state, "closed")
+
+
+class OCRBatchClientTests(SimpleTestCase):
+    def test_results_and_per_file_errors_are_keyed(self):
+        lines = [
+            json.dumps({"index": 1, "filename": "b.jpg", "ok": False, "error": "empty file"}).encode(),
+            b"",
+            json.dumps({"index": 0, "filename": "a.jpg", "ok": True, "result": {"total_amount": 12.5}}).encode(),
+        ]
+        resp = mock.MagicMock(status_code=200)
+        resp.__enter__.return_value = resp
+        resp.iter_lines.return_value = lines
+        files = [("r1", ContentFile(b"a", name="a.jpg")), ("r2", ContentFile(b"", name="b.jpg"))]
+
+        with mock.patch.object(ocr_client, "_post", return_value=resp):
+            results = list(ocr_client.call_ocr_service_batch(base_url="http://ocr", files=files))
+
+        self.assertEqual(results, [("r2", None, "empty file"), ("r1", {"total_amount": 12.5}, None)])
+
+    def test_bad_lines_raise(self):
+        resp = mock.MagicMock(status_code=200)
+        resp.__enter__.return_value = resp
+        resp.iter_lines.return_value = [b'{"index": 5, "ok": true}']
+
+        with mock.patch.object(ocr_client, "_post", return_value=resp):
+            with self.assertRaises(ocr_client.OCRServiceError):
+                list(ocr_client.call_ocr_service_batch(base_url="http://ocr", files=[("r1", ContentFile(b"a", name="a.jpg"))]))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class OCRQueueTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(username="employee", password="x", role="EMPLOYEE")
+        expense = Expense.objects.create(title="Lunch", amount=12, submitted_by=user)
+        self.receipt = Receipt.objects.create(expense=expense, file=ContentFile(b"receipt", name="lunch.txt"))
+
+    @mock.patch("expenses.services.ocr_queue.call_ocr_service", side_effect=OCRServiceUnavailable("circuit open"))
+    def test_queued_receipts_wait_for_the_service(self, _):
+        Receipt.objects.filter(pk=self.receipt.pk).update(ocr_status="PROCESSING", ocr_attempts=1)
+        self.assertEqual(process_receipt(self.receipt.pk), "DEFERRED")
+        self.receipt.refresh_from_db()
+        self.assertEqual((self.receipt.ocr_status, self.receipt.ocr_attempts), ("PENDING", 0))
+
+    @mock.patch("expenses.services.ocr_queue.call_ocr_service", side_effect=OCRServiceUnavailable("circuit open"))
+    def test_inline_ocr_fails_without_a_retry(self, _):
+        run_inline(self.receipt)
+        self.assertEqual(self.receipt.ocr_status, "FAILED")
+
+
+class OCRWorkerTests(SimpleTestCase):
+    def test_a_failed_iteration_does_not_end_the_thread(self):
+        command = ocr_worker.Command()
+        command.stop = threading.Event()
+        command.poll_interval = 0
+        command.once = True
+
+        with mock.patch.object(ocr_worker, "claim_receipts", side_effect=[DatabaseError("gone"), []]) as claim, \
+                mock.patch.object(ocr_worker, "render_next", return_value=None), \
+                mock.patch.object(ocr_worker, "connections"), \
+                self.assertLogs("expenses.management.commands.ocr_worker", "ERROR"):
+            command.work(True)
+
+        self.assertEqual(claim.call_count, 2)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), OCR_ASYNC=False, OCR_CACHE_VERSION="1")
+class OCRResultCacheTests(TestCase):
+    def setUp(self):
+        self.employee = CustomUser.objects.create_user(username="employee", password="x", role="EMPLOYEE")
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee)
+        buf = io.BytesIO()
+        Image.new("RGB", (40, 30), "white").save(buf, "JPEG")
+        self.content = buf.getvalue()
+
+    def upload(self):
+        expense = Expense.objects.create(title="Lunch", amount=12, submitted_by=self.employee)
+        data = {"expense": expense.id, "file": ContentFile(self.content, name="lunch.jpg")}
+        resp = self.client.post("/api/receipts/", data, format="multipart")
+        self.assertEqual(resp.status_code, 201, resp.data)
+        return resp.data
+
+    @mock.patch(
+        "expenses.services.ocr_queue.call_ocr_service",
+        return_value={"vendor": "Deli", "total_amount": 12, "confidence": 0.8},
+    )
+    def test_same_bytes_reuse_the_result(self, ocr):
+        first = self.upload()
+        second = self.upload()
+
+        self.assertEqual(ocr.call_count, 1)
+        self.assertFalse(first["is_duplicate"])
+        self.assertTrue(second["is_duplicate"])
+        self.assertEqual(second["content_hash"], hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(second["content_hash"], first["content_hash"])
+        self.assertEqual((second["ocr_status"], second["ocr_result"]), ("SUCCESS", first["ocr_result"]))
+
+    @mock.patch("expenses.services.ocr_queue.call_ocr_service", return_value={"vendor": "Deli", "confidence": 0.8})
+    def test_a_new_ocr_version_misses(self, ocr):
+        self.upload()
+        with override_settings(OCR_CACHE_VERSION="2"):
+            self.upload()
+        self.assertEqual(ocr.call_count, 2)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.employee = CustomUser.objects.create_user(username="employee", password="x")
+        self.expense = Expense.objects.create(title="Hotel", amount=120, submitted_by=self.employee)
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee)
+
+    def put_part(self, session_id, offset, data):
+        return self.client.generic(
+            "PUT",
+            f"/api/receipt-uploads/{session_id}/parts/?offset={offset}",
+            data,
+            content_type="application/octet-stream",
+        )
+
+    def test_parts_assemble_into_a_hashed_receipt(self):
+        content = bytes(range(256)) * 4000  # ~1 MB
+        with self.settings(RECEIPT_UPLOAD_STAGING_DIR=tempfile.mkdtemp(), OCR_ASYNC=True):
+            resp = self.client.post(
+                "/api/receipt-uploads/",
+                {"expense": self.expense.id, "filename": "hotel.pdf", "size": len(content)},
+                format="json",
+            )
+            self.assertEqual(resp.status_code, 201)
+            session_id = resp.data["id"]
+
+            half = len(content) // 2
+            self.assertEqual(self.put_part(session_id, 0, content[:half]).status_code, 200)
+            # a replayed part is rejected with the offset to continue from
+            replay = self.put_part(session_id, 0, content[:half])
+            self.assertEqual(replay.status_code, 409)
+            self.assertEqual(replay.data["offset"], half)
+            self.assertEqual(self.put_part(session_id, half, content[half:]).status_code, 200)
+
+            resp = self.client.post(f"/api/receipt-uploads/{session_id}/complete/")
+
+        self.assertEqual(resp.status_code, 201)
+        receipt = Receipt.objects.get(pk=resp.data["id"])
+        self.assertEqual(receipt.content_hash, hashlib.sha256(content).hexdigest())
+        with receipt.file.open("rb") as f:
+            self.assertEqual(f.read(), content)
+
+    def test_parts_are_received_before_the_session_is_locked(self):
+        with self.settings(RECEIPT_UPLOAD_STAGING_DIR=tempfile.mkdtemp()):
+            session = start_session(expense=self.expense, user=self.employee, filename="a.txt", size=10)
+            locked_while_reading = []
+
+            class Stream(io.BytesIO):
+                def read(self, n=-1):
+                    locked_while_reading.append(any("FOR UPDATE" in q["sql"] for q in ctx.captured_queries))
+                    return super().read(n)
+
+            with CaptureQueriesContext(connection) as ctx:
+                with self.assertRaises(UploadError):
+                    append_part(session.pk, offset=0, length=10, stream=Stream(b"short"))
+                append_part(session.pk, offset=0, length=10, stream=Stream(b"0123456789"))
+
+            self.assertFalse(any(locked_while_reading))
+            with open(staging_path(session), "rb") as f:
+                self.assertEqual(f.read(), b"0123456789")
+
+
+class ObjectStoreStandInTests(SimpleTestCase):
+    def test_behaves_like_a_bucket(self):
+        storage = ObjectStoreStandIn(location=tempfile.mkdtemp())
+        name = storage.save("receipts/a.txt", ContentFile(b"receipt"))
+
+        with storage.open(name) as f:
+            self.assertEqual(f.read(), b"receipt")
+        self.assertEqual(storage.size(name), 7)
+        with self.assertRaises(NotImplementedError):
+            storage.path(name)
+
+    def test_staged_uploads_are_streamed_not_moved(self):
+        storage = ObjectStoreStandIn(location=tempfile.mkdtemp())
+        with tempfile.NamedTemporaryFile(delete=False) as tmp:
+            tmp.write(b"staged")
+
+        with StagedFile(tmp.name, "b.txt") as staged:
+            name = storage.save("receipts/b.txt", staged)
+
+        with open(tmp.name, "rb") as f:
+            self.assertEqual(f.read(), b"staged")
+        with storage.open(name) as f:
+            self.assertEqual(f.read(), b"staged")
+
+    def test_urls_point_at_the_stored_objects(self):
+        storage = storages.create_storage(settings.RECEIPT_STORAGES["standin"])
+        url = storage.url("receipts/a.txt")
+        self.assertTrue(url.startswith(settings.MEDIA_URL))
+        self.assertEqual(
+            os.path.join(settings.MEDIA_ROOT, url[len(settings.MEDIA_URL):]),
+            os.path.join(settings.RECEIPT_STORAGES["standin"]["OPTIONS"]["location"], "receipts", "a.txt"),
+        )
+
+
+class ClaimCounterTests(TestCase):
+    def setUp(self):
+        self.manager = CustomUser.objects.create_user(username="manager", password="x", role="MANAGER")
+        self.employee = CustomUser.objects.create_user(
+            username="employee", password="x", role="EMPLOYEE", reports_to=self.manager
+        )
+        self.client = APIClient()
+
+    def summary(self, user):
+        self.client.force_authenticate(user)
+        resp = self.client.get("/api/expenses/summary/")
+        self.assertEqual(resp.status_code, 200)
+        return resp.data
+
+    def test_counters_follow_the_workflow(self):
+        self.client.force_authenticate(self.employee)
+        for amount in ("10.00", "32.50"):
+            resp = self.client.post("/api/expenses/", {"title": "Taxi", "amount": amount, "category": "TRAVEL"})
+            self.assertEqual(resp.status_code, 201)
+            self.client.post(f"/api/expenses/{resp.data['id']}/submit/")
+
+        mine = self.summary(self.employee)["mine"]
+        self.assertEqual(mine["by_status"]["SUBMITTED"]["count"], 2)
+        self.assertEqual(float(mine["total"]), 42.5)
+
+        awaiting = self.summary(self.manager)["awaiting_me"]
+        self.assertEqual(awaiting["count"], 2)
+
+        expense_id = Expense.objects.order_by("id").first().id
+        self.client.force_authenticate(self.manager)
+        self.client.post(f"/api/expenses/{expense_id}/manager_approve/")
+
+        self.assertEqual(self.summary(self.manager)["awaiting_me"]["count"], 1)
+        mine = self.summary(self.employee)["mine"]
+        self.assertEqual(mine["by_status"]["APPROVED"]["count"], 1)
+        self.assertEqual(mine["by_status"]["SUBMITTED"]["count"], 1)
+
+    def test_admin_edits_keep_counters_in_step(self):
+        expense_admin = ExpenseAdmin(Expense, admin.site)
+        request = RequestFactory().post("/admin/")
+        exp = Expense(title="Taxi", amount="10.00", category="TRAVEL", submitted_by=self.employee)
+        expense_admin.save_model(request, exp, None, False)
+
+        exp.amount = "25.00"
+        exp.category = "FOOD"
+        expense_admin.save_model(request, exp, None, True)
+        mine = self.summary(self.employee)["mine"]
+        self.assertEqual(list(mine["by_category"]), ["FOOD"])
+        self.assertEqual(float(mine["total"]), 25)
+
+        expense_admin.delete_model(request, exp)
+        self.assertEqual(self.summary(self.employee)["mine"]["count"], 0)
+
+    def test_bench_seed_and_cleanup_keep_counters_in_step(self):
+        finance = CustomUser.objects.create_user(username="finance", password="x", role="FINANCE")
+        call_command("bench_queues", expenses=30, employees=3, managers=1, runs=1, stdout=io.StringIO())
+
+        self.assertEqual(self.summary(finance)["all"]["count"], 30)
+        self.assertFalse(Expense.objects.filter(search_vector__isnull=True).exists())
+
+        call_command("bench_queues", cleanup=True, stdout=io.StringIO())
+        self.assertEqual(self.summary(finance)["all"]["count"], 0)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.finance = CustomUser.objects.create_user(username="finance", password="x", role="FINANCE")
+        self.employee = CustomUser.objects.create_user(username="employee", password="x", role="EMPLOYEE")
+        Expense.objects.create(title="=HYPERLINK(1)", amount="12.50", submitted_by=self.employee, status="FINANCE_APPROVED")
+        Expense.objects.create(title="Lunch", amount="8.00", submitted_by=self.employee, status="PAID")
+        self.client = APIClient()
+
+    def test_csv_filters_by_status_and_escapes_formulas(self):
+        self.client.force_authenticate(self.finance)
+        resp = self.client.get("/api/expenses/export/?status=FINANCE_APPROVED&format=csv")
+        self.assertEqual(resp.status_code, 200)
+        lines = b"".join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith("id,title,"))
+        self.assertIn("'=HYPERLINK(1)", lines[1])
+
+    def test_xlsx_is_a_valid_workbook(self):
+        self.client.force_authenticate(self.finance)
+        resp = self.client.get("/api/expenses/export/?format=xlsx")
+        self.assertEqual(resp.status_code, 200)
+        with zipfile.ZipFile(io.BytesIO(b"".join(resp.streaming_content))) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertIn(b"Lunch", zf.read("xl/worksheets/sheet1.xml"))
+
+    def test_finance_only(self):
+        self.client.force_authenticate(self.employee)
+        self.assertEqual(self.client.get("/api/expenses/export/").status_code, 403)
+        self.client.force_authenticate(self.finance)
+        self.assertEqual(self.client.get("/api/expenses/export/?status=NOPE").status_code, 400)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ClaimSearchTests(TestCase):
+    def setUp(self):
+        self.employee = CustomUser.objects.create_user(username="employee", password="x", role="EMPLOYEE")
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee)
+
+    def search(self, q):
+        resp = self.client.get("/api/expenses/", {"q": q})
+        self.assertEqual(resp.status_code, 200)
+        return [row["title"] for row in resp.data["results"]]
+
+    def test_matches_claim_text_and_ocr(self):
+        self.client.post("/api/expenses/", {"title": "Airport taxi", "amount": "30.00", "category": "TRAVEL"})
+        resp = self.client.post("/api/expenses/", {"title": "Team lunch", "amount": "80.00", "category": "FOOD"})
+        lunch = Expense.objects.get(pk=resp.data["id"])
+
+        self.assertEqual(self.search("taxi"), ["Airport taxi"])
+        self.assertEqual(self.search("carbonara"), [])
+
+        receipt = Receipt.objects.create(expense=lunch, file=ContentFile(b"x", name="r.jpg"))
+        record_success(receipt, {"vendor": "Trattoria Roma", "raw_text": "2x carbonara", "confidence": 0.9})
+        self.assertEqual(self.search("trattoria"), ["Team lunch"])
+        self.assertEqual(self.search("carbonara -taxi"), ["Team lunch"])
+
+    def test_migration_fills_existing_claims(self):
+        Expense.objects.bulk_create([
+            Expense(title="Hotel Berlin", amount="90.00", submitted_by=self.employee),
+            Expense(title="Train ticket", amount="40.00", submitted_by=self.employee),
+        ])
+        self.assertEqual(self.search("berlin"), [])
+
+        migration = importlib.import_module("expenses.migrations.0016_backfill_search_vectors")
+        migration.backfill(django_apps, None)
+        self.assertEqual(self.search("berlin"), ["Hotel Berlin"])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ExpenseListFilterTests(TestCase):
+    def setUp(self):
+        self.employee = CustomUser.objects.create_user(username="employee", password="x", role="EMPLOYEE")
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee)
+        for title, amount, category in (("Taxi", "30.00", "TRAVEL"), ("Lunch", "12.00", "FOOD"), ("Laptop", "900.00", "SUPPLIES")):
+            Expense.objects.create(title=title, amount=amount, category=category, submitted_by=self.employee)
+
+    def titles(self, **params):
+        resp = self.client.get("/api/expenses/", params)
+        self.assertEqual(resp.status_code, 200, resp.data)
+        return [row["title"] for row in resp.data["results"]]
+
+    def test_filters_and_ordering(self):
+        self.assertEqual(self.titles(category="FOOD,TRAVEL", ordering="created_at"), ["Taxi", "Lunch"])
+        self.assertEqual(self.titles(amount__gte="20", amount__lte="100"), ["Taxi"])
+        self.assertEqual(self.titles(ordering="-created_at")[0], "Laptop")
+        self.assertEqual(len(self.titles(created_at__lte=timezone.localdate().isoformat())), 3)
+
+        laptop = Expense.objects.get(title="Laptop")
+        Receipt.objects.create(
+            expense=laptop, file=ContentFile(b"x", name="r.jpg"), ocr_status="SUCCESS", ocr_result={"vendor": "ACME Computers"}
+        )
+        self.assertEqual(self.titles(vendor="acme"), ["Laptop"])
+
+    def test_invalid_values_are_rejected(self):
+        for params in ({"ordering": "title"}, {"ordering": "amount"}, {"status": "LOST"}, {"amount__gte": "lots"}, {"created_at__gte": "yesterday"}):
+            self.assertEqual(self.client.get("/api/expenses/", params).status_code, 400, params)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.employee = CustomUser.objects.create_user(username="employee", password="x", role="EMPLOYEE")
+        self.expense = Expense.objects.create(title="Taxi", amount="30.00", submitted_by=self.employee)
+        Receipt.objects.create(expense=self.expense, file=ContentFile(b"0123456789", name="taxi.txt"))
+        self.token = CustomTokenObtainPairSerializer.get_token(self.employee).access_token
+
+    def get(self, path, data=None, **headers):
+        headers["Authorization"] = f"Bearer {self.token}"
+        return AsyncRequestFactory().get(path, data, headers=headers)
+
+    async def test_list_requires_a_token_and_pages_like_drf(self):
+        resp = await async_views.expense_list(self.get("/api/expenses/", {"page_size": 1}))
+        self.assertEqual(resp.status_code, 200)
+        body = json.loads(resp.content)
+        self.assertEqual([row["title"] for row in body["results"]], ["Taxi"])
+        self.assertIsNone(body["next"])
+
+        resp = await async_views.expense_list(AsyncRequestFactory().get("/api/expenses/"))
+        self.assertEqual(resp.status_code, 401)
+
+    async def test_list_matches_the_drf_view(self):
+        await Expense.objects.acreate(title="Hotel", amount="80.00", submitted_by=self.employee)
+        basic = "Basic " + base64.b64encode(b"employee:x").decode()
+        request = AsyncRequestFactory().get("/api/expenses/", {"page_size": 1}, headers={"Authorization": basic})
+        resp = await async_views.expense_list(request)
+        self.assertEqual(resp.status_code, 200)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        drf = await sync_to_async(client.get)("/api/expenses/", {"page_size": 1})
+        self.assertEqual(json.loads(resp.content), json.loads(drf.content))
+
+    async def test_receipt_range_is_streamed(self):
+        request = self.get(f"/api/expenses/{self.expense.id}/receipt/", Range="bytes=2-5")
+        resp = await async_views.expense_receipt(request, pk=self.expense.id)
+        self.assertEqual(resp.status_code, 206)
+        self.assertTrue(resp.is_async)
+        self.assertEqual(b"".join([chunk async for chunk in resp.streaming_content]), b"2345")
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        self.manager = CustomUser.objects.create_user(username="manager", password="x", role="MANAGER")
+        self.employee = CustomUser.objects.create_user(
+            username="employee", password="x", role="EMPLOYEE", reports_to=self.manager
+        )
+        self.client = APIClient()
+
+    @override_settings(METRICS_TOKEN="scrape")
+    def test_views_and_queries_are_exported(self):
+        self.client.force_authenticate(self.employee)
+        resp = self.client.post("/api/expenses/", {"title": "Taxi", "amount": "30.00", "category": "TRAVEL"})
+        self.client.post(f"/api/expenses/{resp.data['id']}/submit/")
+        self.client.get("/api/expenses/")
+
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        body = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape").content.decode()
+        for line in (
+            'http_request_duration_seconds_count{view="ExpenseViewSet.submit",method="POST",status="200"}',
+            'http_request_db_queries_count{view="ExpenseViewSet.list"}',
+            'http_request_span_seconds_count{view="ExpenseViewSet.list",span="serializer"}',
+            "# TYPE ocr_breaker_state gauge",
+        ):
+            self.assertIn(line, body)
+
+    def test_query_count_follows_the_request(self):
+        self.client.force_authenticate(self.employee)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get("/api/expenses/")
+        queries = [
+            line for line in metrics.render().splitlines()
+            if line.startswith('http_request_db_queries_sum{view="ExpenseViewSet.list"}')
+        ]
+        self.assertTrue(queries)
+        self.assertGreaterEqual(float(queries[0].split()[-1]), len(ctx.captured_queries))
@@ -1,8 +1,9 @@
 from rest_framework.routers import DefaultRouter
-from .views import ReceiptViewSet, ExpenseViewSet
+from .views import ReceiptViewSet, ReceiptUploadSessionViewSet, ExpenseViewSet
 
 router = DefaultRouter()
 router.register(r"expenses", ExpenseViewSet, basename="expenses")
 router.register(r"receipts", ReceiptViewSet, basename="receipts")
+router.register(r"receipt-uploads", ReceiptUploadSessionViewSet, basename="receipt-uploads")
 
 urlpatterns = router.urls
@@ -1,28 +1,52 @@
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework import status as drf_status
 
-from django.http import FileResponse, Http404
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch, Q
+from django.http import Http404
 from django.utils.encoding import smart_str
 
 from rest_framework.exceptions import PermissionDenied
 
-from .models import Expense, Receipt, ApprovalHistory
-from .serializers import ExpenseSerializer, ReceiptUploadSerializer
-
-
-def user_role(user):
-    # relies on your CustomUser.role values: EMPLOYEE / MANAGER / FINANCE
-    return getattr(user, "role", None)
-
-
-def can_view_receipt(user, exp: Expense) -> bool:
-    role = user_role(user)
+from . import search
+from .counters import claim_summary, record_changes, snapshot_of, snapshots
+from .delivery import serve_receipt
+from .filters import filter_expenses
+from .export import CSVPassthroughRenderer, XLSXPassthroughRenderer, export_queryset, export_response
+from .models import ApprovalHistory, ClaimCounter, Expense, Receipt, ReceiptUploadSession
+from .pagination import ExpenseCursorPagination, IdCursorPagination
+from .roles import get_user_role, request_access
+from .serializers import (
+    ExpenseSerializer,
+    ExpenseListSerializer,
+    ReceiptUploadSerializer,
+    ReceiptUploadSessionSerializer,
+)
+from .services.chunked_upload import (
+    UploadError,
+    UploadOffsetMismatch,
+    append_part,
+    assembled_file,
+    discard,
+    start_session,
+)
+from .workflow import BULK_MAX_IDS, bulk_transition, transition
+
+
+def user_role(request):
+    # CustomUser.role values: EMPLOYEE / MANAGER / FINANCE, from the JWT claims when present
+    return get_user_role(request)
+
+
+def can_view_receipt(request, exp: Expense) -> bool:
+    role = user_role(request)
 
     if role == "EMPLOYEE":
-        return exp.submitted_by_id == user.id
+        return exp.submitted_by_id == request.user.id
 
     if role == "MANAGER":
         # Manager can view receipts once submitted onwards
@@ -44,16 +68,52 @@ def can_view_receipt(user, exp: Expense) -> bool:
     return False
 
 
+def role_queue(qs, role, user_id):
+    """The claims listed for `role` (GET /api/expenses/)."""
+    if role == "EMPLOYEE":
+        return qs.filter(submitted_by_id=user_id)
+    if role == "MANAGER":
+        return qs.filter(status=Expense.Status.SUBMITTED, current_approver_id=user_id)
+    if role == "FINANCE":
+        return qs.filter(status=Expense.Status.APPROVED)
+    return qs.none()
+
+
+def with_receipt_flag(qs):
+    # one EXISTS subquery instead of a receipts query per row
+    return qs.annotate(has_receipts=Exists(Receipt.objects.filter(expense=OuterRef("pk"))))
+
+
+def receipt_file(exp: Expense, receipt_obj, rendition=None):
+    """(file field, content hash) to serve for a claim, or (None, "") if it has no receipt."""
+    if receipt_obj and rendition and getattr(receipt_obj, rendition):
+        # falls through to the original until the worker has rendered it
+        content_hash = f"{receipt_obj.content_hash}-{rendition}" if receipt_obj.content_hash else ""
+        return getattr(receipt_obj, rendition), content_hash
+    if receipt_obj and receipt_obj.file:
+        return receipt_obj.file, receipt_obj.content_hash
+    if getattr(exp, "receipt", None):
+        return exp.receipt, ""
+    return None, ""
+
+
 class ReceiptViewSet(viewsets.ModelViewSet):
     serializer_class = ReceiptUploadSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = IdCursorPagination
 
     def get_queryset(self):
-        role = user_role(self.request.user)
-        qs = Receipt.objects.select_related("expense").all().order_by("-id")
+        role = user_role(self.request)
+        qs = Receipt.objects.select_related("expense").annotate(
+            has_duplicates=Exists(
+                Receipt.objects.filter(content_hash=OuterRef("content_hash"))
+                .exclude(content_hash="")
+                .exclude(expense_id=OuterRef("expense_id"))
+            )
+        ).order_by("-id")
 
         if role == "EMPLOYEE":
-            return qs.filter(expense__submitted_by=self.request.user)
+            return qs.filter(expense__submitted_by_id=self.request.user.id)
 
         if role == "MANAGER":
             return qs.filter(expense__status__in=[
@@ -79,194 +139,432 @@ class ReceiptViewSet(viewsets.ModelViewSet):
             raise PermissionDenied("Not allowed to upload to this claim.")
         serializer.save()
 
+    def perform_destroy(self, instance):
+        # drop the receipt's OCR text from the claim's search vector
+        expense_id = instance.expense_id
+        instance.delete()
+        search.refresh([expense_id])
+
+
+class ReceiptUploadSessionViewSet(viewsets.GenericViewSet):
+    """
+    Resumable chunked upload of one receipt:
+
+    POST   /receipt-uploads/                                {expense, filename, size}
+    PUT    /receipt-uploads/{id}/parts/?offset=N            raw bytes (Content-Length required)
+    GET    /receipt-uploads/{id}/                           current offset, to resume
+    POST   /receipt-uploads/{id}/complete/                  -> the created receipt
+    DELETE /receipt-uploads/{id}/                           abort
+    """
+    serializer_class = ReceiptUploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return ReceiptUploadSession.objects.filter(created_by_id=self.request.user.id)
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        exp = serializer.validated_data["expense"]
+        if exp.submitted_by_id != request.user.id:
+            raise PermissionDenied("Not allowed to upload to this claim.")
+
+        session = start_session(
+            expense=exp,
+            user=request.user,
+            filename=serializer.validated_data["filename"],
+            size=serializer.validated_data["size"],
+        )
+        return Response(self.get_serializer(session).data, status=drf_status.HTTP_201_CREATED)
+
+    def retrieve(self, request, pk=None):
+        return Response(self.get_serializer(self.get_object()).data)
+
+    def destroy(self, request, pk=None):
+        discard(self.get_object())
+        return Response(status=drf_status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=["put"])
+    def parts(self, request, pk=None):
+        session = self.get_object()
+        try:
+            offset = int(request.query_params.get("offset", ""))
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            return Response({"detail": "offset and Content-Length are required."}, status=drf_status.HTTP_400_BAD_REQUEST)
+
+        try:
+            session = append_part(session.pk, offset=offset, length=length, stream=request.stream)
+        except UploadOffsetMismatch as e:
+            # lost response / duplicate part: tell the client where to continue
+            return Response({"detail": str(e), "offset": e.expected}, status=drf_status.HTTP_409_CONFLICT)
+        except UploadError as e:
+            return Response({"detail": str(e)}, status=drf_status.HTTP_400_BAD_REQUEST)
+
+        return Response(self.get_serializer(session).data)
+
+    @action(detail=True, methods=["post"])
+    def complete(self, request, pk=None):
+        session = self.get_object()
+
+        with transaction.atomic():
+            session = ReceiptUploadSession.objects.select_for_update().get(pk=session.pk)
+            try:
+                staged, digest = assembled_file(session)
+            except UploadError as e:
+                return Response({"detail": str(e), "offset": session.offset}, status=drf_status.HTTP_409_CONFLICT)
+
+            receipt_serializer = ReceiptUploadSerializer(context=self.get_serializer_context())
+            with staged:
+                receipt = receipt_serializer.create({
+                    "expense": session.expense,
+                    "file": staged,
+                    "content_hash": digest,
+                })
+            discard(session)
+
+        return Response(
+            ReceiptUploadSerializer(receipt, context=self.get_serializer_context()).data,
+            status=drf_status.HTTP_201_CREATED,
+        )
+
 
 class ExpenseViewSet(viewsets.ModelViewSet):
     serializer_class = ExpenseSerializer
     permission_classes = [IsAuthenticated]
-    queryset = Expense.objects.all().order_by("-created_at")
+    pagination_class = ExpenseCursorPagination
+    queryset = Expense.objects.all().order_by("-created_at", "-id")
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return ExpenseListSerializer
+        return super().get_serializer_class()
 
     def get_queryset(self):
-        role = user_role(self.request.user)
-        base = super().get_queryset()
+        role = user_role(self.request)
+        base = super().get_queryset().select_related("submitted_by", "current_approver")
 
         unrestricted_actions = {"submit", "manager_approve", "manager_reject", "finance_approve", "mark_paid", "receipt"}
         if getattr(self, "action", None) in unrestricted_actions:
             return base
 
-        # list view queues
-        if role == "EMPLOYEE":
-            return base.filter(submitted_by=self.request.user)
-
-        if role == "MANAGER":
-            return base.filter(status=Expense.Status.SUBMITTED, current_approver=self.request.user)
-
-        if role == "FINANCE":
-            return base.filter(status=Expense.Status.APPROVED)
+        # constant query count per page: receipts flag as a subquery, history (+ approvers) in one prefetch
+        base = with_receipt_flag(base)
+        if self.action != "list":
+            base = base.prefetch_related(
+                Prefetch("approval_history", queryset=ApprovalHistory.objects.select_related("approver"))
+            )
 
-        return Expense.objects.none()
+        qs = role_queue(base, role, self.request.user.id)
+        if self.action == "list":
+            qs = filter_expenses(qs, self.request.query_params)
+        return qs
 
     def perform_create(self, serializer):
         # ✅ Any role can create → DRAFT
-        serializer.save(
-            submitted_by=self.request.user,
-            status=Expense.Status.DRAFT,
-            current_approver=None,
-        )
+        with transaction.atomic():
+            exp = serializer.save(
+                submitted_by=self.request.user,
+                status=Expense.Status.DRAFT,
+                current_approver=None,
+            )
+            record_changes([(None, snapshot_of(exp))])
+            search.refresh([exp.pk])
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            before = snapshots(Expense.objects.select_for_update().filter(pk=serializer.instance.pk))
+            exp = serializer.save()
+            record_changes([(before.get(exp.pk), snapshot_of(exp))])
+            if search.SEARCH_FIELDS & set(serializer.validated_data):
+                search.refresh([exp.pk])
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            pk = instance.pk
+            before = snapshots(Expense.objects.select_for_update().filter(pk=pk))
+            instance.delete()
+            record_changes([(before.get(pk), None)])
+
+    @action(detail=False, methods=["get"])
+    def summary(self, request):
+        """Dashboard counts and totals, read from the claim counters (no scan of the claims)."""
+        data = {
+            "mine": claim_summary(scope=ClaimCounter.Scope.SUBMITTER, user_id=request.user.id),
+            "awaiting_me": claim_summary(scope=ClaimCounter.Scope.APPROVER, user_id=request.user.id),
+        }
+        if user_role(request) == "FINANCE":
+            data["all"] = claim_summary(scope=ClaimCounter.Scope.ALL)
+        return Response(data)
+
+    @action(
+        detail=False,
+        methods=["get"],
+        renderer_classes=[CSVPassthroughRenderer, XLSXPassthroughRenderer, JSONRenderer],
+    )
+    def export(self, request):
+        """
+        Streamed CSV (default) or ?format=xlsx of every claim, FINANCE only.
+        Optional ?status=A&status=B or ?status=A,B.
+        """
+        if user_role(request) != "FINANCE":
+            return Response({"detail": "Only FINANCE can export claims."}, status=drf_status.HTTP_403_FORBIDDEN)
+
+        statuses = [s for value in request.query_params.getlist("status") for s in value.split(",") if s]
+        unknown = sorted(set(statuses) - set(Expense.Status.values))
+        if unknown:
+            return Response({"detail": f"Unknown status: {', '.join(unknown)}."}, status=drf_status.HTTP_400_BAD_REQUEST)
+
+        fmt = "xlsx" if request.accepted_renderer.format == "xlsx" else "csv"
+        return export_response(export_queryset(statuses=statuses), fmt)
 
     # ---- Workflow actions ----
+    # Each move is a compare-and-swap UPDATE filtered on the expected status (and approver),
+    # so concurrent requests cannot both succeed. Only when the swap fails is the claim read
+    # to explain why: 404 / 403 / 400 as before, 409 if it is no longer in the expected state.
+
+    def _swap(self, pk, **kwargs):
+        try:
+            expense_id = int(pk)
+        except (TypeError, ValueError):
+            raise Http404
+        return transition(expense_id=expense_id, **kwargs)
+
+    def _conflict(self, exp, detail):
+        # wrong status for the action, whether stale or changed concurrently: 409 (400 before the CAS engine)
+        return Response({"detail": f"{detail} Claim is {exp.status}."}, status=drf_status.HTTP_409_CONFLICT)
+
+    def _render(self, request):
+        return Response(ExpenseSerializer(self.get_object(), context={"request": request}).data)
 
     @action(detail=True, methods=["post"])
     def submit(self, request, pk=None):
+        manager_id = request_access(request).reports_to_id
+
+        if manager_id and manager_id != request.user.id and self._swap(
+            pk,
+            user=request.user,
+            from_status=Expense.Status.DRAFT,
+            to_status=Expense.Status.SUBMITTED,
+            history_action=ApprovalHistory.Action.SUBMITTED,
+            scope=Q(submitted_by=request.user),
+            updates={"current_approver_id": manager_id},
+            remarks="Submitted",
+        ):
+            return self._render(request)
+
         exp = self.get_object()
 
         if exp.submitted_by_id != request.user.id:
             return Response({"detail": "Not your claim."}, status=drf_status.HTTP_403_FORBIDDEN)
 
         if exp.status != Expense.Status.DRAFT:
-            return Response({"detail": "Only draft can be submitted."}, status=drf_status.HTTP_400_BAD_REQUEST)
+            return self._conflict(exp, "Only draft can be submitted.")
 
-        manager = getattr(request.user, "reports_to", None)
-        if not manager:
+        if not manager_id:
             return Response({"detail": "No manager assigned (reports_to)."}, status=drf_status.HTTP_400_BAD_REQUEST)
 
-        if manager.id == request.user.id:
+        if manager_id == request.user.id:
             return Response({"detail": "Self-approval is not allowed."}, status=drf_status.HTTP_400_BAD_REQUEST)
 
-        exp.status = Expense.Status.SUBMITTED
-        exp.current_approver = manager
-        exp.save(update_fields=["status", "current_approver", "updated_at"])
+        return self._conflict(exp, "Only draft can be submitted.")
 
-        ApprovalHistory.objects.create(
-            expense=exp,
-            approver=request.user,
-            action=ApprovalHistory.Action.SUBMITTED,
-            remarks="Submitted",
-        )
+    def _manager_decision(self, request, pk, to_status, history_action, not_eligible):
+        comment = request.data.get("manager_comment", "")
 
-        return Response(ExpenseSerializer(exp, context={"request": request}).data)
+        if self._swap(
+            pk,
+            user=request.user,
+            from_status=Expense.Status.SUBMITTED,
+            to_status=to_status,
+            history_action=history_action,
+            scope=Q(current_approver=request.user) & ~Q(submitted_by=request.user),
+            updates={"approved_by": request.user, "manager_comment": comment, "current_approver": None},
+            remarks=comment,
+        ):
+            return self._render(request)
 
-    @action(detail=True, methods=["post"])
-    def manager_approve(self, request, pk=None):
         exp = self.get_object()
 
-        if exp.current_approver_id != request.user.id:
+        # approved_by: the approver whose own (concurrent / replayed) decision already moved the claim
+        if request.user.id not in (exp.current_approver_id, exp.approved_by_id):
             return Response({"detail": "You are not the current approver."}, status=drf_status.HTTP_403_FORBIDDEN)
 
         if exp.submitted_by_id == request.user.id:
             return Response({"detail": "Self-approval is not allowed."}, status=drf_status.HTTP_400_BAD_REQUEST)
 
-        if exp.status != Expense.Status.SUBMITTED:
-            return Response({"detail": "Not eligible for approval."}, status=drf_status.HTTP_400_BAD_REQUEST)
+        return self._conflict(exp, not_eligible)
 
-        exp.status = Expense.Status.APPROVED
-        exp.approved_by = request.user
-        exp.manager_comment = request.data.get("manager_comment", "")
-        exp.current_approver = None
-        exp.save(update_fields=["status", "approved_by", "manager_comment", "current_approver", "updated_at"])
-
-        ApprovalHistory.objects.create(
-            expense=exp,
-            approver=request.user,
-            action=ApprovalHistory.Action.APPROVED,
-            remarks=exp.manager_comment,
+    @action(detail=True, methods=["post"])
+    def manager_approve(self, request, pk=None):
+        return self._manager_decision(
+            request, pk, Expense.Status.APPROVED, ApprovalHistory.Action.APPROVED, "Not eligible for approval."
         )
 
-        return Response(ExpenseSerializer(exp, context={"request": request}).data)
-
     @action(detail=True, methods=["post"])
     def manager_reject(self, request, pk=None):
-        exp = self.get_object()
-
-        if exp.current_approver_id != request.user.id:
-            return Response({"detail": "You are not the current approver."}, status=drf_status.HTTP_403_FORBIDDEN)
-
-        if exp.submitted_by_id == request.user.id:
-            return Response({"detail": "Self-approval is not allowed."}, status=drf_status.HTTP_400_BAD_REQUEST)
-
-        if exp.status != Expense.Status.SUBMITTED:
-            return Response({"detail": "Not eligible for rejection."}, status=drf_status.HTTP_400_BAD_REQUEST)
-
-        exp.status = Expense.Status.REJECTED
-        exp.approved_by = request.user
-        exp.manager_comment = request.data.get("manager_comment", "")
-        exp.current_approver = None
-        exp.save(update_fields=["status", "approved_by", "manager_comment", "current_approver", "updated_at"])
-
-        ApprovalHistory.objects.create(
-            expense=exp,
-            approver=request.user,
-            action=ApprovalHistory.Action.REJECTED,
-            remarks=exp.manager_comment,
+        return self._manager_decision(
+            request, pk, Expense.Status.REJECTED, ApprovalHistory.Action.REJECTED, "Not eligible for rejection."
         )
 
-        return Response(ExpenseSerializer(exp, context={"request": request}).data)
-
     @action(detail=True, methods=["post"])
     def finance_approve(self, request, pk=None):
-        if user_role(request.user) != "FINANCE":
+        if user_role(request) != "FINANCE":
             return Response({"detail": "Finance role required."}, status=drf_status.HTTP_403_FORBIDDEN)
 
-        exp = self.get_object()
-        if exp.status != Expense.Status.APPROVED:
-            return Response({"detail": "Not eligible for finance approval."}, status=drf_status.HTTP_400_BAD_REQUEST)
-
-        exp.status = Expense.Status.FINANCE_APPROVED
-        exp.finance_comment = request.data.get("finance_comment", "")
-        exp.save(update_fields=["status", "finance_comment", "updated_at"])
+        comment = request.data.get("finance_comment", "")
+        if self._swap(
+            pk,
+            user=request.user,
+            from_status=Expense.Status.APPROVED,
+            to_status=Expense.Status.FINANCE_APPROVED,
+            history_action=ApprovalHistory.Action.FINANCE_APPROVED,
+            updates={"finance_comment": comment},
+            remarks=comment,
+        ):
+            return self._render(request)
 
-        ApprovalHistory.objects.create(
-            expense=exp,
-            approver=request.user,
-            action=ApprovalHistory.Action.FINANCE_APPROVED,
-            remarks=exp.finance_comment,
-        )
-
-        return Response(ExpenseSerializer(exp, context={"request": request}).data)
+        return self._conflict(self.get_object(), "Not eligible for finance approval.")
 
     @action(detail=True, methods=["post"])
     def mark_paid(self, request, pk=None):
-        if user_role(request.user) != "FINANCE":
+        if user_role(request) != "FINANCE":
             return Response({"detail": "Finance role required."}, status=drf_status.HTTP_403_FORBIDDEN)
 
-        exp = self.get_object()
-        if exp.status != Expense.Status.FINANCE_APPROVED:
-            return Response({"detail": "Only finance-approved claims can be marked Paid."}, status=drf_status.HTTP_400_BAD_REQUEST)
+        payment_reference = request.data.get("payment_reference", "")
+        updates = {"paid_by": request.user, "payment_reference": payment_reference}
+        if "finance_comment" in request.data:
+            updates["finance_comment"] = request.data["finance_comment"]
+
+        if self._swap(
+            pk,
+            user=request.user,
+            from_status=Expense.Status.FINANCE_APPROVED,
+            to_status=Expense.Status.PAID,
+            history_action=ApprovalHistory.Action.PAID,
+            updates=updates,
+            remarks=f"Ref: {payment_reference}".strip(),
+        ):
+            return self._render(request)
+
+        return self._conflict(self.get_object(), "Only finance-approved claims can be marked Paid.")
+
+    # ---- Bulk workflow actions: body {"ids": [...], ...}, per-id outcomes ----
+
+    def _bulk_ids(self, request):
+        ids = request.data.get("ids")
+        if not isinstance(ids, list) or not ids:
+            return None, Response({"detail": "ids must be a non-empty list."}, status=drf_status.HTTP_400_BAD_REQUEST)
+        if len(ids) > BULK_MAX_IDS:
+            return None, Response({"detail": f"At most {BULK_MAX_IDS} ids per request."}, status=drf_status.HTTP_400_BAD_REQUEST)
+        try:
+            return [int(i) for i in ids], None
+        except (TypeError, ValueError):
+            return None, Response({"detail": "ids must be integers."}, status=drf_status.HTTP_400_BAD_REQUEST)
+
+    def _bulk_response(self, outcomes):
+        results = [
+            {"id": exp_id, "ok": True} if detail is None else {"id": exp_id, "ok": False, "detail": detail}
+            for exp_id, detail in outcomes.items()
+        ]
+        return Response({
+            "updated": sum(1 for r in results if r["ok"]),
+            "results": results,
+        })
+
+    def _bulk_manager_decision(self, request, to_status, history_action):
+        ids, error = self._bulk_ids(request)
+        if error:
+            return error
+
+        comment = request.data.get("manager_comment", "")
+        outcomes = bulk_transition(
+            user=request.user,
+            ids=ids,
+            from_status=Expense.Status.SUBMITTED,
+            to_status=to_status,
+            history_action=history_action,
+            # only the current approver, never on their own claims
+            scope=Q(current_approver=request.user) & ~Q(submitted_by=request.user),
+            updates={"approved_by": request.user, "manager_comment": comment, "current_approver": None},
+            remarks=comment,
+        )
+        return self._bulk_response(outcomes)
 
-        exp.status = Expense.Status.PAID
-        exp.paid_by = request.user
-        exp.payment_reference = request.data.get("payment_reference", "")
-        exp.finance_comment = request.data.get("finance_comment", exp.finance_comment)
-        exp.save(update_fields=["status", "paid_by", "payment_reference", "finance_comment", "updated_at"])
+    @action(detail=False, methods=["post"])
+    def bulk_approve(self, request):
+        return self._bulk_manager_decision(request, Expense.Status.APPROVED, ApprovalHistory.Action.APPROVED)
 
-        ApprovalHistory.objects.create(
-            expense=exp,
-            approver=request.user,
-            action=ApprovalHistory.Action.PAID,
-            remarks=f"Ref: {exp.payment_reference}".strip(),
+    @action(detail=False, methods=["post"])
+    def bulk_reject(self, request):
+        return self._bulk_manager_decision(request, Expense.Status.REJECTED, ApprovalHistory.Action.REJECTED)
+
+    @action(detail=False, methods=["post"])
+    def bulk_finance_approve(self, request):
+        if user_role(request) != "FINANCE":
+            return Response({"detail": "Finance role required."}, status=drf_status.HTTP_403_FORBIDDEN)
+
+        ids, error = self._bulk_ids(request)
+        if error:
+            return error
+
+        comment = request.data.get("finance_comment", "")
+        outcomes = bulk_transition(
+            user=request.user,
+            ids=ids,
+            from_status=Expense.Status.APPROVED,
+            to_status=Expense.Status.FINANCE_APPROVED,
+            history_action=ApprovalHistory.Action.FINANCE_APPROVED,
+            updates={"finance_comment": comment},
+            remarks=comment,
         )
+        return self._bulk_response(outcomes)
+
+    @action(detail=False, methods=["post"])
+    def bulk_mark_paid(self, request):
+        if user_role(request) != "FINANCE":
+            return Response({"detail": "Finance role required."}, status=drf_status.HTTP_403_FORBIDDEN)
 
-        return Response(ExpenseSerializer(exp, context={"request": request}).data)
+        ids, error = self._bulk_ids(request)
+        if error:
+            return error
+
+        # one payment run: the same reference on every claim
+        payment_reference = request.data.get("payment_reference", "")
+        updates = {"paid_by": request.user, "payment_reference": payment_reference}
+        if "finance_comment" in request.data:
+            updates["finance_comment"] = request.data["finance_comment"]
+
+        outcomes = bulk_transition(
+            user=request.user,
+            ids=ids,
+            from_status=Expense.Status.FINANCE_APPROVED,
+            to_status=Expense.Status.PAID,
+            history_action=ApprovalHistory.Action.PAID,
+            updates=updates,
+            remarks=f"Ref: {payment_reference}".strip(),
+        )
+        return self._bulk_response(outcomes)
 
     @action(detail=True, methods=["get"], url_path="receipt")
     def receipt(self, request, pk=None):
         exp = self.get_object()
 
-        if not can_view_receipt(request.user, exp):
+        if not can_view_receipt(request, exp):
             return Response({"detail": "Not allowed."}, status=drf_status.HTTP_403_FORBIDDEN)
 
         receipt_obj = exp.receipts.order_by("-id").first()
 
-        file_field = None
-        if receipt_obj and receipt_obj.file:
-            file_field = receipt_obj.file
-        elif getattr(exp, "receipt", None):
-            file_field = exp.receipt
+        rendition = request.query_params.get("rendition")
+        if rendition not in (None, "thumb", "preview"):
+            return Response({"detail": "rendition must be thumb or preview."}, status=drf_status.HTTP_400_BAD_REQUEST)
 
+        file_field, content_hash = receipt_file(exp, receipt_obj, rendition)
         if not file_field:
             raise Http404("No receipt found")
 
         download = request.query_params.get("download") == "1"
-        f = file_field.open("rb")
         filename = smart_str(file_field.name.split("/")[-1])
 
-        return FileResponse(f, as_attachment=download, filename=filename)
+        return serve_receipt(request, file_field, filename=filename, download=download, content_hash=content_hash)
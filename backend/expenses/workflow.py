@@ -0,0 +1,88 @@
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import search
+from .counters import record_changes, snapshots
+from .models import Expense, ApprovalHistory
+
+# upper bound on ids per bulk request
+BULK_MAX_IDS = 1000
+
+
+def transition(*, expense_id, user, from_status, to_status, history_action, scope=None, updates=None, remarks=""):
+    """
+    Compare-and-swap one claim from `from_status` to `to_status`.
+
+    The row is locked only while it is still in `from_status` (and matches `scope`);
+    a concurrent caller waiting on the lock re-checks the status and gets nothing,
+    so exactly one wins. History and claim counters are written in the same
+    transaction. Returns True if this call moved the claim.
+    """
+    scope = scope if scope is not None else Q()
+    updates = updates or {}
+
+    with transaction.atomic():
+        before = snapshots(Expense.objects.select_for_update().filter(scope, pk=expense_id, status=from_status))
+        if not before:
+            return False
+
+        Expense.objects.filter(pk=expense_id).update(status=to_status, updated_at=timezone.now(), **updates)
+        ApprovalHistory.objects.create(
+            expense_id=expense_id, approver=user, action=history_action, remarks=remarks
+        )
+        after = snapshots(Expense.objects.filter(pk=expense_id))
+        record_changes([(before[expense_id], after[expense_id])])
+        if search.SEARCH_FIELDS & set(updates):
+            search.refresh([expense_id])
+    return True
+
+
+def bulk_transition(*, user, ids, from_status, to_status, history_action, scope=None, updates=None, remarks=""):
+    """
+    Move every claim in `ids` that is in `from_status` (and matches `scope`) to `to_status`.
+
+    Eligible rows are locked, moved with one conditional UPDATE and get their
+    ApprovalHistory rows in one bulk_create, all in a single transaction
+    together with the claim counter updates.
+    Returns {id: None} for moved claims and {id: "reason"} for the rest; claims
+    outside `scope` are "Not allowed." whatever their status.
+    """
+    scope = scope if scope is not None else Q()
+    updates = updates or {}
+    ids = list(dict.fromkeys(ids))  # de-duplicate, keep request order
+
+    with transaction.atomic():
+        before = snapshots(
+            Expense.objects.select_for_update().filter(scope, id__in=ids, status=from_status).order_by("id")
+        )
+        eligible = sorted(before)
+        if eligible:
+            Expense.objects.filter(id__in=eligible, status=from_status).update(
+                status=to_status, updated_at=timezone.now(), **updates
+            )
+            ApprovalHistory.objects.bulk_create([
+                ApprovalHistory(expense_id=exp_id, approver=user, action=history_action, remarks=remarks)
+                for exp_id in eligible
+            ])
+            after = snapshots(Expense.objects.filter(id__in=eligible))
+            record_changes((before[exp_id], after[exp_id]) for exp_id in eligible)
+            if search.SEARCH_FIELDS & set(updates):
+                search.refresh(eligible)
+
+    outcomes = {exp_id: None for exp_id in eligible}
+
+    rest = [exp_id for exp_id in ids if exp_id not in outcomes]
+    if rest:
+        # the status is only reported for claims the caller may act on
+        in_scope = dict(Expense.objects.filter(scope, id__in=rest).values_list("id", "status"))
+        found = set(Expense.objects.filter(id__in=rest).values_list("id", flat=True))
+        for exp_id in rest:
+            if exp_id in in_scope:
+                outcomes[exp_id] = f"Not eligible (status {in_scope[exp_id]})."
+            elif exp_id in found:
+                outcomes[exp_id] = "Not allowed."
+            else:
+                outcomes[exp_id] = "Not found."
+
+    return {exp_id: outcomes[exp_id] for exp_id in ids}
@@ -84,7 +84,73 @@ export async function apiJson(path, options = {}) {
   return { res, data };
 }
 
+// List endpoints are cursor-paginated ({ next, previous, results }): fetch one page,
+// `next` is the path of the following page (null on the last one)
+export async function apiListPage(path) {
+  const { res, data } = await apiJson(path);
+  if (!res.ok || !data) return { rows: [], next: null };
+  if (Array.isArray(data)) return { rows: data, next: null };
+
+  return { rows: data.results || [], next: data.next ? data.next.replace(API_BASE, "") : null };
+}
+
+// Files above this size go through the resumable chunked upload API
+const CHUNKED_UPLOAD_THRESHOLD = 2 * 1024 * 1024;
+
+async function uploadPart(sessionId, offset, blob, attempts = 5) {
+  let lastError;
+  for (let attempt = 0; attempt < attempts; attempt += 1) {
+    if (attempt > 0) {
+      await new Promise((resolve) => setTimeout(resolve, Math.min(1000 * 2 ** attempt, 15000)));
+    }
+
+    let res;
+    let data;
+    try {
+      ({ res, data } = await apiJson(`/api/receipt-uploads/${sessionId}/parts/?offset=${offset}`, {
+        method: "PUT",
+        headers: { "Content-Type": "application/octet-stream" },
+        body: blob,
+      }));
+    } catch (err) {
+      lastError = err; // network drop: retry the same part
+      continue;
+    }
+
+    if (res.ok) return data.offset;
+    // server already has more (e.g. our previous response was lost): continue from there
+    if (res.status === 409 && data?.offset !== undefined) return data.offset;
+
+    lastError = new Error(data?.detail || "Receipt upload failed");
+    if (res.status < 500) throw lastError;
+  }
+  throw lastError;
+}
+
+export async function uploadReceiptChunked(expenseId, file, { onProgress } = {}) {
+  const { res, data: session } = await apiJson("/api/receipt-uploads/", {
+    method: "POST",
+    body: JSON.stringify({ expense: expenseId, filename: file.name, size: file.size }),
+  });
+  if (!res.ok) throw new Error(session?.detail || "Receipt upload failed");
+
+  let offset = session.offset;
+  while (offset < file.size) {
+    const end = Math.min(offset + session.part_max_bytes, file.size);
+    offset = await uploadPart(session.id, offset, file.slice(offset, end));
+    if (onProgress) onProgress(offset / file.size);
+  }
+
+  const { res: doneRes, data } = await apiJson(`/api/receipt-uploads/${session.id}/complete/`, { method: "POST" });
+  if (!doneRes.ok) throw new Error(data?.detail || "Receipt upload failed");
+  return data;
+}
+
 export async function uploadReceipt(expenseId, file) {
+  if (file.size > CHUNKED_UPLOAD_THRESHOLD) {
+    return uploadReceiptChunked(expenseId, file);
+  }
+
   const fd = new FormData();
   fd.append("expense", String(expenseId));
   fd.append("file", file);
@@ -96,8 +162,29 @@ export async function uploadReceipt(expenseId, file) {
   }
   return data; // includes ocr_status + ocr_result
 }
-export async function fetchReceiptBlob(expenseId, download = false) {
-  const res = await apiFetch(`/api/expenses/${expenseId}/receipt/?download=${download ? 1 : 0}`, {
+
+// OCR runs in a background worker: poll the receipt until it leaves PENDING/PROCESSING
+export async function waitForReceiptOcr(receiptId, { intervalMs = 1500, timeoutMs = 60000 } = {}) {
+  const deadline = Date.now() + timeoutMs;
+
+  while (true) {
+    const { res, data } = await apiJson(`/api/receipts/${receiptId}/`);
+    if (!res.ok) {
+      throw new Error(data?.detail || "Failed to fetch receipt OCR status");
+    }
+    if (data.ocr_status !== "PENDING" && data.ocr_status !== "PROCESSING") {
+      return data;
+    }
+    if (Date.now() > deadline) {
+      return data;
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+}
+// rendition: "thumb" | "preview" for the small review copies, omit for the original
+export async function fetchReceiptBlob(expenseId, download = false, rendition = null) {
+  const params = `download=${download ? 1 : 0}${rendition ? `&rendition=${rendition}` : ""}`;
+  const res = await apiFetch(`/api/expenses/${expenseId}/receipt/?${params}`, {
     method: "GET",
   });
 
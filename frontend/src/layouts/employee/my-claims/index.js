@@ -7,20 +7,28 @@ import DashboardNavbar from "examples/Navbars/DashboardNavbar";
 
 import MDBox from "components/MDBox";
 import MDTypography from "components/MDTypography";
+import MDButton from "components/MDButton";
 
-import { apiFetch } from "api";
+import { apiListPage } from "api";
 
 export default function MyClaims() {
   const [rows, setRows] = useState([]);
+  const [next, setNext] = useState(null);
 
   useEffect(() => {
     (async () => {
-      const res = await apiFetch("/api/expenses/");
-      const data = await res.json();
-      setRows(Array.isArray(data) ? data : []);
+      const page = await apiListPage("/api/expenses/");
+      setRows(page.rows);
+      setNext(page.next);
     })();
   }, []);
 
+  const loadMore = async () => {
+    const page = await apiListPage(next);
+    setRows((prev) => [...prev, ...page.rows]);
+    setNext(page.next);
+  };
+
   return (
     <DashboardLayout>
       <DashboardNavbar />
@@ -45,6 +53,13 @@ export default function MyClaims() {
               </MDBox>
             ))
           )}
+          {next && (
+            <MDBox mt={2}>
+              <MDButton color="dark" size="small" variant="outlined" onClick={loadMore}>
+                Load more
+              </MDButton>
+            </MDBox>
+          )}
         </MDBox>
       </MDBox>
     </DashboardLayout>
@@ -9,7 +9,7 @@ import MDButton from "components/MDButton";
 import MDInput from "components/MDInput";
 import MDTypography from "components/MDTypography";
 
-import { apiJson, uploadReceipt } from "api";
+import { apiJson, uploadReceipt, waitForReceiptOcr } from "api";
 
 export default function SubmitClaim() {
   const [title, setTitle] = useState("");
@@ -60,8 +60,12 @@ export default function SubmitClaim() {
     // 1) Create draft expense to get an ID (required by /api/receipts/)
     const expenseId = draftExpenseId || (await createDraftExpense());
 
-    // 2) Upload receipt -> OCR
-    const data = await uploadReceipt(expenseId, receipt);
+    // 2) Upload receipt -> queued for OCR
+    const uploaded = await uploadReceipt(expenseId, receipt);
+    setOcrInfo({ status: uploaded.ocr_status, confidence: null, error: null });
+
+    // 3) Wait for the OCR worker to finish
+    const data = await waitForReceiptOcr(uploaded.id);
 
     setOcrInfo({
       status: data.ocr_status,
@@ -80,6 +84,8 @@ export default function SubmitClaim() {
       }
 
       setMsg("✅ Autofill completed. Please review and submit.");
+    } else if (data.ocr_status === "PENDING" || data.ocr_status === "PROCESSING") {
+      setMsg("OCR is still running. You can fill details manually and submit.");
     } else {
       setMsg("OCR failed. Please fill details manually and submit.");
     }
@@ -10,10 +10,10 @@ import MDButton from "components/MDButton";
 import MDInput from "components/MDInput";
 
 import DataTable from "examples/Tables/DataTable";
-import { apiFetch, fetchReceiptBlob } from "api";
+import { apiFetch, apiListPage, fetchReceiptBlob } from "api";
 
 const viewReceipt = async (expenseId) => {
-  const blob = await fetchReceiptBlob(expenseId, false);
+  const blob = await fetchReceiptBlob(expenseId, false, "preview");
   const url = URL.createObjectURL(blob);
   window.open(url, "_blank", "noopener,noreferrer");
 };
@@ -32,13 +32,21 @@ const downloadReceipt = async (expenseId) => {
 
 export default function Payments() {
   const [claims, setClaims] = useState([]);
+  const [next, setNext] = useState(null);
   const [paymentRefById, setPaymentRefById] = useState({});
   const [commentById, setCommentById] = useState({});
 
+  // one page at a time; "Load more" follows the cursor
   const load = async () => {
-    const res = await apiFetch("/api/expenses/");
-    const data = await res.json();
-    setClaims(Array.isArray(data) ? data : []);
+    const page = await apiListPage("/api/expenses/?status=APPROVED,FINANCE_APPROVED");
+    setClaims(page.rows);
+    setNext(page.next);
+  };
+
+  const loadMore = async () => {
+    const page = await apiListPage(next);
+    setClaims((prev) => [...prev, ...page.rows]);
+    setNext(page.next);
   };
 
   useEffect(() => {
@@ -56,6 +64,8 @@ export default function Payments() {
     if (!res.ok) {
       const err = await res.json().catch(() => ({}));
       alert(err.detail || "Finance approve failed");
+      // 409: the claim was moved on by someone else since this list was loaded
+      if (res.status === 409) await load();
       return;
     }
     await load();
@@ -72,13 +82,15 @@ export default function Payments() {
     if (!res.ok) {
       const err = await res.json().catch(() => ({}));
       alert(err.detail || "Mark paid failed");
+      // 409: the claim was moved on by someone else since this list was loaded
+      if (res.status === 409) await load();
       return;
     }
     await load();
   };
 
   const financeQueue = claims.filter(
-    (c) => c.status === "MANAGER_APPROVED" || c.status === "FINANCE_APPROVED"
+    (c) => c.status === "APPROVED" || c.status === "FINANCE_APPROVED"
   );
 
   const columns = [
@@ -127,7 +139,7 @@ export default function Payments() {
     ),
     actions: (
       <MDBox display="flex" gap={1}>
-        {c.status === "MANAGER_APPROVED" && (
+        {c.status === "APPROVED" && (
           <MDButton color="info" size="small" onClick={() => financeApprove(c.id)}>
             Finance Approve
           </MDButton>
@@ -159,6 +171,13 @@ export default function Payments() {
               No claims in finance queue.
             </MDTypography>
           )}
+          {next && (
+            <MDBox mt={2}>
+              <MDButton color="dark" size="small" variant="outlined" onClick={loadMore}>
+                Load more
+              </MDButton>
+            </MDBox>
+          )}
         </MDBox>
       </MDBox>
     </DashboardLayout>
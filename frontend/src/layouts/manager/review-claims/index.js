@@ -10,10 +10,10 @@ import MDButton from "components/MDButton";
 import MDInput from "components/MDInput";
 
 import DataTable from "examples/Tables/DataTable";
-import { apiFetch, fetchReceiptBlob } from "api";
+import { apiFetch, apiListPage, fetchReceiptBlob } from "api";
 
 const viewReceipt = async (expenseId) => {
-  const blob = await fetchReceiptBlob(expenseId, false);
+  const blob = await fetchReceiptBlob(expenseId, false, "preview");
   const url = URL.createObjectURL(blob);
   window.open(url, "_blank", "noopener,noreferrer");
 };
@@ -32,12 +32,20 @@ const downloadReceipt = async (expenseId) => {
 
 export default function ReviewClaims() {
   const [claims, setClaims] = useState([]);
+  const [next, setNext] = useState(null);
   const [commentById, setCommentById] = useState({});
 
+  // one page at a time; "Load more" follows the cursor
   const load = async () => {
-    const res = await apiFetch("/api/expenses/");
-    const data = await res.json();
-    setClaims(Array.isArray(data) ? data : []);
+    const page = await apiListPage("/api/expenses/?status=SUBMITTED");
+    setClaims(page.rows);
+    setNext(page.next);
+  };
+
+  const loadMore = async () => {
+    const page = await apiListPage(next);
+    setClaims((prev) => [...prev, ...page.rows]);
+    setNext(page.next);
   };
 
   useEffect(() => {
@@ -55,6 +63,8 @@ export default function ReviewClaims() {
     if (!res.ok) {
       const err = await res.json().catch(() => ({}));
       alert(err.detail || "Action failed");
+      // 409: the claim was moved on by someone else since this list was loaded
+      if (res.status === 409) await load();
       return;
     }
     await load();
@@ -130,6 +140,13 @@ export default function ReviewClaims() {
               No submitted claims to review.
             </MDTypography>
           )}
+          {next && (
+            <MDBox mt={2}>
+              <MDButton color="dark" size="small" variant="outlined" onClick={loadMore}>
+                Load more
+              </MDButton>
+            </MDBox>
+          )}
         </MDBox>
       </MDBox>
     </DashboardLayout>